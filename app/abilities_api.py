@@ -1,9 +1,17 @@
 # abilities_api.py
 """
 API for Planet 28 character abilities.
+
+``ABILITIES`` holds the built-in abilities; it never changes at runtime.
+Custom abilities live in the shared store of ``app.custom_content``.
+Entries returned by this module are shared and must be treated as
+read-only.
 """
 
-ABILITIES = [
+from app.catalog_cache import NameIndex
+from app.custom_content import add_entry, custom_content_snapshot, custom_entries
+
+ABILITIES = (
     {"name": "Aimed shot", "cost": 10, "effect": "Use an action to aim at an enemy's weak spot. Weapon does +1D8 damage on next attack this turn."},
     {"name": "Sharpshooter", "cost": 15, "effect": "+1 Shooting for ranged attacks.", "modifiers": {"Shooting": 1}},
     {"name": "Drain", "cost": 25, "effect": "Remove 1 hit-point from any character within 5cm and add it to own hit-points."},
@@ -15,19 +23,31 @@ ABILITIES = [
     {"name": "Repair", "cost": 15, "effect": "In base contact with a vehicle, restore 1D8 hit-points to any section, regardless of facing."},
     {"name": "Sabotage", "cost": 20, "effect": "Within 5cm of enemy vehicle, choose a section from a random facing. That section is destroyed for 1D6 turns, then returns to normal."},
     {"name": "Throw", "cost": 15, "effect": "Throw any character in base contact 1D12cm in a straight line. Characters thrown off ledges take fall damage."},
-]
+)
+
+def _build_catalog(data):
+    """Built-in plus custom abilities, and a name index whose entries all carry ``modifiers``."""
+    abilities = ABILITIES + custom_entries(data, "abilities")
+    index = NameIndex([ab if "modifiers" in ab else {**ab, "modifiers": {}} for ab in abilities])
+    return abilities, index
+
+def _catalog():
+    # Rebuilt only when the custom content store changes
+    return custom_content_snapshot().derived("abilities", _build_catalog)
 
 def list_abilities():
-    """Return all abilities."""
-    return ABILITIES
+    """Return all abilities (a tuple, built-in first)."""
+    return _catalog()[0]
+
+def get_ability_index():
+    """Return the name index for the built-in and custom abilities."""
+    return _catalog()[1]
 
 def get_ability(name):
     """Get an ability by name (case-insensitive)."""
-    for ab in ABILITIES:
-        if ab["name"].lower() == name.lower():
-            if "modifiers" not in ab:
-                ab["modifiers"] = {}
-            return ab
+    ab = get_ability_index().get_folded(name)
+    if ab is not None:
+        return ab
     return {"name": name, "modifiers": {}}
 
 def add_ability_to_character(character, ability_name):
@@ -40,11 +60,9 @@ def add_ability_to_character(character, ability_name):
     return False
 
 def add_custom_ability(name, cost, effect):
-    """Add a custom ability to the ability list for this session."""
-    ab = {"name": name, "cost": cost, "effect": effect}
-    if not any(a["name"].lower() == name.lower() for a in ABILITIES):
-        ABILITIES.append(ab)
-        return True
-    return False
+    """Add a custom ability to the shared store, for every worker."""
+    if get_ability_index().get_folded(name) is not None:
+        return False
+    return add_entry("abilities", name, lambda existing: {"name": name, "cost": cost, "effect": effect})
 
 
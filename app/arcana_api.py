@@ -1,9 +1,15 @@
 # arcana_api.py
 """
 API for Planet 28 arcane (arcana) abilities.
+
+``ARCANA`` holds the built-in arcana; it never changes at runtime.
+Custom arcana live in the shared store of ``app.custom_content``.
 """
 
-ARCANA = [
+from app.catalog_cache import NameIndex
+from app.custom_content import add_entry, custom_content_snapshot, custom_entries
+
+ARCANA = (
     {"roll": 1, "name": "Blind", "effect": "Make a (P) roll. If successful, all characters and vehicles within 15cm cannot make any actions for the remainder of the turn."},
     {"roll": 2, "name": "Smite", "effect": "Select a character or vehicle in line of sight and make a (P) roll. If successful, that target takes 1D10+5 damage. Target may make an armour roll."},
     {"roll": 3, "name": "Terrify", "effect": "Select a character in line of sight and make a (P) roll. If successful, that character must immediately retreat to the nearest table edge as if they failed a break test."},
@@ -16,29 +22,42 @@ ARCANA = [
     {"roll": 10, "name": "Teleport", "effect": "Make a (P) roll and select any part of the playing area within line of sight. If successful, move this character there immediately."},
     {"roll": 11, "name": "Dishearten", "effect": "Select a character in line of sight and make a (P) roll. If successful, that character acts last in the next turn, regardless of their (A) score."},
     {"roll": 12, "name": "Immobilize", "effect": "Select a character in line of sight and make a (P) roll. If successful, that character may not move for 1D4 turns."},
-]
+)
+
+def _build_catalog(data):
+    arcana = ARCANA + custom_entries(data, "arcana")
+    index = NameIndex(arcana)
+    index.by_roll = {}
+    for arc in arcana:
+        index.by_roll.setdefault(arc.get("roll"), arc)
+    return arcana, index
+
+def _catalog():
+    # Rebuilt only when the custom content store changes
+    return custom_content_snapshot().derived("arcana", _build_catalog)
 
 def list_arcana():
-    """Return all arcane abilities."""
-    return ARCANA
+    """Return all arcane abilities (a tuple, built-in first)."""
+    return _catalog()[0]
+
+def get_arcana_index():
+    """Return the name index for the built-in and custom arcana.
+
+    The index also carries a ``by_roll`` dict for 1D12 lookups.
+    """
+    return _catalog()[1]
 
 def get_arcana_by_roll(roll):
     """Get arcane ability by 1D12 roll."""
-    for arc in ARCANA:
-        if arc["roll"] == roll:
-            return arc
-    return None
+    return get_arcana_index().by_roll.get(roll)
 
 def get_arcana_by_name(name):
     """Get arcane ability by name (case-insensitive)."""
-    for arc in ARCANA:
-        if arc["name"].lower() == name.lower():
-            return arc
-    return None
+    return get_arcana_index().get_folded(name)
 
 def add_custom_arcana(name, effect):
-    """Add a custom arcane ability to the list for this session."""
-    if not any(a["name"].lower() == name.lower() for a in ARCANA):
-        ARCANA.append({"roll": len(ARCANA)+1, "name": name, "effect": effect})
-        return True
-    return False
+    """Add a custom arcane ability to the shared store, for every worker."""
+    if get_arcana_index().get_folded(name) is not None:
+        return False
+    # The roll is numbered under the store's lock, so workers cannot hand out the same one
+    return add_entry("arcana", name, lambda existing: {"roll": len(ARCANA) + len(existing) + 1, "name": name, "effect": effect})
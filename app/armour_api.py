@@ -1,30 +1,29 @@
-import json
 import os
+from app.catalog_cache import NameIndex, get_snapshot
+
+ARMOUR_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'armour_data.json')
+
+def get_armour_snapshot():
+    """Return the cached armour catalog snapshot."""
+    # Return empty data if file not found or invalid
+    return get_snapshot(ARMOUR_DATA_FILE, {"armour_list": [], "special_rules": {}})
 
 def get_armour_data():
-    """Load armour data from the JSON file."""
-    try:
-        armour_path = os.path.join(os.path.dirname(__file__), 'armour_data.json')
-        with open(armour_path, 'r') as f:
-            data = json.load(f)
-        return data
-    except Exception as e:
-        print(f"Error loading armour data: {e}")
-        # Return empty data if file not found or invalid
-        return {"armour_list": [], "special_rules": {}}
+    """Load armour data from the JSON file (cached, treat as read-only)."""
+    return get_armour_snapshot().data
 
 def list_armour():
     """Return all available armour items."""
     data = get_armour_data()
     return data.get("armour_list", [])
 
+def get_armour_index():
+    """Return the name index for the current armour catalog."""
+    return get_armour_snapshot().derived("name_index", lambda data: NameIndex(data.get("armour_list", [])))
+
 def get_armour(armour_name):
     """Get details of a specific armour by name."""
-    armour_list = list_armour()
-    for armour in armour_list:
-        if armour["name"] == armour_name:
-            return armour
-    return None
+    return get_armour_index().get(armour_name)
 
 def get_armour_special_rules():
     """Get all armour special rules and their descriptions."""
@@ -0,0 +1,41 @@
+# async_storage.py
+"""
+Awaitable storage calls for the async handlers.
+
+Every method runs its blocking work (file reads and writes, ``stat``
+checks of the catalogs, lock waits) on an ``IOExecutor``, so the event
+loop is never blocked by the disk::
+
+    tables = await ASYNC_STORAGE.cost_tables(warband)
+    result = await ASYNC_STORAGE.run(write)
+
+Read-modify-write sections that must hold character locks pass the whole
+section to ``run``; the locks are then taken and released on the same
+worker thread.
+"""
+
+from app.points_engine import get_cost_tables
+
+
+class AsyncStorage:
+    def __init__(self, storage, executor, homebrew=None):
+        self.storage = storage
+        self.executor = executor
+        # HomebrewCatalogs; without it every warband prices with the shared tables
+        self.homebrew = homebrew
+
+    async def run(self, fn, *args, **kwargs):
+        """Run any blocking storage function on the I/O executor."""
+        return await self.executor.run(fn, *args, **kwargs)
+
+    async def cost_tables(self, warband=None):
+        """The current cost tables, with ``warband``'s homebrew overlay if given.
+
+        Re-checking the catalog and overlay files is disk work too.
+        """
+        if warband and self.homebrew is not None:
+            return await self.executor.run(self.homebrew.cost_tables, warband)
+        return await self.executor.run(get_cost_tables)
+
+    async def stats(self):
+        return await self.executor.run(self.storage.stats)
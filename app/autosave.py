@@ -0,0 +1,205 @@
+# autosave.py
+"""
+Write-behind buffer for character autosaves.
+
+The edit page autosaves the whole form every time the user pauses, so a
+single editing session produces a long run of saves of the same record.
+Instead of rewriting it each time, autosaves are parked here and merged:
+only the latest state of each record is kept, and it is written once the
+record has been idle for ``idle_delay`` seconds, once it has been dirty
+for ``max_delay`` seconds, or when the app shuts down.
+
+Saves are keyed by whatever identifies the record to ``writer`` (the
+repository uses ``(warband, name)``). Reads must go through ``get`` so
+that callers see buffered state before it is written, and any direct
+write of a buffered record must go through ``write_through`` so it
+cannot be overwritten by an older pending save.
+"""
+
+import copy
+import threading
+import time
+
+# Flush a record after this many seconds without a new save
+IDLE_DELAY = 5.0
+# ... or at the latest this many seconds after its first unsaved change
+MAX_DELAY = 30.0
+# How often the background flusher wakes up
+TICK = 0.5
+
+
+class _Pending:
+    __slots__ = ("data", "first_dirty", "last_update", "saves")
+
+    def __init__(self, data, now):
+        self.data = data
+        self.first_dirty = now
+        self.last_update = now
+        self.saves = 1
+
+
+class WriteBehindBuffer:
+    """Coalesces repeated saves of the same record and flushes them in the background."""
+
+    def __init__(self, writer, key_lock=None, idle_delay=IDLE_DELAY, max_delay=MAX_DELAY, tick=TICK):
+        # writer(key, data) stores a record
+        self.writer = writer
+        self.idle_delay = idle_delay
+        self.max_delay = max_delay
+        self.tick = tick
+        self._pending = {}
+        self._lock = threading.Lock()
+        # key_lock(key) returns a context manager that serializes writes of
+        # one record, so a flush and a write-through of it cannot
+        # interleave; without one, all writes are serialized
+        self._io_lock = threading.Lock()
+        self._key_lock = key_lock or (lambda key: self._io_lock)
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            "saves": 0,
+            "coalesced": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "write_through": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "last_pending_age_ms": 0.0,
+            "max_pending_age_ms": 0.0,
+        }
+
+    # --- lifecycle ---
+
+    def start(self):
+        """Start the background flusher (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="autosave-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background flusher and write out everything still pending."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=10)
+        self._thread = None
+        self.flush_all()
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            try:
+                self.flush_due()
+            except Exception as e:
+                print(f"Autosave flusher error: {e}")
+
+    # --- buffer operations ---
+
+    def put(self, key, data):
+        """Buffer ``data`` as the new content of ``key``, replacing any pending save."""
+        now = time.monotonic()
+        with self._lock:
+            self._stats["saves"] += 1
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = _Pending(data, now)
+            else:
+                entry.data = data
+                entry.last_update = now
+                entry.saves += 1
+                self._stats["coalesced"] += 1
+        if self._thread is None:
+            self.start()
+
+    def get(self, key):
+        """Return a private copy of the buffered content of ``key``, or None."""
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                return None
+            return copy.deepcopy(entry.data)
+
+    def is_pending(self, key):
+        with self._lock:
+            return key in self._pending
+
+    def discard(self, key):
+        """Forget a pending save without writing it (the record is being removed)."""
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def discard_matching(self, predicate):
+        """Forget every pending save whose key satisfies ``predicate``."""
+        with self._lock:
+            for key in [k for k in self._pending if predicate(k)]:
+                del self._pending[key]
+
+    def write_through(self, key, data):
+        """Write ``data`` for ``key`` now, superseding any pending save of it."""
+        with self._key_lock(key):
+            with self._lock:
+                self._pending.pop(key, None)
+                self._stats["write_through"] += 1
+            self.writer(key, data)
+
+    # --- flushing ---
+
+    def _flush_entry(self, key):
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._pending.pop(key, None)
+            if entry is None:
+                return
+            started = time.monotonic()
+            try:
+                self.writer(key, entry.data)
+            except Exception as e:
+                print(f"Error flushing autosave for {key}: {e}")
+                with self._lock:
+                    self._stats["flush_errors"] += 1
+                    # Keep it for the next attempt unless a newer save arrived
+                    self._pending.setdefault(key, entry)
+                return
+            finished = time.monotonic()
+        flush_ms = (finished - started) * 1000
+        age_ms = (finished - entry.first_dirty) * 1000
+        with self._lock:
+            stats = self._stats
+            stats["flushes"] += 1
+            stats["last_flush_ms"] = flush_ms
+            stats["max_flush_ms"] = max(stats["max_flush_ms"], flush_ms)
+            stats["total_flush_ms"] += flush_ms
+            stats["last_pending_age_ms"] = age_ms
+            stats["max_pending_age_ms"] = max(stats["max_pending_age_ms"], age_ms)
+
+    def flush(self, key):
+        """Write the pending save of ``key`` now, if there is one."""
+        self._flush_entry(key)
+
+    def flush_due(self):
+        """Write every pending save that has been idle or dirty long enough."""
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                key for key, entry in self._pending.items()
+                if now - entry.last_update >= self.idle_delay or now - entry.first_dirty >= self.max_delay
+            ]
+        for key in due:
+            self._flush_entry(key)
+
+    def flush_all(self):
+        with self._lock:
+            keys = list(self._pending)
+        for key in keys:
+            self._flush_entry(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        flushes = stats["flushes"]
+        stats["avg_flush_ms"] = stats["total_flush_ms"] / flushes if flushes else 0.0
+        return stats
@@ -0,0 +1,282 @@
+# bulk_import.py
+"""
+Bulk import of warbands, characters and vehicles from NDJSON.
+
+The input is the export format of ``app.warband_export``, one record per
+line::
+
+    {"type": "warband", "name": "Raiders", "config": {"homebrew_enabled": false}}
+    {"type": "homebrew", "warband": "Raiders", "data": {"traits": [...], ...}}
+    {"type": "character", "warband": "Raiders", "name": "Rook", "data": {...}}
+    {"type": "vehicle", "warband": "Raiders", "name": "Buggy", "data": {...}}
+
+Input is consumed as a stream of byte chunks. Character records are
+buffered and handled ``CHUNK_SIZE`` at a time: the whole chunk is
+validated, priced against its warband's catalogs (including the warband's
+homebrew overlay, ``app.homebrew``) with one ``price_loadouts`` call per
+warband (a character naming an unknown trait, ability or item is
+rejected; missing core fields get the values of a new character), and
+each warband's share of it is written with one
+``CharacterRepository.commit``. A bad record is reported and skipped; it
+never aborts the import. Existing characters and homebrew overlays are
+left alone unless ``overwrite`` is set.
+
+Progress is reported as events. ``POST /api/import`` logs the progress
+events and answers with the counts and the first ``IMPORT_MAX_ERRORS``
+error events; the command line prints them as they happen::
+
+    {"type": "error", "line": 7, "warband": "Raiders", "name": "Rook", "error": "..."}
+    {"type": "progress", "lines": 500, "characters": 498, "errors": 2, "seconds": 0.4}
+    {"type": "done", ...same counters...}
+
+From the command line (the backend comes from ``config.json``):
+
+    python -m app.bulk_import [--overwrite] [FILE]    (default: stdin)
+"""
+
+import json
+import sys
+import time
+
+from app.character_patch import complete_character, store_normalized
+from app.homebrew import HomebrewCatalogs
+from app.points_engine import loadout_from_character, price_loadouts
+from app.storage import valid_record_name
+
+# Characters validated, priced and written together
+CHUNK_SIZE = 500
+# Bytes read at a time by the command line
+READ_SIZE = 64 * 1024
+# Per-record errors the HTTP endpoint sends back (all are counted)
+IMPORT_MAX_ERRORS = 1000
+
+
+class BulkImporter:
+    """Feed NDJSON bytes in, get progress and error events out."""
+
+    def __init__(self, repository, config, overwrite=False, chunk_size=CHUNK_SIZE, catalogs=None):
+        self.repository = repository
+        self.storage = repository.storage
+        self.config = config
+        # Per-warband views of the catalogs, for pricing
+        self.catalogs = catalogs if catalogs is not None else HomebrewCatalogs(self.storage)
+        self.overwrite = overwrite
+        self.chunk_size = chunk_size
+        self.counts = {"lines": 0, "warbands": 0, "homebrew": 0, "characters": 0, "vehicles": 0, "errors": 0}
+        self.started = time.monotonic()
+        self._partial = b""
+        # (line, warband, name, data) of characters waiting for the next chunk
+        self._pending = []
+
+    # --- input ---
+
+    def feed(self, data):
+        """Consume the next bytes of input; returns the events they produced."""
+        events = []
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line, events)
+        return events
+
+    def finish(self):
+        """Handle what is left of the input; returns the final events."""
+        events = []
+        if self._partial.strip():
+            self._line(self._partial, events)
+        self._partial = b""
+        self._flush(events)
+        events.append(dict(self._progress(), type="done"))
+        return events
+
+    # --- records ---
+
+    def _error(self, events, line, message, warband=None, name=None):
+        self.counts["errors"] += 1
+        events.append({"type": "error", "line": line, "warband": warband, "name": name, "error": message})
+
+    def _line(self, raw, events):
+        self.counts["lines"] += 1
+        line = self.counts["lines"]
+        if not raw.strip():
+            return
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            self._error(events, line, f"Invalid JSON: {e}")
+            return
+        if not isinstance(record, dict):
+            self._error(events, line, "Record must be an object")
+            return
+        kind = record.get("type")
+        if kind not in ("warband", "homebrew", "character", "vehicle"):
+            self._error(events, line, f"Unknown record type {kind!r}")
+            return
+        named = kind in ("character", "vehicle")
+        warband = record.get("name") if kind == "warband" else record.get("warband")
+        name = record.get("name") if named else None
+        if not valid_record_name(warband) or (named and not valid_record_name(name)):
+            self._error(events, line, "Invalid warband or record name", warband, name)
+            return
+        if kind == "character":
+            if not isinstance(record.get("data"), dict):
+                self._error(events, line, "Character data must be an object", warband, name)
+                return
+            self._pending.append((line, warband, name, record["data"]))
+            if len(self._pending) >= self.chunk_size:
+                self._flush(events)
+        elif kind == "warband":
+            # Characters after this line are priced with its settings
+            self._flush(events)
+            self._warband(line, warband, record.get("config"), events)
+        elif kind == "homebrew":
+            self._flush(events)
+            self._homebrew(line, warband, record.get("data"), events)
+        else:
+            self._vehicle(line, warband, name, record.get("data"), events)
+
+    def _warband(self, line, warband, config, events):
+        if config is not None and not isinstance(config, dict):
+            self._error(events, line, "Warband config must be an object", warband)
+            return
+        self.storage.create_warband(warband)
+        if config:
+            self.config.update_warband(warband, **config)
+            if "homebrew_enabled" in config:
+                self.repository.index.set_homebrew(warband, self.config.homebrew_enabled(warband))
+        self.counts["warbands"] += 1
+
+    def _homebrew(self, line, warband, data, events):
+        with self.repository.locks.hold(self.catalogs.lock_key(warband)):
+            if not self.overwrite and self.storage.read_homebrew(warband) is not None:
+                self._error(events, line, "Homebrew overlay already exists", warband)
+                return
+            try:
+                self.catalogs.write(warband, data)
+            except ValueError as e:
+                self._error(events, line, f"Invalid homebrew overlay: {e}", warband)
+                return
+        self.counts["homebrew"] += 1
+
+    def _vehicle(self, line, warband, name, data, events):
+        if not isinstance(data, dict):
+            self._error(events, line, "Vehicle data must be an object", warband, name)
+            return
+        if not self.overwrite and self.storage.read_vehicle(warband, name) is not None:
+            self._error(events, line, "Vehicle already exists", warband, name)
+            return
+        self.storage.write_vehicle(warband, name, data)
+        self.repository.index.put_vehicle(warband, name)
+        self.counts["vehicles"] += 1
+
+    # --- character chunks ---
+
+    def _flush(self, events):
+        """Validate, price and write the buffered characters."""
+        chunk, self._pending = self._pending, []
+        if not chunk:
+            return
+        valid = []
+        for line, warband, name, data in chunk:
+            try:
+                character = complete_character(name, data)
+            except ValueError as e:
+                self._error(events, line, str(e), warband, name)
+                continue
+            valid.append((line, warband, name, character))
+
+        # One pricing pass per warband, against its (homebrew) cost tables
+        groups = {}
+        for entry in valid:
+            groups.setdefault(entry[1], []).append(entry)
+        priced = []
+        for warband, entries in groups.items():
+            homebrew = self.config.homebrew_enabled(warband)
+            tables = self.catalogs.cost_tables(warband)
+            results = price_loadouts([loadout_from_character(e[3], homebrew) for e in entries], tables)
+            priced.extend((entry, result, tables) for entry, result in zip(entries, results))
+        by_warband = {}
+        for (line, warband, name, data), result, tables in priced:
+            if "error" in result:
+                self._error(events, line, f"Invalid character: {result['error']}", warband, name)
+                continue
+            # Pricing only reports unknown items; unknown traits and abilities would cost 0
+            unknown = dict(result["unknown"])
+            for kind, costs in (("traits", tables.traits), ("abilities", tables.abilities)):
+                missing = [n for n in result["loadout"][kind] if n not in costs]
+                if missing:
+                    unknown[kind] = missing
+            if unknown:
+                unknown = "; ".join(f"{kind}: {', '.join(names)}" for kind, names in unknown.items())
+                self._error(events, line, f"Not in the catalogs: {unknown}", warband, name)
+                continue
+            character = dict(data, Points=result["points"])
+            # Store what was priced (capped skills, locked speed, no duplicates)
+            store_normalized(character, result["loadout"])
+            # A later record for the same character replaces an earlier one
+            by_warband.setdefault(warband, {})[name] = (line, character)
+
+        for warband, records in by_warband.items():
+            self._write(warband, records, events)
+        events.append(dict(self._progress(), type="progress"))
+
+    def _write(self, warband, records, events):
+        with self.repository.lock(warband, *records):
+            if not self.overwrite:
+                for name in [n for n in records if self.repository.exists(warband, n)]:
+                    line, _ = records.pop(name)
+                    self._error(events, line, "Character already exists", warband, name)
+            if not records:
+                return
+            try:
+                self.repository.commit(warband, {name: c for name, (_, c) in records.items()})
+            except Exception as e:
+                for name, (line, _) in records.items():
+                    self._error(events, line, f"Write failed: {e}", warband, name)
+                return
+        self.counts["characters"] += len(records)
+
+    def _progress(self):
+        return dict(self.counts, seconds=round(time.monotonic() - self.started, 3))
+
+
+def main(argv):
+    from app.character_repository import CharacterRepository
+    from app.config_service import ConfigService
+    from app.storage import open_storage
+
+    overwrite = "--overwrite" in argv
+    paths = [a for a in argv if a != "--overwrite"]
+    if len(paths) > 1 or any(a.startswith("--") for a in paths):
+        print("usage: python -m app.bulk_import [--overwrite] [FILE]")
+        return 2
+    storage = open_storage(ConfigService().global_settings(), "warbands")
+    repository = CharacterRepository(storage)
+    importer = BulkImporter(repository, ConfigService(storage), overwrite=overwrite)
+    source = open(paths[0], "rb") if paths else sys.stdin.buffer
+
+    def report(events):
+        for event in events:
+            if event["type"] == "error":
+                print(f"line {event['line']}: {event['warband']}/{event['name']}: {event['error']}")
+            else:
+                print(f"{event['type']}: {event['characters']} characters, {event['warbands']} warbands, "
+                      f"{event['vehicles']} vehicles, {event['errors']} errors, {event['seconds']}s", file=sys.stderr)
+
+    try:
+        while True:
+            data = source.read(READ_SIZE)
+            if not data:
+                break
+            report(importer.feed(data))
+        report(importer.finish())
+    finally:
+        if paths:
+            source.close()
+        repository.close()
+        storage.close()
+    return 1 if importer.counts["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
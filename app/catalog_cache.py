@@ -0,0 +1,150 @@
+# catalog_cache.py
+"""
+Process-wide cache for the JSON-backed item catalogs.
+
+Each data file is parsed once and kept as an immutable snapshot. Later
+calls only ``stat`` the file; when its mtime or size changes a fresh
+snapshot is parsed and swapped in under a lock, so readers always see
+either the old or the new catalog, never a half-loaded one.
+
+Snapshot data is shared between requests and must be treated as
+read-only. Copy anything you need to modify.
+"""
+
+import json
+import os
+import threading
+
+_snapshots = {}
+_lock = threading.Lock()
+_generation = 0
+
+
+class CatalogSnapshot:
+    """A parsed catalog file plus the file state it was loaded from."""
+
+    __slots__ = ("path", "data", "mtime_ns", "size", "generation", "_derived")
+
+    def __init__(self, path, data, mtime_ns, size, generation):
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "data", data)
+        object.__setattr__(self, "mtime_ns", mtime_ns)
+        object.__setattr__(self, "size", size)
+        object.__setattr__(self, "generation", generation)
+        object.__setattr__(self, "_derived", {})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CatalogSnapshot is immutable")
+
+    @property
+    def version(self):
+        """Cheap identifier that changes whenever the file content changes."""
+        return f"{self.mtime_ns:x}-{self.size:x}"
+
+    def matches(self, st):
+        return st is not None and st.st_mtime_ns == self.mtime_ns and st.st_size == self.size
+
+    def derived(self, key, builder):
+        """Return a structure computed from this snapshot's data, building it once.
+
+        Derived structures (indexes, cost tables) live and die with the
+        snapshot, so they can never get out of step with the catalog.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = builder(self.data)
+            # setdefault keeps the first result if two threads race here
+            return self._derived.setdefault(key, value)
+
+
+class NameIndex:
+    """Exact and case-folded hash lookups over a list of catalog entries.
+
+    When several entries share a name the first one wins, matching the
+    linear scans this replaces.
+    """
+
+    def __init__(self, items, key="name"):
+        self.exact = {}
+        self.folded = {}
+        for item in items:
+            name = item[key]
+            self.exact.setdefault(name, item)
+            self.folded.setdefault(name.lower(), item)
+
+    def __len__(self):
+        return len(self.exact)
+
+    def get(self, name):
+        """Look up an entry by its exact name."""
+        return self.exact.get(name)
+
+    def get_folded(self, name):
+        """Look up an entry by name, ignoring case."""
+        return self.folded.get(name.lower())
+
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def get_snapshot(path, default=None, missing_ok=False):
+    """Return the current snapshot for ``path``, reloading it if the file changed.
+
+    ``default`` is used as the snapshot data when the file is missing or
+    cannot be parsed, mirroring the fallbacks of the individual APIs.
+    ``missing_ok`` suppresses the error message for a file that does not
+    exist (yet).
+    """
+    global _generation
+    st = _stat(path)
+    snapshot = _snapshots.get(path)
+    if snapshot is not None and (snapshot.matches(st) or (st is None and snapshot.size == -1)):
+        return snapshot
+
+    with _lock:
+        # Another thread may have reloaded while we waited for the lock
+        snapshot = _snapshots.get(path)
+        st = _stat(path)
+        if snapshot is not None and (snapshot.matches(st) or (st is None and snapshot.size == -1)):
+            return snapshot
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            mtime_ns, size = st.st_mtime_ns, st.st_size
+        except Exception as e:
+            if not (missing_ok and st is None):
+                print(f"Error loading catalog {path}: {e}")
+            if default is None:
+                raise
+            data = default
+            # Remember the failure against the current file state so a
+            # broken file is not re-parsed on every call
+            mtime_ns, size = (st.st_mtime_ns, st.st_size) if st is not None else (0, -1)
+        _generation += 1
+        snapshot = CatalogSnapshot(path, data, mtime_ns, size, _generation)
+        _snapshots[path] = snapshot
+        return snapshot
+
+
+def load_catalog(path, default=None):
+    """Return the parsed (shared, read-only) data of a catalog file."""
+    return get_snapshot(path, default).data
+
+
+def catalog_generation():
+    """Return a counter that increases every time any catalog is (re)loaded."""
+    return _generation
+
+
+def invalidate(path=None):
+    """Drop the cached snapshot for ``path`` (or every snapshot)."""
+    with _lock:
+        if path is None:
+            _snapshots.clear()
+        else:
+            _snapshots.pop(path, None)
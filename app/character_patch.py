@@ -0,0 +1,190 @@
+# character_patch.py
+"""
+Apply JSON Patch edits to a stored character and re-price them.
+
+``PATCH /api/warbands/{warband}/characters/{name}`` sends only the edit
+(see ``app.json_patch``) instead of the whole edit form::
+
+    [{"op": "add", "path": "/Weapons/-", "value": "Pistol"},
+     {"op": "replace", "path": "/Skills/Agility", "value": 3}]
+
+Only the top-level fields a patch touches are validated and re-priced.
+The points breakdown of each character version the API has seen is
+remembered under the version's ETag, so the new total is that breakdown
+with the touched components swapped out. When the breakdown is not known
+(first patch in this process, a form edit in between, new catalogs) the
+character is priced in full once, which also corrects a stale ``Points``
+and normalizes fields an older version stored out of range.
+"""
+
+import threading
+
+from app.character_repository import clone, content_etag
+from app.json_patch import PatchError, apply_patch
+from app.points_engine import (
+    CHARACTER_FIELDS, SKILLS, PointsMemo, get_cost_tables, loadout_from_character,
+    price_character_fields, price_loadout,
+)
+
+# Fields the server owns; patches may test them but not change them
+READ_ONLY_FIELDS = ('Name', 'Points')
+# Fields that must hold a list of names
+NAME_LIST_FIELDS = ('Traits', 'Abilities', 'Weapons', 'Armour', 'MiscItems', 'Equipment')
+# Fields every stored character has (the edit page relies on them), with
+# the values a new character starts with
+CORE_FIELDS = {
+    'Skills': {skill: 1 for skill in SKILLS},
+    'Speed': 10,
+    'Hit-points': 20,
+    'Traits': [],
+    'Abilities': [],
+    'Equipment': [],
+    'Weapons': [],
+    'Armour': [],
+    'MiscItems': [],
+}
+# Free-text fields of a new character
+TEXT_FIELDS = ('Notes', 'Backstory', 'Injuries', 'CampaignPoints')
+
+# (character ETag, catalog version, homebrew) -> points breakdown
+BREAKDOWN_MEMO = PointsMemo(maxsize=1024)
+
+_stats = {"patches": 0, "delta_priced": 0, "full_priced": 0, "unchanged": 0}
+_stats_lock = threading.Lock()
+
+
+class InvalidCharacter(PatchError):
+    """The patch applies, but the result is not a valid character."""
+
+    status = 422
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_fields(character, fields, read_only=READ_ONLY_FIELDS):
+    """Check the types of the given top-level fields of a patched character."""
+    for field in fields:
+        if field in read_only:
+            raise InvalidCharacter(f"{field} is set by the server and cannot be patched")
+        if field not in character:
+            continue
+        value = character[field]
+        if field in NAME_LIST_FIELDS:
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise InvalidCharacter(f"{field} must be a list of names")
+        elif field == 'Skills':
+            if not isinstance(value, dict):
+                raise InvalidCharacter("Skills must be an object")
+            for skill, level in value.items():
+                if skill not in SKILLS:
+                    raise InvalidCharacter(f"Unknown skill: {skill}")
+                if not _is_int(level):
+                    raise InvalidCharacter(f"Skill {skill} must be an integer")
+        elif field in ('Hit-points', 'Speed'):
+            if not _is_int(value):
+                raise InvalidCharacter(f"{field} must be an integer")
+
+
+def new_character(name):
+    """A new, unpriced character with every core field at its starting value."""
+    character = {'Name': name, 'Points': 10}
+    character.update(clone(CORE_FIELDS))
+    character.update({field: '' for field in TEXT_FIELDS})
+    return character
+
+
+def complete_character(name, body):
+    """Validate a whole character sent by a client and fill in missing core fields.
+
+    Returns a new dict named ``name``; ``Points`` is left for the caller
+    to price. Missing skills start at 1. Raises ``InvalidCharacter``.
+    """
+    if not isinstance(body, dict):
+        raise InvalidCharacter("A character must be an object")
+    fields = [f for f in body if f not in READ_ONLY_FIELDS]
+    validate_fields(body, fields)
+    character = {k: clone(v) for k, v in body.items() if k not in READ_ONLY_FIELDS}
+    for field, default in CORE_FIELDS.items():
+        if field not in character:
+            character[field] = clone(default)
+    character['Skills'] = {**CORE_FIELDS['Skills'], **character['Skills']}
+    character['Name'] = name
+    return character
+
+
+def store_normalized(character, loadout, fields=tuple(CHARACTER_FIELDS)):
+    """Write the priced values of ``fields`` from a normalized ``loadout`` into ``character``.
+
+    A stored character must hold what was priced: de-duplicated
+    traits/abilities, capped skills, locked speed. Otherwise ``Points``
+    contradicts the fields it was computed from.
+    """
+    for field in fields:
+        if field == 'Skills':
+            character['Skills'] = {**(character.get('Skills') or {}), **loadout['skills']}
+        else:
+            character[field] = loadout[CHARACTER_FIELDS[field]]
+
+
+def reprice(etag, changed, fields, homebrew_enabled=False, tables=None):
+    """Re-price ``changed``, an edited copy of the character whose ETag is ``etag``.
+
+    The priced fields of ``changed`` are replaced by their normalized
+    values and ``Points`` is updated. Returns ``(new_etag, breakdown)``;
+    the breakdown is shared with the memo, do not modify it. ``tables``
+    defaults to the shared cost tables (pass a warband's homebrew tables,
+    see ``app.homebrew``).
+    """
+    if tables is None:
+        tables = get_cost_tables()
+    breakdown = BREAKDOWN_MEMO.get((etag, tables.version, homebrew_enabled))
+    known = breakdown is not None
+    if known:
+        # A known version was stored normalized, so only the touched fields can be off
+        breakdown = dict(breakdown)
+        priced_fields = [f for f in fields if f in CHARACTER_FIELDS]
+        if priced_fields:
+            costs, result = price_character_fields(changed, priced_fields, homebrew_enabled, tables)
+            breakdown.update(costs)
+            store_normalized(changed, result['loadout'], priced_fields)
+    else:
+        # Unknown version (older file, form edit, new catalogs or homebrew
+        # setting): price it in full and normalize the untouched fields too
+        result = price_loadout(loadout_from_character(changed, homebrew_enabled), tables)
+        breakdown = dict(result['breakdown'])
+        store_normalized(changed, result['loadout'])
+    changed['Points'] = sum(breakdown.values())
+    with _stats_lock:
+        _stats["delta_priced" if known else "full_priced"] += 1
+
+    new_etag = content_etag(changed)
+    BREAKDOWN_MEMO.put((new_etag, tables.version, homebrew_enabled), breakdown)
+    return new_etag, breakdown
+
+
+def patch_character(character, etag, operations, homebrew_enabled=False, tables=None):
+    """Apply a patch to a character whose current ETag is ``etag``.
+
+    ``character`` is not modified. Returns ``(patched, new_etag)``, or
+    ``(character, etag)`` when the patch changes nothing (e.g. only tests).
+    Raises ``PatchError`` (or a subclass) with the HTTP status to report.
+    """
+    patched, touched = apply_patch(character, operations)
+    validate_fields(patched, touched)
+    with _stats_lock:
+        _stats["patches"] += 1
+    if patched == character:
+        with _stats_lock:
+            _stats["unchanged"] += 1
+        return character, etag
+    new_etag, _ = reprice(etag, patched, touched, homebrew_enabled, tables)
+    return patched, new_etag
+
+
+def patch_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["breakdowns"] = BREAKDOWN_MEMO.stats()
+    return stats
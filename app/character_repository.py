@@ -0,0 +1,251 @@
+# character_repository.py
+"""
+Character repository: the one place that reads and writes characters.
+
+Parsed characters are kept in a bounded in-memory LRU. The bound is on
+bytes (the stored size of each character), so a few huge characters
+cannot crowd out memory the way an entry-count limit would. Every read
+re-validates the entry against the storage backend's version token for
+that character (mtime and size for files), so edits made outside the app
+are picked up, and saves write through and refresh the cache in one step.
+
+Autosaves from the edit page are parked in the repository's write-behind
+buffer (see ``app.autosave``); reads see buffered state first. Every save
+and removal is also reported to the warband summary index (see
+``app.warband_index``) so dashboard totals stay current.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from app.autosave import WriteBehindBuffer
+from app.locks import KeyedLocks
+from app.warband_index import WarbandIndex
+
+# Default cache budget, in bytes of character JSON
+CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+
+def clone(value):
+    """Copy a JSON-shaped value (dicts, lists, scalars); much cheaper than deepcopy."""
+    if isinstance(value, dict):
+        return {k: clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [clone(v) for v in value]
+    return value
+
+
+def content_etag(data):
+    """Strong ETag for a JSON-shaped value: a hash of its canonical encoding."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+class _Entry:
+    __slots__ = ("data", "version", "size")
+
+    def __init__(self, data, version, size):
+        self.data = data
+        self.version = version
+        self.size = size
+
+
+class CharacterRepository:
+    """Cached, write-through access to the characters in a storage backend."""
+
+    def __init__(self, storage, max_bytes=CACHE_MAX_BYTES):
+        self.storage = storage
+        self.max_bytes = max_bytes
+        # Per-character locks shared by routes, saves and autosave flushes
+        self.locks = KeyedLocks(storage.lock_dir)
+        # Pending autosaves are keyed by (warband, name)
+        self.autosave = WriteBehindBuffer(writer=self._write, key_lock=self.locks.hold)
+        self.index = WarbandIndex(storage, load_character=self.peek)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "writes": 0}
+        # False when other processes write the same characters (several server
+        # workers): a buffered autosave would later overwrite their changes
+        self.defer_autosaves = True
+
+    # --- cache bookkeeping (callers hold self._lock) ---
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _store(self, key, data, version, size):
+        self._drop(key)
+        entry = _Entry(data, version, size)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._stats["evictions"] += 1
+
+    def _write(self, key, data):
+        """Write a character to storage and cache what was written."""
+        version, size = self.storage.write_character(key[0], key[1], data)
+        with self._lock:
+            self._stats["writes"] += 1
+            self._store(key, clone(data), version, size)
+        self.index.put_character(key[0], key[1], data)
+
+    # --- reads ---
+
+    def _load(self, warband, name):
+        """Return the shared cached dict for a character (or None if it does not exist)."""
+        key = (warband, name)
+        version = self.storage.character_version(warband, name)
+        if version is None:
+            with self._lock:
+                self._drop(key)
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.version == version:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry.data
+                # Changed in storage since it was cached
+                self._stats["stale"] += 1
+            self._stats["misses"] += 1
+        loaded = self.storage.read_character(warband, name)
+        if loaded is None:
+            return None
+        data, version, size = loaded
+        with self._lock:
+            self._store(key, data, version, size)
+        return data
+
+    def exists(self, warband, name):
+        return self.autosave.is_pending((warband, name)) or self.storage.character_version(warband, name) is not None
+
+    def get(self, warband, name):
+        """Return a private copy of a character that the caller may modify, or None."""
+        pending = self.autosave.get((warband, name))
+        if pending is not None:
+            return pending
+        data = self._load(warband, name)
+        return clone(data) if data is not None else None
+
+    def peek(self, warband, name):
+        """Return a character for read-only use (shared with the cache), or None."""
+        pending = self.autosave.get((warband, name))
+        if pending is not None:
+            return pending
+        return self._load(warband, name)
+
+    def read(self, warband, name):
+        """Like ``peek``, but a cache miss is not added to the cache.
+
+        For bulk scans (exports) that would otherwise push every hot
+        character out of the cache.
+        """
+        pending = self.autosave.get((warband, name))
+        if pending is not None:
+            return pending
+        with self._lock:
+            entry = self._entries.get((warband, name))
+        if entry is not None and entry.version == self.storage.character_version(warband, name):
+            return entry.data
+        loaded = self.storage.read_character(warband, name)
+        return loaded[0] if loaded is not None else None
+
+    # --- writes ---
+
+    def lock(self, warband, *names):
+        """Hold the locks of the named characters across threads and processes.
+
+        Read-modify-write callers wrap their ``get`` ... ``save`` in this,
+        so concurrent requests for the same character cannot lose updates::
+
+            with CHARACTERS.lock(warband, name):
+                character = CHARACTERS.get(warband, name)
+                ...
+                CHARACTERS.save(warband, name, character)
+        """
+        return self.locks.hold(*[(warband, name) for name in names])
+
+    def save(self, warband, name, character):
+        """Write a character now, superseding any pending autosave."""
+        self.autosave.write_through((warband, name), character)
+
+    def save_deferred(self, warband, name, character):
+        """Buffer an autosave of a character; it is written when the buffer flushes.
+
+        With ``defer_autosaves`` off it is written now, like ``save``; the
+        caller holds the character's lock either way.
+        """
+        if not self.defer_autosaves:
+            self.save(warband, name, character)
+            return
+        self.autosave.put((warband, name), clone(character))
+        # Count the new points on the dashboard before the character is flushed
+        self.index.put_character(warband, name, character)
+
+    def commit(self, warband, writes, deletes=()):
+        """Write ``writes`` ({name: data}) and delete ``deletes`` in one atomic storage commit.
+
+        Pending autosaves of those characters are superseded, and the
+        warband summary is updated once for the whole change set.
+        """
+        keys = [(warband, name) for name in (*writes, *deletes)]
+        with self.locks.hold(*keys):
+            for key in keys:
+                self.autosave.discard(key)
+            versions = self.storage.commit_characters(warband, writes, deletes)
+            with self._lock:
+                for name, (version, size) in versions.items():
+                    self._stats["writes"] += 1
+                    self._store((warband, name), clone(writes[name]), version, size)
+                for name in deletes:
+                    self._drop((warband, name))
+        self.index.apply_changes(warband, writes, deletes)
+
+    def delete(self, warband, name):
+        """Remove a character and any cached or pending state for it."""
+        key = (warband, name)
+        with self.lock(warband, name):
+            self.autosave.discard(key)
+            with self._lock:
+                self._drop(key)
+            self.storage.delete_character(warband, name)
+        self.index.remove_character(warband, name)
+
+    def forget_warband(self, warband):
+        """Drop cached and pending state for every character of a (deleted) warband."""
+        self.autosave.discard_matching(lambda key: key[0] == warband)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == warband]:
+                self._drop(key)
+        self.index.forget(warband)
+
+    # --- lifecycle / metrics ---
+
+    def start(self):
+        # Finish multi-character commits a crash interrupted, before serving
+        self.storage.recover_transactions(lock=lambda warband, names: self.lock(warband, *names))
+        self.autosave.start()
+
+    def close(self):
+        """Flush pending autosaves; call at shutdown."""
+        self.autosave.stop()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+        reads = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / reads if reads else 0.0
+        stats["backend"] = self.storage.name
+        stats["locks"] = self.locks.stats()
+        return stats
@@ -0,0 +1,159 @@
+# config_service.py
+"""
+Cached access to the global ``config.json`` and each warband's config
+(``warband_config.json`` in the file backend, see ``app.storage``).
+
+Configs are parsed once and re-read only when their version (mtime and
+size for files) changes, or when the app writes them through
+``update_warband``. Callers get small settings objects with the homebrew
+flag already coerced to a bool, instead of opening and parsing the files
+on every request.
+
+A warband without a readable config of its own follows the global
+config, which in turn defaults to homebrew disabled.
+"""
+
+import json
+import os
+import threading
+
+GLOBAL_CONFIG_FILE = "config.json"
+
+
+def as_bool(value):
+    """Coerce a config flag that may have been saved as "true"/"false"."""
+    if isinstance(value, str):
+        return value.lower() == "true"
+    return bool(value)
+
+
+class GlobalSettings:
+    __slots__ = ("homebrew_enabled", "raw")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.homebrew_enabled = as_bool(raw.get("homebrew_enabled", False))
+
+
+class WarbandSettings:
+    """Effective settings of one warband."""
+
+    __slots__ = ("warband", "homebrew_enabled", "source", "created_at", "raw")
+
+    def __init__(self, warband, homebrew_enabled, source, raw):
+        self.warband = warband
+        self.homebrew_enabled = homebrew_enabled
+        # "warband" when read from the warband's own config, else "global"
+        self.source = source
+        self.created_at = raw.get("created_at")
+        self.raw = raw
+
+
+class _CachedConfig:
+    __slots__ = ("version", "data")
+
+    def __init__(self, version, data):
+        self.version = version
+        self.data = data
+
+
+def _file_version(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _read_json_file(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+class ConfigService:
+    """Global settings from ``global_path``; warband settings from a storage backend."""
+
+    def __init__(self, storage=None, global_path=GLOBAL_CONFIG_FILE):
+        self.storage = storage
+        self.global_path = global_path
+        self._configs = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "loads": 0, "errors": 0, "writes": 0}
+
+    def _read(self, key, version, load):
+        """Return the parsed config for ``key``; None if it is missing or unreadable.
+
+        ``version`` is the current version token of the config (None when
+        it does not exist) and ``load()`` parses it.
+        """
+        if version is None:
+            with self._lock:
+                self._configs.pop(key, None)
+            return None
+        with self._lock:
+            cached = self._configs.get(key)
+            if cached is not None and cached.version == version:
+                self._stats["hits"] += 1
+                return cached.data
+        try:
+            data = load()
+            if not isinstance(data, dict):
+                raise ValueError("config is not a JSON object")
+        except Exception as e:
+            print(f"Error reading config {key}: {e}")
+            data = None
+            with self._lock:
+                self._stats["errors"] += 1
+        with self._lock:
+            self._stats["loads"] += 1
+            # Unreadable configs are cached too, so a broken config is not
+            # re-parsed on every request until it changes
+            self._configs[key] = _CachedConfig(version, data)
+        return data
+
+    def _read_global(self):
+        path = self.global_path
+        return self._read(path, _file_version(path), lambda: _read_json_file(path))
+
+    def _read_warband(self, warband):
+        storage = self.storage
+        return self._read(
+            ("warband", warband),
+            storage.config_version(warband),
+            lambda: storage.read_config(warband),
+        )
+
+    def global_settings(self):
+        return GlobalSettings(self._read_global() or {})
+
+    def warband_settings(self, warband):
+        raw = self._read_warband(warband)
+        if raw is not None:
+            return WarbandSettings(warband, as_bool(raw.get("homebrew_enabled", False)), "warband", raw)
+        return WarbandSettings(warband, self.global_settings().homebrew_enabled, "global", {})
+
+    def homebrew_enabled(self, warband):
+        return self.warband_settings(warband).homebrew_enabled
+
+    def update_warband(self, warband, **changes):
+        """Merge ``changes`` into a warband's config, keeping other keys."""
+        config = dict(self._read_warband(warband) or {})
+        config.update(changes)
+        self.storage.write_config(warband, config)
+        self.invalidate(("warband", warband))
+        with self._lock:
+            self._stats["writes"] += 1
+        return config
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._configs.clear()
+            else:
+                self._configs.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["configs"] = len(self._configs)
+        return stats
@@ -0,0 +1,67 @@
+# custom_content.py
+"""
+Shared store for custom traits, abilities and arcana.
+
+The built-in catalogs are immutable module data, loaded once before the
+server forks its workers (see ``app.server``). Custom entries live in
+``custom_content.json`` beside ``config.json`` instead of in per-process
+lists, so every worker process sees the same catalog::
+
+    {"traits": [{"name": "...", "cost": 5, "effect": "..."}],
+     "abilities": [...],
+     "arcana": [{"roll": 13, "name": "...", "effect": "..."}]}
+
+Reads go through ``app.catalog_cache``: a worker only ``stat``s the file
+and re-parses it after another worker changed it. ``add_entry`` holds a
+lock shared by all processes, re-reads the file and replaces it
+atomically, so two workers adding at once cannot lose an entry.
+"""
+
+from app.catalog_cache import get_snapshot, invalidate
+from app.locks import KeyedLocks
+from app.storage import read_json, write_json
+
+CUSTOM_CONTENT_FILE = "custom_content.json"
+KINDS = ("traits", "abilities", "arcana")
+
+_locks = KeyedLocks(f"{CUSTOM_CONTENT_FILE}.locks")
+
+
+def custom_content_snapshot():
+    """The current custom content (shared, read-only); ``{}`` when nothing was added yet."""
+    return get_snapshot(CUSTOM_CONTENT_FILE, {}, missing_ok=True)
+
+
+def custom_entries(data, kind):
+    """The well-formed custom entries of ``kind`` in parsed store ``data``."""
+    entries = data.get(kind) if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        return ()
+    return tuple(e for e in entries if isinstance(e, dict) and isinstance(e.get("name"), str))
+
+
+def add_entry(kind, name, build):
+    """Append ``build(existing entries of kind)`` to the store unless ``name`` is taken.
+
+    Names compare case-insensitively, like the catalog lookups. Returns
+    True if the entry was added.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown custom content kind: {kind}")
+    with _locks.hold(("custom_content",)):
+        # Re-read under the lock: the cached snapshot may predate another worker's write
+        try:
+            data = read_json(CUSTOM_CONTENT_FILE)
+        except FileNotFoundError:
+            data = {}
+        if not isinstance(data, dict):
+            raise ValueError(f"{CUSTOM_CONTENT_FILE} is not a JSON object")
+        existing = custom_entries(data, kind)
+        if any(e["name"].lower() == name.lower() for e in existing):
+            return False
+        data = dict(data)
+        data[kind] = list(existing) + [build(existing)]
+        write_json(CUSTOM_CONTENT_FILE, data, indent=2, fsync=True)
+    # Other workers notice the new file on their next stat
+    invalidate(CUSTOM_CONTENT_FILE)
+    return True
@@ -0,0 +1,293 @@
+# homebrew.py
+"""
+Per-warband homebrew content, layered over the shared catalogs.
+
+A warband's overlay adds (or redefines) traits, abilities and arcana for
+that warband only. It is stored by the backend next to the warband
+config (``warband_homebrew.json`` in the file layout)::
+
+    {"traits": [{"name": "Lucky", "cost": 5, "effect": "...", "modifiers": {"Agility": 1}}],
+     "abilities": [{"name": "Dodge", "cost": 10, "effect": "..."}],
+     "arcana": [{"name": "Glow", "effect": "..."}]}
+
+``HomebrewCatalogs.view(warband)`` returns a ``WarbandCatalog``. A lookup
+tries the overlay's name index and then the base index (built-in plus
+``app.custom_content``): two hash lookups, and nothing of the base
+catalogs is copied per warband. An overlay entry shadows a base entry of
+the same name. Views of warbands with an overlay are kept in an LRU of
+``VIEW_CACHE_SIZE`` and rebuilt only when that warband's overlay version
+changes; changes to the base catalogs are seen through the live base
+indexes. A warband without an overlay (or a name that is not a warband
+at all; clients supply these) gets the one shared view, uncached.
+
+``WarbandCatalog.cost_tables()`` layers the overlay costs over the shared
+``CostTables`` with ``ChainMap``s. Its version includes the overlay
+version, so memoized prices never mix catalogs. A warband without an
+overlay gets the shared tables themselves and prices exactly as before.
+"""
+
+import threading
+from collections import ChainMap, OrderedDict
+
+from app.abilities_api import get_ability_index, list_abilities
+from app.arcana_api import get_arcana_index, list_arcana
+from app.catalog_cache import NameIndex
+from app.points_engine import SKILLS, CatalogBundle, CostTables, get_catalog_bundle, get_cost_tables
+from app.storage import valid_record_name
+from app.traits_api import get_trait_index, list_traits
+
+OVERLAY_KINDS = ("traits", "abilities", "arcana")
+# Warbands whose overlay views are kept
+VIEW_CACHE_SIZE = 256
+# Kinds whose entries carry a cost
+PRICED_KINDS = ("traits", "abilities")
+
+_BASE_INDEXES = {
+    "traits": get_trait_index,
+    "abilities": get_ability_index,
+    "arcana": get_arcana_index,
+}
+_BASE_LISTS = {
+    "traits": list_traits,
+    "abilities": list_abilities,
+    "arcana": list_arcana,
+}
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _entry(kind, raw, position):
+    """A cleaned copy of one overlay entry; raises ValueError."""
+    where = f"{kind}[{position}]"
+    if not isinstance(raw, dict):
+        raise ValueError(f"{where} must be an object")
+    name = raw.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError(f"{where} needs a name")
+    effect = raw.get("effect", "")
+    if not isinstance(effect, str):
+        raise ValueError(f"{where}: effect must be a string")
+    entry = {"name": name.strip(), "effect": effect}
+    if kind in PRICED_KINDS:
+        if not _is_int(raw.get("cost")):
+            raise ValueError(f"{where}: cost must be an integer")
+        entry["cost"] = raw["cost"]
+        modifiers = raw.get("modifiers", {})
+        if not isinstance(modifiers, dict) or any(
+            stat not in SKILLS or not _is_int(value) for stat, value in modifiers.items()
+        ):
+            raise ValueError(f"{where}: modifiers must map skills to integers")
+        entry["modifiers"] = dict(modifiers)
+    elif "roll" in raw:
+        if not _is_int(raw["roll"]):
+            raise ValueError(f"{where}: roll must be an integer")
+        entry["roll"] = raw["roll"]
+    return entry
+
+
+def validate_overlay(overlay):
+    """Check an overlay document and return a cleaned copy; raises ValueError."""
+    if not isinstance(overlay, dict):
+        raise ValueError("Homebrew overlay must be an object")
+    unknown = set(overlay) - set(OVERLAY_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown homebrew kinds: {', '.join(sorted(unknown))}")
+    cleaned = {}
+    for kind in OVERLAY_KINDS:
+        entries = overlay.get(kind, [])
+        if not isinstance(entries, list):
+            raise ValueError(f"{kind} must be a list")
+        seen = set()
+        cleaned[kind] = []
+        for position, raw in enumerate(entries):
+            entry = _entry(kind, raw, position)
+            if entry["name"].lower() in seen:
+                raise ValueError(f"{kind}: duplicate name {entry['name']}")
+            seen.add(entry["name"].lower())
+            cleaned[kind].append(entry)
+    return cleaned
+
+
+class WarbandCatalog:
+    """The catalogs as one warband sees them: its overlay over the shared catalogs."""
+
+    def __init__(self, warband, version, overlay):
+        self.warband = warband
+        # The overlay's storage version token (None: no overlay)
+        self.version = version
+        self.overlay = overlay
+        self._indexes = {kind: NameIndex(entries) for kind, entries in overlay.items() if entries}
+        self._costs = {kind: {e["name"]: e["cost"] for e in overlay.get(kind, ())} for kind in PRICED_KINDS}
+        # kind -> (base list it was merged with, merged tuple)
+        self._lists = {}
+        # (shared tables, layered tables)
+        self._tables = None
+        self._bundle = None
+        self._lock = threading.Lock()
+
+    @property
+    def has_overlay(self):
+        return bool(self._indexes)
+
+    def get(self, kind, name):
+        """The entry named ``name`` (case-insensitive), overlay first; None if unknown."""
+        index = self._indexes.get(kind)
+        entry = index.get_folded(name) if index is not None else None
+        if entry is None:
+            entry = _BASE_INDEXES[kind]().get_folded(name)
+        return entry
+
+    def get_trait(self, name):
+        """Like ``traits_api.get_trait``, overlay first."""
+        trait = self.get("traits", name)
+        return trait if trait is not None else {"name": name, "modifiers": {}}
+
+    def get_ability(self, name):
+        """Like ``abilities_api.get_ability``, overlay first."""
+        ability = self.get("abilities", name)
+        return ability if ability is not None else {"name": name, "modifiers": {}}
+
+    def list(self, kind):
+        """Every entry of ``kind``: base entries not shadowed by the overlay, then the overlay's."""
+        base = _BASE_LISTS[kind]()
+        index = self._indexes.get(kind)
+        if index is None:
+            return base
+        cached = self._lists.get(kind)
+        if cached is not None and cached[0] is base:
+            return cached[1]
+        merged = tuple(e for e in base if index.get_folded(e["name"]) is None)
+        merged += tuple(index.exact.values())
+        self._lists[kind] = (base, merged)
+        return merged
+
+    def cost_tables(self):
+        """Cost tables with this warband's overlay costs layered over the shared ones."""
+        base = get_cost_tables()
+        costs = self._costs
+        if not any(costs.values()):
+            return base
+        with self._lock:
+            if self._tables is not None and self._tables[0] is base:
+                return self._tables[1]
+            tables = CostTables(
+                key=base.key + ("homebrew", self.warband, self.version),
+                traits=ChainMap(costs["traits"], base.traits),
+                abilities=ChainMap(costs["abilities"], base.abilities),
+                weapons=base.weapons,
+                armour=base.armour,
+                misc_items=base.misc_items,
+            )
+            self._tables = (base, tables)
+            return tables
+
+    def catalog_bundle(self):
+        """The client-side pricing bundle for ``cost_tables()``."""
+        tables = self.cost_tables()
+        if tables is get_cost_tables():
+            return get_catalog_bundle()
+        with self._lock:
+            if self._bundle is None or self._bundle.tables_version != tables.version:
+                self._bundle = CatalogBundle(tables)
+            return self._bundle
+
+
+# The view of every warband without an overlay: the shared catalogs
+SHARED_VIEW = WarbandCatalog(None, None, {})
+
+
+class HomebrewCatalogs:
+    """Cached ``WarbandCatalog`` views of the warbands in a storage backend."""
+
+    def __init__(self, storage, max_views=VIEW_CACHE_SIZE):
+        self.storage = storage
+        self.max_views = max_views
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "loads": 0, "shared": 0, "errors": 0, "writes": 0, "evictions": 0}
+
+    def view(self, warband):
+        """The catalog view of ``warband``; re-read only when its overlay changed."""
+        version = self.storage.homebrew_version(warband) if valid_record_name(warband) else None
+        if version is None:
+            # No overlay, or no such warband: nothing to cache
+            with self._lock:
+                self._views.pop(warband, None)
+                self._stats["shared"] += 1
+            return SHARED_VIEW
+        with self._lock:
+            cached = self._views.get(warband)
+            if cached is not None and cached.version == version:
+                self._views.move_to_end(warband)
+                self._stats["hits"] += 1
+                return cached
+        try:
+            overlay = validate_overlay(self.storage.read_homebrew(warband) or {})
+        except Exception as e:
+            # A broken overlay is reported once per version, not on every lookup
+            print(f"Error reading homebrew overlay of {warband}: {e}")
+            overlay = {}
+            with self._lock:
+                self._stats["errors"] += 1
+        view = WarbandCatalog(warband, version, overlay)
+        with self._lock:
+            self._views[warband] = view
+            self._views.move_to_end(warband)
+            self._stats["loads"] += 1
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+                self._stats["evictions"] += 1
+        return view
+
+    def cost_tables(self, warband):
+        return self.view(warband).cost_tables()
+
+    def read(self, warband):
+        """The stored overlay of ``warband`` (cleaned), or None if it has none."""
+        overlay = self.storage.read_homebrew(warband)
+        return validate_overlay(overlay) if overlay is not None else None
+
+    def write(self, warband, overlay):
+        """Validate and store a whole overlay; returns what was stored.
+
+        The caller holds the warband's homebrew lock (``lock_key``).
+        """
+        cleaned = validate_overlay(overlay)
+        self.storage.write_homebrew(warband, cleaned)
+        with self._lock:
+            self._views.pop(warband, None)
+            self._stats["writes"] += 1
+        return cleaned
+
+    def add_entry(self, warband, kind, entry):
+        """Add one entry to a warband's overlay; False if the overlay already has that name."""
+        if kind not in OVERLAY_KINDS:
+            raise ValueError(f"Unknown homebrew kind: {kind}")
+        overlay = self.read(warband) or {k: [] for k in OVERLAY_KINDS}
+        cleaned = _entry(kind, entry, len(overlay[kind]))
+        if any(e["name"].lower() == cleaned["name"].lower() for e in overlay[kind]):
+            return False
+        if kind == "arcana" and "roll" not in cleaned:
+            cleaned["roll"] = len(self.view(warband).list("arcana")) + 1
+        overlay[kind].append(cleaned)
+        self.write(warband, overlay)
+        return True
+
+    @staticmethod
+    def lock_key(warband):
+        # Character names cannot start with a dot, so this never clashes with one
+        return (warband, ".homebrew")
+
+    def forget(self, warband):
+        with self._lock:
+            self._views.pop(warband, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_views"] = len(self._views)
+            stats["overlays"] = sum(1 for v in self._views.values() if v.has_overlay)
+        stats["max_views"] = self.max_views
+        return stats
@@ -0,0 +1,162 @@
+# io_executor.py
+"""
+Dedicated, size-bounded thread pool for blocking storage work.
+
+Async handlers must never touch the disk on the event loop, and they
+should not share Starlette's default threadpool with every sync handler
+either: one slow disk would then hold up unrelated requests. Storage
+calls instead go through ``IOExecutor.run``, which runs them on
+``workers`` threads of its own.
+
+At most ``workers + max_queue`` calls are handed to the pool at once.
+Further callers wait on the event loop (without blocking it) for a free
+slot, so a disk stall shows up as a growing ``waiting`` count instead of
+an unbounded backlog of queued work.
+
+``stats()`` reports queue depth and how long calls waited before a
+thread picked them up.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+IO_WORKERS = 8
+# Calls queued in the pool behind the busy workers before callers wait
+IO_MAX_QUEUE = 64
+
+
+def _resolve(waiter, executor):
+    """Hand a freed slot to a waiter (runs on the waiter's loop)."""
+    if waiter.cancelled():
+        # It gave up after the slot was passed on; pass it on again
+        executor._release()
+    else:
+        waiter.set_result(None)
+
+
+class IOExecutor:
+    """Awaitable, bounded front for a ``ThreadPoolExecutor``."""
+
+    def __init__(self, workers=IO_WORKERS, max_queue=IO_MAX_QUEUE, name="storage-io"):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.name = name
+        # Started on first use, so the executor can be shut down and reused
+        self._pool = None
+        self._lock = threading.Lock()
+        # Calls handed to the pool that have not finished (queued or running)
+        self._in_flight = 0
+        self._running = 0
+        # (loop, future) of callers waiting for a slot, oldest first
+        self._waiters = deque()
+        self._stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "throttled": 0,
+            "max_queue_depth": 0, "wait_ms": 0.0, "max_wait_ms": 0.0, "run_ms": 0.0,
+        }
+
+    # --- slots ---
+
+    async def _acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._in_flight < self.workers + self.max_queue:
+                self._in_flight += 1
+                return
+            waiter = loop.create_future()
+            entry = (loop, waiter)
+            self._waiters.append(entry)
+            self._stats["throttled"] += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    raise
+            if waiter.done() and not waiter.cancelled():
+                # The slot arrived just before the cancellation
+                self._release()
+            raise
+
+    def _release(self, _future=None):
+        """Free a slot, or pass it straight to the next waiter (any thread)."""
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(_resolve, waiter, self)
+                    return
+                except RuntimeError:
+                    # That caller's loop has closed
+                    continue
+            self._in_flight -= 1
+
+    # --- calls ---
+
+    def _call(self, fn, queued_at):
+        started = time.perf_counter()
+        waited = (started - queued_at) * 1000
+        with self._lock:
+            self._running += 1
+            self._stats["wait_ms"] += waited
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], waited)
+        ok = False
+        try:
+            result = fn()
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._stats["completed" if ok else "failed"] += 1
+                self._stats["run_ms"] += (time.perf_counter() - started) * 1000
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the pool and return its result."""
+        queued_at = time.perf_counter()
+        await self._acquire()
+        try:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+                pool = self._pool
+            future = pool.submit(self._call, partial(fn, *args, **kwargs), queued_at)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the call finishes, or when it is cancelled before it starts
+        future.add_done_callback(self._release)
+        with self._lock:
+            self._stats["submitted"] += 1
+            depth = self._in_flight - self._running
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+        return await asyncio.wrap_future(future)
+
+    # --- lifecycle / metrics ---
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["running"] = self._running
+            stats["queued"] = self._in_flight - self._running
+            stats["waiting"] = len(self._waiters)
+        finished = stats["completed"] + stats["failed"]
+        started = finished + stats["running"]
+        stats["avg_wait_ms"] = round(stats["wait_ms"] / started, 3) if started else 0.0
+        stats["avg_run_ms"] = round(stats["run_ms"] / finished, 3) if finished else 0.0
+        stats["wait_ms"] = round(stats["wait_ms"], 3)
+        stats["max_wait_ms"] = round(stats["max_wait_ms"], 3)
+        stats["run_ms"] = round(stats["run_ms"], 3)
+        stats["workers"] = self.workers
+        stats["max_queue"] = self.max_queue
+        return stats
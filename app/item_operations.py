@@ -0,0 +1,105 @@
+# item_operations.py
+"""
+Batches of item add/remove operations on one character.
+
+``POST /api/warbands/{warband}/characters/{name}/items`` replaces the
+``add_weapon`` / ``remove_armour`` / ... round trips of the list builder
+with one request::
+
+    {"operations": [
+        {"op": "add", "kind": "weapon", "name": "Pistol"},
+        {"op": "remove", "kind": "armour", "name": "Flak jacket"},
+        {"op": "add", "kind": "trait", "name": "Brawler"}
+    ]}
+
+Kinds are ``weapon``, ``armour``, ``misc_item``, ``trait`` and
+``ability``. Adds follow the rules of the single-item routes: weapons
+may be carried more than once, everything else only once, and without
+homebrew a new armour replaces the one worn. Removing takes out one
+copy. Names must exist in the catalogs.
+
+The batch is all-or-nothing: every operation is checked against the
+character as the earlier operations left it, and nothing is written
+unless all of them apply. The character is read once, re-priced for the
+touched lists only (see ``app.character_patch``) and written once.
+"""
+
+from app.character_patch import InvalidCharacter, reprice
+from app.json_patch import PatchConflict, PatchError
+from app.points_engine import get_cost_tables
+
+# Operation kind -> (character field, cost table)
+ITEM_KINDS = {
+    "weapon": ("Weapons", "weapons"),
+    "armour": ("Armour", "armour"),
+    "misc_item": ("MiscItems", "misc_items"),
+    "trait": ("Traits", "traits"),
+    "ability": ("Abilities", "abilities"),
+}
+
+
+def _check(operation, position):
+    """Return (op, kind, name) of a well-formed operation."""
+    if not isinstance(operation, dict):
+        raise PatchError(f"Operation {position} must be an object")
+    op, kind, name = operation.get("op"), operation.get("kind"), operation.get("name")
+    if op not in ("add", "remove"):
+        raise PatchError(f"Operation {position}: op must be 'add' or 'remove'")
+    if kind not in ITEM_KINDS:
+        raise PatchError(f"Operation {position}: kind must be one of {', '.join(ITEM_KINDS)}")
+    if not isinstance(name, str) or not name.strip():
+        raise PatchError(f"Operation {position}: name must be a non-empty string")
+    return op, kind, name.strip()
+
+
+def apply_item_operations(character, operations, homebrew_enabled=False, tables=None):
+    """Apply a batch of item operations to a copy of ``character``.
+
+    Returns ``(updated, fields)``: the new character (sharing untouched
+    fields with ``character``, which is not modified) and the fields the
+    batch changed. Raises ``PatchError`` (or a subclass) if any operation
+    is malformed or does not apply.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise PatchError("operations must be a non-empty list")
+    if tables is None:
+        tables = get_cost_tables()
+    updated = dict(character)
+    fields = set()
+    for position, operation in enumerate(operations):
+        op, kind, name = _check(operation, position)
+        field, table = ITEM_KINDS[kind]
+        if field not in fields:
+            # First change to this list: take a private copy
+            current = updated.get(field) or []
+            if not isinstance(current, list):
+                raise InvalidCharacter(f"{field} is not a list")
+            updated[field] = list(current)
+            fields.add(field)
+        items = updated[field]
+        if op == "remove":
+            if name not in items:
+                raise PatchConflict(f"Operation {position}: {name} is not in {field}")
+            items.remove(name)
+            continue
+        if name not in getattr(tables, table):
+            raise InvalidCharacter(f"Operation {position}: unknown {kind} {name}")
+        if kind == "weapon":
+            # Weapons may be carried more than once
+            items.append(name)
+        elif kind == "armour" and not homebrew_enabled and items and name not in items:
+            # Only one armour without homebrew: the new one replaces it
+            items[:] = [name]
+        elif name not in items:
+            items.append(name)
+    return updated, fields
+
+
+def apply_and_price(character, etag, operations, homebrew_enabled=False, tables=None):
+    """Apply a batch and re-price it; returns ``(updated, new_etag, breakdown)``.
+
+    ``new_etag == etag`` means the batch changed nothing and need not be written.
+    """
+    updated, fields = apply_item_operations(character, operations, homebrew_enabled, tables)
+    new_etag, breakdown = reprice(etag, updated, fields, homebrew_enabled, tables)
+    return updated, new_etag, breakdown
@@ -0,0 +1,398 @@
+# journal_storage.py
+"""
+Journaled storage backend: the file layout plus a per-warband mutation log.
+
+Characters are stored as in ``FileStorage`` (``<warband>/<name>.json``),
+but those files are only snapshots. A character save does not rewrite
+the file; it appends one compact JSON line to ``<warband>/journal.log``
+holding just the top-level fields that changed, e.g. adding a weapon
+logs the new ``Weapons`` list and ``Points``:
+
+    {"s":12,"op":"put","c":"Rook","set":{"Weapons":[...],"Points":85},"del":[]}
+    {"s":13,"op":"del","c":"Old name"}
+
+A multi-character commit (``commit_characters``) is a single ``batch``
+line holding one such record per character, so it replays entirely or
+not at all:
+
+    {"s":14,"op":"batch","r":[{"op":"put","c":"Rook",...},{"op":"del","c":"Vex"}]}
+
+Current state is the snapshot plus the log replayed on top of it; the
+log is replayed when a warband is first used, so a crash loses at most
+the records not yet fsynced (a torn last line is dropped). Appends are
+written immediately but fsynced in batches by a background thread every
+``SYNC_INTERVAL`` seconds.
+
+The same thread compacts: once a warband's log passes ``COMPACT_BYTES``
+or has been open for ``COMPACT_AGE`` seconds, the changed characters are
+written to their snapshot files (temp file + rename) and the log is
+emptied. Records set absolute field values, so replaying a log over
+snapshots that already contain some of it gives the same result, which
+makes a crash in the middle of a compaction harmless. After a clean
+shutdown everything is compacted and the directory is a plain file-
+backend tree again.
+
+The replayed state lives in memory, so only one process may write a
+journaled tree at a time.
+"""
+
+import json
+import os
+import threading
+import time
+
+from app.storage import FileStorage, read_json, write_json
+
+JOURNAL_FILE = "journal.log"
+# Batch fsyncs of the logs this often
+SYNC_INTERVAL = 0.05
+# Fold a warband's log into snapshots once it is this big ...
+COMPACT_BYTES = 256 * 1024
+# ... or this many seconds after its first record
+COMPACT_AGE = 60.0
+
+_DELETED = object()
+
+
+def _encode(record):
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class _Journal:
+    """Replayed state of one warband's log."""
+
+    def __init__(self, storage, warband):
+        self.storage = storage
+        self.warband = warband
+        self.path = os.path.join(storage.warband_path(warband), JOURNAL_FILE)
+        self.lock = threading.RLock()
+        # name -> current data (or _DELETED) for characters changed since
+        # the last compaction; others are read from their snapshot
+        self.overlay = {}
+        # name -> sequence number of its last record
+        self.changed = {}
+        self.seq = 0
+        self.size = 0
+        self.opened_at = None
+        self.dirty = False
+        self.file = None
+        self._replay()
+
+    def _replay(self):
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return
+        end = raw.rfind(b"\n") + 1
+        if end < len(raw):
+            # A crash cut the last record short; drop it
+            print(f"Dropping torn journal record in {self.path}")
+            with open(self.path, "rb+") as f:
+                f.truncate(end)
+        for line in raw[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self.size = end
+        if end:
+            self.opened_at = time.monotonic()
+
+    def current(self, name):
+        """Current data of a character (None if it does not exist); treat as read-only."""
+        data = self.overlay.get(name)
+        if data is _DELETED:
+            return None
+        if data is not None:
+            return data
+        path = self.storage.character_path(self.warband, name)
+        if not os.path.exists(path):
+            return None
+        return read_json(path)
+
+    def _apply(self, record):
+        if record["op"] == "batch":
+            for sub in record["r"]:
+                self._apply({"s": record["s"], **sub})
+            return
+        name = record["c"]
+        if record["op"] == "del":
+            self.overlay[name] = _DELETED
+        else:
+            # Copy on write: published dicts are never modified in place
+            data = dict(self.current(name) or {})
+            data.update(record.get("set", {}))
+            for key in record.get("del", ()):
+                data.pop(key, None)
+            self.overlay[name] = data
+        self.changed[name] = record["s"]
+        self.seq = max(self.seq, record["s"])
+
+    def append(self, record):
+        """Log a record and apply it; caller holds ``self.lock``."""
+        self.seq += 1
+        line = _encode({"s": self.seq, **record})
+        if self.file is None:
+            self.file = open(self.path, "ab")
+        self.file.write(line)
+        self.file.flush()
+        self.size += len(line)
+        self.dirty = True
+        if self.opened_at is None:
+            self.opened_at = time.monotonic()
+        # Apply what would be replayed, so live state and recovery agree
+        self._apply(json.loads(line))
+
+    def sync(self):
+        with self.lock:
+            if self.dirty and self.file is not None:
+                os.fsync(self.file.fileno())
+                self.storage.count("fsyncs")
+            self.dirty = False
+
+    def due(self, now):
+        return self.size >= COMPACT_BYTES or (
+            self.opened_at is not None and now - self.opened_at >= COMPACT_AGE
+        )
+
+    def compact(self):
+        """Fold the log into snapshot files and empty it."""
+        with self.lock:
+            if not self.overlay:
+                return
+            self.sync()
+            for name, data in self.overlay.items():
+                path = self.storage.character_path(self.warband, name)
+                if data is _DELETED:
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    write_json(path, data, indent=2, fsync=True)
+            # Only empty the log once every snapshot is on disk
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            with open(self.path, "wb") as f:
+                os.fsync(f.fileno())
+            self.overlay.clear()
+            self.changed.clear()
+            self.size = 0
+            self.opened_at = None
+            self.storage.count("compactions")
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class JournalStorage(FileStorage):
+    name = "journal"
+
+    def __init__(self, root, sync_interval=SYNC_INTERVAL):
+        super().__init__(root)
+        self.sync_interval = sync_interval
+        self._journals = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"records": 0, "fsyncs": 0, "compactions": 0}
+        self._stats_lock = threading.Lock()
+
+    def _journal(self, warband, create=True):
+        """The warband's journal, replayed on first use.
+
+        Read paths pass ``create=False``: a journal is then only opened
+        for a warband that exists, so looking up unknown names does not
+        leave journals behind, and None means nothing is journaled.
+        """
+        with self._lock:
+            journal = self._journals.get(warband)
+            if journal is None:
+                if not create and not self.warband_exists(warband):
+                    return None
+                journal = self._journals[warband] = _Journal(self, warband)
+            return journal
+
+    def count(self, stat, n=1):
+        """Add ``n`` to one of the counters reported by ``stats``."""
+        with self._stats_lock:
+            self._stats[stat] += n
+
+    # --- background sync / compaction ---
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="journal-maintenance", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+                now = time.monotonic()
+                for journal in self._journal_list():
+                    if journal.due(now):
+                        journal.compact()
+            except Exception as e:
+                print(f"Journal maintenance error: {e}")
+
+    def _journal_list(self):
+        with self._lock:
+            return list(self._journals.values())
+
+    def sync(self):
+        """fsync every log with unsynced records."""
+        for journal in self._journal_list():
+            journal.sync()
+
+    def compact(self, warband=None):
+        journals = [self._journal(warband, create=False)] if warband is not None else self._journal_list()
+        for journal in journals:
+            if journal is not None:
+                journal.compact()
+
+    # --- warbands ---
+
+    def warband_version(self, warband):
+        mtime = super().warband_version(warband)
+        if mtime is None:
+            return None
+        journal = self._journal(warband, create=False)
+        return (mtime, journal.seq if journal is not None else 0)
+
+    def delete_warband(self, warband):
+        with self._lock:
+            journal = self._journals.pop(warband, None)
+        if journal is not None:
+            journal.close()
+        super().delete_warband(warband)
+
+    # --- characters ---
+
+    def list_characters(self, warband):
+        journal = self._journal(warband, create=False)
+        if journal is None:
+            return super().list_characters(warband)
+        with journal.lock:
+            names = set(super().list_characters(warband))
+            for name, data in journal.overlay.items():
+                if data is _DELETED:
+                    names.discard(name)
+                else:
+                    names.add(name)
+        return sorted(names)
+
+    def character_version(self, warband, name):
+        journal = self._journal(warband, create=False)
+        if journal is None:
+            return super().character_version(warband, name)
+        with journal.lock:
+            data = journal.overlay.get(name)
+            if data is _DELETED:
+                return None
+            if data is not None:
+                return ("journal", journal.changed[name])
+        return super().character_version(warband, name)
+
+    def read_character(self, warband, name):
+        journal = self._journal(warband, create=False)
+        if journal is None:
+            return super().read_character(warband, name)
+        with journal.lock:
+            data = journal.overlay.get(name)
+            if data is _DELETED:
+                return None
+            if data is not None:
+                size = len(json.dumps(data))
+                return data, ("journal", journal.changed[name]), size
+        return super().read_character(warband, name)
+
+    def _put_record(self, journal, name, data):
+        """Journal record that turns the character's current data into ``data`` (None if equal)."""
+        current = journal.current(name)
+        if current is None:
+            return {"op": "put", "c": name, "set": data, "del": []}
+        changed = {k: v for k, v in data.items() if k not in current or current[k] != v}
+        removed = [k for k in current if k not in data]
+        if not changed and not removed:
+            return None
+        return {"op": "put", "c": name, "set": changed, "del": removed}
+
+    def _stored_version(self, journal, warband, name):
+        """(version, size) of a character as it stands; caller holds ``journal.lock``."""
+        if name in journal.changed:
+            data = journal.overlay[name]
+            return ("journal", journal.changed[name]), len(json.dumps(data))
+        token = super().character_version(warband, name)
+        return token, token[1]
+
+    def write_character(self, warband, name, data):
+        self.create_warband(warband)
+        journal = self._journal(warband)
+        with journal.lock:
+            record = self._put_record(journal, name, data)
+            if record is not None:
+                journal.append(record)
+                self.count("records")
+            # Nothing to log when the data is unchanged
+            version = self._stored_version(journal, warband, name)
+        self._start()
+        return version
+
+    def delete_character(self, warband, name):
+        journal = self._journal(warband, create=False)
+        if journal is None:
+            return
+        with journal.lock:
+            if journal.current(name) is None:
+                return
+            journal.append({"op": "del", "c": name})
+            self.count("records")
+        self._start()
+
+    def commit_characters(self, warband, writes, deletes=()):
+        """Log several character writes and deletes as one journal line."""
+        self.create_warband(warband)
+        journal = self._journal(warband)
+        with journal.lock:
+            records = [r for r in (self._put_record(journal, n, d) for n, d in writes.items()) if r is not None]
+            records += [{"op": "del", "c": n} for n in deletes if journal.current(n) is not None]
+            if records:
+                journal.append({"op": "batch", "r": records})
+                self.count("records")
+            versions = {name: self._stored_version(journal, warband, name) for name in writes}
+        self._start()
+        return versions
+
+    # --- lifecycle / metrics ---
+
+    def after_fork(self):
+        # The parent's maintenance thread and open logs do not exist in the child
+        self._journals = {}
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def close(self):
+        """Stop the maintenance thread and fold every log into snapshots."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        for journal in self._journal_list():
+            journal.compact()
+            journal.close()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        journals = self._journal_list()
+        stats["warbands"] = len(journals)
+        stats["log_bytes"] = sum(j.size for j in journals)
+        stats["pending_characters"] = sum(len(j.overlay) for j in journals)
+        stats["backend"] = self.name
+        return stats
@@ -0,0 +1,192 @@
+# json_patch.py
+"""
+JSON Patch (RFC 6902) for JSON-shaped Python values.
+
+``apply_patch(document, operations)`` applies ``add``, ``remove``,
+``replace``, ``move``, ``copy`` and ``test`` operations addressed by JSON
+Pointers (RFC 6901, e.g. ``/Skills/Agility`` or ``/Weapons/-``)::
+
+    [{"op": "add", "path": "/Weapons/-", "value": "Pistol"},
+     {"op": "replace", "path": "/Skills/Agility", "value": 3}]
+
+The input document is never modified. The result is copy-on-write: only
+the containers on the path of an operation are copied, everything else
+is shared with the input, so applying a patch costs about the size of
+the edit rather than the size of the document. Operations are applied
+in order and all-or-nothing: if one fails, the error is raised and the
+caller still holds the untouched input.
+"""
+
+from app.character_repository import clone
+
+
+class PatchError(ValueError):
+    """A malformed patch; ``status`` is the HTTP status to answer with."""
+
+    status = 400
+
+
+class PatchConflict(PatchError):
+    """A well-formed patch that does not apply to the document (failed test, missing path)."""
+
+    status = 409
+
+
+OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+def parse_pointer(pointer):
+    """Split a JSON Pointer into its unescaped reference tokens."""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise PatchError(f"Invalid JSON Pointer: {pointer!r}")
+    if pointer == "":
+        return []
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _index(container, token, pointer, allow_end=False):
+    """List index named by ``token`` (``-`` is one past the end when adding)."""
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == "0"):
+        raise PatchError(f"Invalid array index {token!r} in {pointer}")
+    index = int(token)
+    limit = len(container) + 1 if allow_end else len(container)
+    if index >= limit:
+        raise PatchConflict(f"Array index out of range: {pointer}")
+    return index
+
+
+def _child(container, token, pointer):
+    if isinstance(container, dict):
+        if token not in container:
+            raise PatchConflict(f"Path not found: {pointer}")
+        return container[token]
+    if isinstance(container, list):
+        return container[_index(container, token, pointer)]
+    raise PatchConflict(f"Path not found: {pointer}")
+
+
+def _json_equal(a, b):
+    """Equality as RFC 6902 ``test`` defines it (true is not 1)."""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, (dict, list)) or isinstance(b, (dict, list)):
+        return False
+    return a == b
+
+
+class _Patcher:
+    """Copy-on-write view of a document being patched."""
+
+    def __init__(self, document):
+        self.root = dict(document)
+        # Containers that are private to the result and safe to modify
+        self._owned = {id(self.root)}
+
+    def get(self, pointer):
+        value = self.root
+        for token in parse_pointer(pointer):
+            value = _child(value, token, pointer)
+        return value
+
+    def _parent(self, pointer):
+        """Writable parent container of ``pointer`` and the last token."""
+        tokens = parse_pointer(pointer)
+        if not tokens:
+            raise PatchError("Operations on the whole document are not supported")
+        container = self.root
+        for token in tokens[:-1]:
+            child = _child(container, token, pointer)
+            if id(child) not in self._owned:
+                if not isinstance(child, (dict, list)):
+                    raise PatchConflict(f"Path not found: {pointer}")
+                child = dict(child) if isinstance(child, dict) else list(child)
+                self._owned.add(id(child))
+                if isinstance(container, dict):
+                    container[token] = child
+                else:
+                    container[_index(container, token, pointer)] = child
+            container = child
+        if not isinstance(container, (dict, list)):
+            raise PatchConflict(f"Path not found: {pointer}")
+        return container, tokens[-1]
+
+    def add(self, pointer, value):
+        container, token = self._parent(pointer)
+        if isinstance(container, dict):
+            container[token] = value
+        else:
+            container.insert(_index(container, token, pointer, allow_end=True), value)
+
+    def remove(self, pointer):
+        container, token = self._parent(pointer)
+        if isinstance(container, dict):
+            if token not in container:
+                raise PatchConflict(f"Path not found: {pointer}")
+            return container.pop(token)
+        return container.pop(_index(container, token, pointer))
+
+    def replace(self, pointer, value):
+        container, token = self._parent(pointer)
+        if isinstance(container, dict):
+            if token not in container:
+                raise PatchConflict(f"Path not found: {pointer}")
+            container[token] = value
+        else:
+            container[_index(container, token, pointer)] = value
+
+
+def _field(operation, name):
+    if name not in operation:
+        raise PatchError(f"Operation {operation.get('op')!r} needs {name!r}")
+    return operation[name]
+
+
+def apply_patch(document, operations):
+    """Apply ``operations`` to a copy of ``document``.
+
+    Returns ``(result, touched)`` where ``touched`` is the set of top-level
+    keys changed by the patch. Raises ``PatchError`` for a malformed patch
+    and ``PatchConflict`` when it does not apply.
+    """
+    if not isinstance(document, dict):
+        raise PatchError("Only JSON objects can be patched")
+    if not isinstance(operations, list):
+        raise PatchError("A patch must be a JSON array of operations")
+    patcher = _Patcher(document)
+    touched = set()
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+            raise PatchError(f"Unknown operation: {operation!r}")
+        op = operation["op"]
+        path = _field(operation, "path")
+        tokens = parse_pointer(path)
+        if op == "test":
+            if not _json_equal(patcher.get(path), _field(operation, "value")):
+                raise PatchConflict(f"Test failed: {path}")
+            continue
+        if op in ("move", "copy"):
+            source = _field(operation, "from")
+            source_tokens = parse_pointer(source)
+            if op == "move":
+                if tokens[:len(source_tokens)] == source_tokens and tokens != source_tokens:
+                    raise PatchError(f"Cannot move {source} into itself")
+                value = patcher.remove(source)
+                if source_tokens:
+                    touched.add(source_tokens[0])
+            else:
+                value = clone(patcher.get(source))
+            patcher.add(path, value)
+        elif op == "add":
+            patcher.add(path, clone(_field(operation, "value")))
+        elif op == "remove":
+            patcher.remove(path)
+        else:
+            patcher.replace(path, clone(_field(operation, "value")))
+        touched.add(tokens[0] if tokens else "")
+    return patcher.root, touched
@@ -0,0 +1,158 @@
+# locks.py
+"""
+Per-record locks that hold across threads and worker processes.
+
+``KeyedLocks.hold(*keys)`` serializes everyone working on the same keys
+(e.g. ``(warband, character)``): threads of this process wait on an
+in-memory re-entrant lock, and the thread that gets it then takes an
+exclusive OS lock on ``<directory>/<key...>.lock`` so other worker
+processes wait too. Each key component is hex-encoded in the file name,
+so no key (``..``, separators) can name a file outside ``<directory>``.
+Locks are re-entrant within a thread, so a route
+that holds a character's lock can call code that takes it again.
+
+Several keys are always taken in sorted order, so two requests locking
+the same pair of characters cannot deadlock.
+
+Uses ``fcntl.flock`` on POSIX and ``msvcrt.locking`` on Windows; if
+neither is available the locks only cover threads of one process.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+# Longer encoded components are hashed to stay under file name limits
+MAX_COMPONENT = 200
+
+
+def _component(part):
+    """A file name for one key component: only [0-9a-f], never empty."""
+    encoded = str(part).encode("utf-8").hex()
+    if len(encoded) > MAX_COMPONENT:
+        return "h" + hashlib.sha1(encoded.encode("ascii")).hexdigest()
+    return "k" + encoded
+
+
+class _KeyState:
+    __slots__ = ("rlock", "depth", "file", "users")
+
+    def __init__(self):
+        self.rlock = threading.RLock()
+        self.depth = 0
+        self.file = None
+        self.users = 0
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after ~10 seconds; keep waiting
+                continue
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class KeyedLocks:
+    def __init__(self, directory):
+        self.directory = directory
+        self._states = {}
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "contended": 0, "wait_ms": 0.0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, *[_component(part) for part in key]) + ".lock"
+
+    def acquire(self, key):
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _KeyState()
+            state.users += 1
+        if not state.rlock.acquire(blocking=False):
+            started = time.monotonic()
+            state.rlock.acquire()
+            with self._lock:
+                self._stats["contended"] += 1
+                self._stats["wait_ms"] += (time.monotonic() - started) * 1000
+        if state.depth == 0 and self.directory is not None:
+            # First hold by this thread: also lock out other processes
+            try:
+                path = self._path(key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                f = open(path, "a+b")
+                _lock_file(f)
+                state.file = f
+            except Exception:
+                state.rlock.release()
+                self._release_state(key, state)
+                raise
+        state.depth += 1
+        with self._lock:
+            self._stats["acquired"] += 1
+
+    def release(self, key):
+        with self._lock:
+            state = self._states[key]
+        state.depth -= 1
+        if state.depth == 0 and state.file is not None:
+            try:
+                _unlock_file(state.file)
+            finally:
+                state.file.close()
+                state.file = None
+        state.rlock.release()
+        self._release_state(key, state)
+
+    def _release_state(self, key, state):
+        with self._lock:
+            state.users -= 1
+            # Forget idle keys so the table does not grow with every character
+            if state.users == 0:
+                self._states.pop(key, None)
+
+    @contextmanager
+    def hold(self, *keys):
+        """Hold the locks of all ``keys`` (taken in sorted order)."""
+        ordered = sorted(set(keys))
+        taken = []
+        try:
+            for key in ordered:
+                self.acquire(key)
+                taken.append(key)
+            yield
+        finally:
+            for key in reversed(taken):
+                self.release(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["held_keys"] = len(self._states)
+        stats["cross_process"] = fcntl is not None or msvcrt is not None
+        return stats
@@ -1,6 +1,6 @@
-import json
 import os
 from typing import Dict, List, Any, Optional
+from app.catalog_cache import CatalogSnapshot, NameIndex, get_snapshot
 
 # Get the current directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,25 +9,25 @@ parent_dir = os.path.dirname(current_dir)
 # Path to the misc items data file
 MISC_ITEMS_DATA_FILE = os.path.join(current_dir, "misc_items_data.json")
 
+def get_misc_items_snapshot() -> CatalogSnapshot:
+    """Get the cached miscellaneous items catalog snapshot."""
+    return get_snapshot(MISC_ITEMS_DATA_FILE)
+
 def get_all_misc_items() -> List[Dict[str, Any]]:
-    """Get all miscellaneous items data."""
-    with open(MISC_ITEMS_DATA_FILE, "r") as f:
-        data = json.load(f)
-    return data["items"]
+    """Get all miscellaneous items data (cached, treat as read-only)."""
+    return get_misc_items_snapshot().data["items"]
+
+def get_misc_items_index() -> NameIndex:
+    """Get the name index for the current miscellaneous items catalog."""
+    return get_misc_items_snapshot().derived("name_index", lambda data: NameIndex(data["items"]))
 
 def get_misc_item_by_name(name: str) -> Optional[Dict[str, Any]]:
     """Get a specific miscellaneous item by name."""
-    items = get_all_misc_items()
-    for item in items:
-        if item["name"] == name:
-            return item
-    return None
+    return get_misc_items_index().get(name)
 
 def get_misc_items_special_rules() -> Dict[str, str]:
-    """Get all special rules for miscellaneous items."""
-    with open(MISC_ITEMS_DATA_FILE, "r") as f:
-        data = json.load(f)
-    return data["special_rules"]
+    """Get all special rules for miscellaneous items (cached, treat as read-only)."""
+    return get_misc_items_snapshot().data["special_rules"]
 
 def get_misc_item_cost(name: str) -> int:
     """Get the cost of a specific miscellaneous item."""
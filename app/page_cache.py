@@ -0,0 +1,119 @@
+# page_cache.py
+"""
+In-memory cache of rendered reference pages.
+
+The reference pages (``/traits``, ``/abilities``, ``/arcana``, the weapon
+rules and cost tables) are the most requested pages during a game, and
+their HTML depends only on the template, a few parameters and the
+catalog version. ``PageCache.get(key, render)`` renders a page once per
+key and then serves the stored body::
+
+    page = PAGES.get((template, params, version), lambda: template.render(context))
+
+A ``RenderedPage`` holds the UTF-8 body, a strong ETag (a hash of the
+body, so every worker computes the same one) and a gzip variant that is
+compressed on first use and then kept. The key must change whenever the
+output could: include the catalog generation (``app.catalog_cache``) and
+the ``Template`` object itself, which Jinja2 replaces when an edited
+template is reloaded. Old keys are evicted least-recently-used.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+PAGE_CACHE_SIZE = 256
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 500
+GZIP_LEVEL = 6
+
+
+def accepts_gzip(header):
+    """Whether an Accept-Encoding header allows gzip (and does not refuse it with q=0)."""
+    weights = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        q = 1.0
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    return weights.get("gzip", weights.get("*", 0.0)) > 0
+
+
+class RenderedPage:
+    __slots__ = ("body", "etag", "_gzip", "_lock")
+
+    def __init__(self, html):
+        self.body = html.encode("utf-8")
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self._gzip = None
+        self._lock = threading.Lock()
+
+    @property
+    def gzip_etag(self):
+        # A strong ETag names one representation, so the gzip variant gets its own
+        return self.etag[:-1] + '-gz"'
+
+    def gzip_body(self):
+        """The gzip variant of the body (None if the body is too small to bother)."""
+        if len(self.body) < GZIP_MIN_SIZE:
+            return None
+        with self._lock:
+            if self._gzip is None:
+                # mtime=0 keeps the compressed bytes identical across workers
+                self._gzip = gzip.compress(self.body, GZIP_LEVEL, mtime=0)
+            return self._gzip
+
+    def variant(self, accept_encoding):
+        """(body, etag, content encoding or None) to send for an Accept-Encoding header."""
+        if accepts_gzip(accept_encoding):
+            compressed = self.gzip_body()
+            if compressed is not None:
+                return compressed, self.gzip_etag, "gzip"
+        return self.body, self.etag, None
+
+
+class PageCache:
+    """LRU cache of ``RenderedPage``s by key."""
+
+    def __init__(self, max_entries=PAGE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key, render):
+        """The page for ``key``, calling ``render()`` (returns HTML) if it is not cached."""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self._stats["hits"] += 1
+                return page
+        # Render outside the lock; two threads may render the same page once each
+        page = RenderedPage(render())
+        with self._lock:
+            self._stats["misses"] += 1
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+                self._stats["evictions"] += 1
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pages"] = len(self._pages)
+            stats["bytes"] = sum(len(p.body) + len(p._gzip or b"") for p in self._pages.values())
+        stats["max_entries"] = self.max_entries
+        return stats
@@ -0,0 +1,436 @@
+# points_engine.py
+"""
+Points-cost engine for Planet 28 characters.
+
+This is the single implementation of the character cost rules used by
+``/api/calculate_points`` and the character edit form:
+
+- every character costs a base 10 points,
+- each skill level above 1 costs 10 points (skills are capped at 10
+  unless homebrew is enabled),
+- every 2 hit-points above or below 20 cost or save 10 points,
+- in homebrew mode each point of speed above or below 10 costs or saves
+  10 points (speed is fixed at 10 otherwise),
+- traits, abilities, weapons, armour and misc items add their catalog cost.
+
+A loadout is a plain dict::
+
+    {
+        "traits": ["Brawler"], "abilities": [],
+        "skills": {"Agility": 2, ...}, "hit_points": 20, "speed": 10,
+        "weapons": ["Fist"], "armour": [], "misc_items": [],
+        "homebrew_enabled": False,
+    }
+
+Missing keys fall back to the defaults of a new character. Pricing only
+reads the precomputed ``CostTables``, so ``price_loadouts`` can price a
+whole warband (or thousands of candidate loadouts) with one table build.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from app.traits_api import list_traits
+from app.abilities_api import list_abilities
+from app.custom_content import custom_content_snapshot
+from app.weapons_api import get_weapons_snapshot
+from app.armour_api import get_armour_snapshot
+from app.misc_items_api import get_misc_items_snapshot
+
+SKILLS = ('Agility', 'Shooting', 'Fighting', 'Psyche', 'Awareness')
+
+BASE_POINTS = 10
+DEFAULT_SKILL = 1
+MAX_SKILL = 10
+SKILL_POINT_COST = 10
+DEFAULT_HIT_POINTS = 20
+HIT_POINTS_STEP = 2
+HIT_POINTS_STEP_COST = 10
+DEFAULT_SPEED = 10
+SPEED_POINT_COST = 10
+
+# Item lists priced from the catalogs, in breakdown order
+ITEM_KINDS = ('weapons', 'armour', 'misc_items')
+
+
+class CostTables:
+    """Name -> cost lookups for every priced catalog, built once per catalog version."""
+
+    def __init__(self, key, traits, abilities, weapons, armour, misc_items):
+        self.key = key
+        self.version = "-".join(str(k) for k in key)
+        self.traits = traits
+        self.abilities = abilities
+        self.weapons = weapons
+        self.armour = armour
+        self.misc_items = misc_items
+
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def _catalog_key():
+    """Identify the current state of every catalog the cost tables depend on."""
+    return (
+        get_weapons_snapshot().generation,
+        get_armour_snapshot().generation,
+        get_misc_items_snapshot().generation,
+        # Custom traits and abilities
+        custom_content_snapshot().generation,
+    )
+
+
+def _cost_dict(items):
+    costs = {}
+    for item in items:
+        # First entry wins, like the name indexes
+        costs.setdefault(item['name'], item.get('cost', 0))
+    return costs
+
+
+def get_cost_tables():
+    """Return the cost tables for the current catalogs, rebuilding them if any changed."""
+    global _tables
+    key = _catalog_key()
+    tables = _tables
+    if tables is not None and tables.key == key:
+        return tables
+    with _tables_lock:
+        tables = _tables
+        if tables is not None and tables.key == key:
+            return tables
+        tables = CostTables(
+            key=key,
+            traits=_cost_dict(list_traits()),
+            abilities=_cost_dict(list_abilities()),
+            weapons=_cost_dict(get_weapons_snapshot().data.get('weapons', [])),
+            armour=_cost_dict(get_armour_snapshot().data.get('armour_list', [])),
+            misc_items=_cost_dict(get_misc_items_snapshot().data['items']),
+        )
+        _tables = tables
+        return tables
+
+
+def cost_rules():
+    """Return the non-catalog cost rules as plain data for clients."""
+    return {
+        'skills': list(SKILLS),
+        'base_points': BASE_POINTS,
+        'default_skill': DEFAULT_SKILL,
+        'max_skill': MAX_SKILL,
+        'skill_point_cost': SKILL_POINT_COST,
+        'default_hit_points': DEFAULT_HIT_POINTS,
+        'hit_points_step': HIT_POINTS_STEP,
+        'hit_points_step_cost': HIT_POINTS_STEP_COST,
+        'default_speed': DEFAULT_SPEED,
+        'speed_point_cost': SPEED_POINT_COST,
+    }
+
+
+class CatalogBundle:
+    """Serialized cost tables and rules for client-side pricing.
+
+    The version is a hash of the bundle content, so it is identical in
+    every worker process and across restarts, and doubles as a strong ETag.
+    """
+
+    def __init__(self, tables):
+        data = {
+            'rules': cost_rules(),
+            'costs': {
+                # dict() flattens the layered tables of homebrew warbands
+                'traits': dict(tables.traits),
+                'abilities': dict(tables.abilities),
+                'weapons': tables.weapons,
+                'armour': tables.armour,
+                'misc_items': tables.misc_items,
+            },
+        }
+        content = json.dumps(data, separators=(',', ':'), sort_keys=True)
+        self.tables_version = tables.version
+        self.version = hashlib.sha256(content.encode('utf-8')).hexdigest()[:20]
+        self.etag = f'"{self.version}"'
+        data['version'] = self.version
+        self.body = json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+_bundle = None
+
+
+def get_catalog_bundle():
+    """Return the bundle for the current cost tables, serializing it once per version."""
+    global _bundle
+    tables = get_cost_tables()
+    bundle = _bundle
+    if bundle is None or bundle.tables_version != tables.version:
+        bundle = CatalogBundle(tables)
+        _bundle = bundle
+    return bundle
+
+
+def _names(value):
+    """Accept a list of names or a comma-separated string; drop blanks."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def normalize_loadout(loadout):
+    """Return a loadout with defaults filled in and the rule limits applied.
+
+    Raises ValueError if a skill, hit-points or speed value is not an integer.
+    """
+    if not isinstance(loadout, dict):
+        raise TypeError("Loadout must be an object")
+    homebrew_enabled = bool(loadout.get('homebrew_enabled', False))
+
+    raw_skills = loadout.get('skills') or {}
+    skills = {}
+    for skill in SKILLS:
+        value = max(DEFAULT_SKILL, int(raw_skills.get(skill, DEFAULT_SKILL)))
+        # Enforce maximum skill value when homebrew is off
+        if not homebrew_enabled:
+            value = min(MAX_SKILL, value)
+        skills[skill] = value
+
+    speed = int(loadout.get('speed', DEFAULT_SPEED))
+    if not homebrew_enabled:
+        # Speed cannot be bought outside homebrew mode
+        speed = DEFAULT_SPEED
+
+    return {
+        # Traits and abilities can only be taken once
+        'traits': list(dict.fromkeys(_names(loadout.get('traits')))),
+        'abilities': list(dict.fromkeys(_names(loadout.get('abilities')))),
+        'skills': skills,
+        'hit_points': int(loadout.get('hit_points', DEFAULT_HIT_POINTS)),
+        'speed': speed,
+        # Equipment may be carried more than once
+        'weapons': _names(loadout.get('weapons')),
+        'armour': _names(loadout.get('armour')),
+        'misc_items': _names(loadout.get('misc_items')),
+        'homebrew_enabled': homebrew_enabled,
+    }
+
+
+def loadout_from_character(character, homebrew_enabled=False):
+    """Build a loadout from a stored character dict."""
+    return {
+        'traits': character.get('Traits', []),
+        'abilities': character.get('Abilities', []),
+        'skills': character.get('Skills', {}),
+        'hit_points': character.get('Hit-points', DEFAULT_HIT_POINTS),
+        'speed': character.get('Speed', DEFAULT_SPEED),
+        'weapons': character.get('Weapons', []),
+        'armour': character.get('Armour', []),
+        'misc_items': character.get('MiscItems', []),
+        'homebrew_enabled': homebrew_enabled,
+    }
+
+
+# Stored character field -> loadout key (and breakdown component) it feeds
+CHARACTER_FIELDS = {
+    'Traits': 'traits',
+    'Abilities': 'abilities',
+    'Skills': 'skills',
+    'Hit-points': 'hit_points',
+    'Speed': 'speed',
+    'Weapons': 'weapons',
+    'Armour': 'armour',
+    'MiscItems': 'misc_items',
+}
+
+
+def price_character_fields(character, fields, homebrew_enabled=False, tables=None):
+    """Price only the breakdown components fed by ``fields`` of a stored character.
+
+    Work is proportional to those fields, not to the whole character, so
+    an edit can be re-priced by swapping the touched components into a
+    known breakdown. Returns ``(costs, result)``: the component costs and
+    the pricing result whose ``loadout`` holds the normalized field values
+    (fields that were not asked for are left at their defaults).
+    """
+    if tables is None:
+        tables = get_cost_tables()
+    loadout = {'homebrew_enabled': homebrew_enabled}
+    keys = []
+    for field in fields:
+        key = CHARACTER_FIELDS.get(field)
+        if key is None:
+            continue
+        keys.append(key)
+        if character.get(field) is not None:
+            loadout[key] = character[field]
+    result = _price_normalized(normalize_loadout(loadout), tables)
+    for kind, names in result['unknown'].items():
+        print(f"Warning: {kind} {names} not found in database")
+    return {key: result['breakdown'][key] for key in keys}, result
+
+
+def hit_points_cost(hit_points):
+    """+/- 10 points for every 2 hit-points away from the default."""
+    return ((hit_points - DEFAULT_HIT_POINTS) // HIT_POINTS_STEP) * HIT_POINTS_STEP_COST
+
+
+def speed_cost(speed, homebrew_enabled):
+    """10 points per point of speed away from the default, homebrew only."""
+    if not homebrew_enabled:
+        return 0
+    return (speed - DEFAULT_SPEED) * SPEED_POINT_COST
+
+
+def _price_normalized(loadout, tables):
+    trait_costs = tables.traits
+    ability_costs = tables.abilities
+    breakdown = {
+        'base': BASE_POINTS,
+        'traits': sum(trait_costs.get(t, 0) for t in loadout['traits']),
+        'abilities': sum(ability_costs.get(a, 0) for a in loadout['abilities']),
+        'skills': sum(v - DEFAULT_SKILL for v in loadout['skills'].values()) * SKILL_POINT_COST,
+        'hit_points': hit_points_cost(loadout['hit_points']),
+        'speed': speed_cost(loadout['speed'], loadout['homebrew_enabled']),
+    }
+    unknown = {}
+    for kind in ITEM_KINDS:
+        costs = getattr(tables, kind)
+        total = 0
+        for name in loadout[kind]:
+            cost = costs.get(name)
+            if cost is None:
+                unknown.setdefault(kind, []).append(name)
+            else:
+                total += cost
+        breakdown[kind] = total
+
+    return {
+        'points': sum(breakdown.values()),
+        'breakdown': breakdown,
+        'loadout': loadout,
+        'unknown': unknown,
+    }
+
+
+def price_loadout(loadout, tables=None):
+    """Price a single loadout.
+
+    Returns a dict with the total ``points``, an itemized ``breakdown``,
+    the normalized ``loadout`` that was priced and any ``unknown`` item
+    names (which cost nothing). Raises ValueError on non-integer stats.
+    """
+    if tables is None:
+        tables = get_cost_tables()
+    result = _price_normalized(normalize_loadout(loadout), tables)
+    for kind, names in result['unknown'].items():
+        print(f"Warning: {kind} {names} not found in database")
+    return result
+
+
+def price_loadouts(loadouts, tables=None):
+    """Price many loadouts against one set of cost tables.
+
+    Results come back in input order. A loadout that cannot be priced
+    yields ``{"error": "..."}`` in its slot instead of aborting the batch.
+    """
+    if tables is None:
+        tables = get_cost_tables()
+    results = []
+    append = results.append
+    for loadout in loadouts:
+        try:
+            append(_price_normalized(normalize_loadout(loadout), tables))
+        except (ValueError, TypeError, AttributeError) as e:
+            append({'error': str(e)})
+    return results
+
+
+class PointsMemo:
+    """Bounded LRU of pricing results keyed by loadout fingerprint."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+POINTS_MEMO = PointsMemo()
+
+
+def loadout_fingerprint(loadout, tables):
+    """Canonical hash of a normalized loadout and the catalog version it is priced against.
+
+    Order never affects the price, so traits/abilities are sorted and the
+    equipment lists are compared as multisets.
+    """
+    canonical = [
+        tables.version,
+        loadout['homebrew_enabled'],
+        sorted(loadout['traits']),
+        sorted(loadout['abilities']),
+        [loadout['skills'][skill] for skill in SKILLS],
+        loadout['hit_points'],
+        loadout['speed'],
+        sorted(loadout['weapons']),
+        sorted(loadout['armour']),
+        sorted(loadout['misc_items']),
+    ]
+    encoded = json.dumps(canonical, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def price_loadout_cached(loadout, tables=None, memo=POINTS_MEMO):
+    """Like ``price_loadout`` but served from ``memo`` for loadouts priced before.
+
+    The result is shared with other callers and must not be modified. Its
+    ``loadout`` reflects the first request with this fingerprint, so use
+    ``price_loadout`` when the normalized lists are needed in caller order.
+    """
+    if tables is None:
+        tables = get_cost_tables()
+    normalized = normalize_loadout(loadout)
+    key = loadout_fingerprint(normalized, tables)
+    result = memo.get(key)
+    if result is None:
+        result = _price_normalized(normalized, tables)
+        memo.put(key, result)
+    return result
@@ -0,0 +1,188 @@
+# server.py
+"""
+Pre-fork server: load the catalogs once, then fork the workers.
+
+    python -m app.server [--workers=N] [--host=127.0.0.1] [--port=8000]
+
+The parent process imports the app, parses and indexes every catalog,
+builds the cost tables and catalog bundle and compiles every template
+(see ``app.template_cache``) before it forks, so the workers share those
+pages copy-on-write instead of each holding its own copy.
+``gc.freeze()`` then moves everything loaded so far out of the garbage
+collector's reach: a collection writes to the header of every object it
+visits, which would copy the shared pages into each worker.
+
+The catalogs never change at runtime (custom traits, abilities and
+arcana go to the shared store of ``app.custom_content``, which every
+worker reads), so all workers always price against the same catalogs.
+
+Each worker runs uvicorn on the socket the parent opened. The storage
+backend drops the state it inherited from the parent (``after_fork``:
+connections, the journal's maintenance thread) and opens its own; the
+character cache, the autosave thread and the I/O executor are set up in
+the worker by the app's lifespan. The parent restarts workers that die
+and stops them all on SIGINT/SIGTERM.
+
+Workers share the characters on disk but not their caches, so with more
+than one worker autosaves are written through under the character's
+cross-process lock instead of being buffered (a buffered autosave would
+later overwrite another worker's change). The journal backend keeps its
+state in memory and allows one writing process only, so it is refused
+with more than one worker.
+
+Needs ``os.fork`` (POSIX); elsewhere run ``uvicorn main:app``.
+"""
+
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+# Seconds to wait before replacing a worker that died right after starting
+RESPAWN_DELAY = 1.0
+
+
+def preload():
+    """Parse and index every catalog once; returns entry counts for the log."""
+    from app.abilities_api import get_ability_index
+    from app.arcana_api import get_arcana_index
+    from app.armour_api import get_armour_index
+    from app.misc_items_api import get_misc_items_index
+    from app.points_engine import get_catalog_bundle
+    from app.special_rules_api import get_all_special_rules
+    from app.traits_api import get_trait_index
+    from app.weapons_api import get_weapons_index
+
+    counts = {
+        "traits": len(get_trait_index()),
+        "abilities": len(get_ability_index()),
+        "arcana": len(get_arcana_index()),
+        "weapons": len(get_weapons_index()),
+        "armour": len(get_armour_index()),
+        "misc_items": len(get_misc_items_index()),
+        "special_rules": len(get_all_special_rules()),
+    }
+    # Builds the cost tables too
+    get_catalog_bundle()
+    return counts
+
+
+def _listen(host, port):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker(app, sock):
+    import uvicorn
+
+    # Restore default signal handling; uvicorn installs its own
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="on"))
+    server.run(sockets=[sock])
+
+
+def _spawn(app, sock, storage):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            storage.after_fork()
+            _worker(app, sock)
+        except BaseException as e:
+            print(f"Worker {os.getpid()} failed: {e}")
+            code = 1
+        finally:
+            # Never return into the parent's supervision loop
+            os._exit(code)
+    print(f"Started worker {pid}")
+    return pid
+
+
+def serve(workers, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    import main
+
+    from app.config_service import as_bool
+    from app.template_cache import precompile_templates, setup_templates
+
+    if workers > 1 and main.STORAGE.name == "journal":
+        print("storage_backend 'journal' allows one writing process; use --workers=1 or another backend")
+        return 2
+    if workers > 1:
+        # Other workers write the same characters: no write-behind autosaves
+        main.CHARACTERS.defer_autosaves = False
+
+    counts = preload()
+    print(f"Preloaded catalogs: {counts}")
+    # Production: templates only change with a deploy, which restarts the server
+    setup_templates(main.templates.env, auto_reload=as_bool(main.SETTINGS.raw.get("template_auto_reload", False)))
+    print(f"Precompiled templates: {precompile_templates(main.templates.env)}")
+    gc.collect()
+    gc.freeze()
+
+    sock = _listen(host, port)
+    print(f"Listening on http://{host}:{port} with {workers} workers")
+    # pid -> when it was started
+    children = {}
+    stopping = []
+
+    def stop(signum, frame):
+        # Workers shut down gracefully on SIGTERM; the loop below reaps them
+        stopping.append(signum)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        children[_spawn(main.app, sock, main.STORAGE)] = time.monotonic()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"Worker {pid} exited with status {status}; replacing it")
+        if time.monotonic() - started < RESPAWN_DELAY:
+            time.sleep(RESPAWN_DELAY)
+        children[_spawn(main.app, sock, main.STORAGE)] = time.monotonic()
+    sock.close()
+    return 0
+
+
+def main(argv):
+    if not hasattr(os, "fork"):
+        print("app.server needs os.fork; run `uvicorn main:app` instead")
+        return 2
+    workers, host, port = os.cpu_count() or 1, DEFAULT_HOST, DEFAULT_PORT
+    for arg in argv:
+        name, _, value = arg.partition("=")
+        if name == "--workers" and value.isdigit() and int(value) > 0:
+            workers = int(value)
+        elif name == "--host" and value:
+            host = value
+        elif name == "--port" and value.isdigit():
+            port = int(value)
+        else:
+            print("usage: python -m app.server [--workers=N] [--host=127.0.0.1] [--port=8000]")
+            return 2
+    return serve(workers, host, port)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,19 +1,16 @@
-import json
 import os
+from app.catalog_cache import get_snapshot
+
+SPECIAL_RULES_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'special_rules_data.json')
+
+def get_special_rules_snapshot():
+    """Return the cached special rules snapshot."""
+    # Return empty data if file not found or invalid
+    return get_snapshot(SPECIAL_RULES_DATA_FILE, {"special_rules": {}})
 
 def get_special_rules_data():
-    """Load special rules data from the JSON file."""
-    try:
-        rules_path = os.path.join(os.path.dirname(__file__), 'special_rules_data.json')
-        print(f"Loading special rules from: {rules_path}")
-        with open(rules_path, 'r') as f:
-            data = json.load(f)
-        print(f"Loaded data: {data}")
-        return data
-    except Exception as e:
-        print(f"Error loading special rules data: {e}")
-        # Return empty data if file not found or invalid
-        return {"special_rules": {}}
+    """Load special rules data from the JSON file (cached, treat as read-only)."""
+    return get_special_rules_snapshot().data
 
 def get_all_special_rules():
     """Return all special rules and their descriptions."""
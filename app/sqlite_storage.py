@@ -0,0 +1,367 @@
+# sqlite_storage.py
+"""
+SQLite storage backend (standard-library ``sqlite3``, WAL mode).
+
+Same methods as ``app.storage.FileStorage``; records are stored as the
+JSON text the file backend would have written, so moving data between
+the two is lossless. Besides the JSON, characters keep their points in
+an indexed column, and every weapon/armour/misc item/equipment entry of
+a character is a row in ``equipment``, so reporting queries against the
+database ("who carries X") are index lookups instead of scans. The app
+itself only uses the storage interface shared with ``FileStorage``.
+
+Each warband row carries a ``version`` counter bumped by every change
+inside the warband, which plays the role the directory mtime plays for
+the file backend.
+
+Move data between the directory tree and a database with:
+
+    python -m app.sqlite_storage migrate [warbands_dir] [db_path]
+    python -m app.sqlite_storage export [db_path] [warbands_dir]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from app.storage import DEFAULT_SQLITE_PATH, FileStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS warbands (
+    name TEXT PRIMARY KEY,
+    config TEXT,
+    config_version INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS characters (
+    warband TEXT NOT NULL REFERENCES warbands(name) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    points INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (warband, name)
+);
+CREATE INDEX IF NOT EXISTS characters_points ON characters (warband, points);
+CREATE TABLE IF NOT EXISTS vehicles (
+    warband TEXT NOT NULL REFERENCES warbands(name) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (warband, name)
+);
+CREATE TABLE IF NOT EXISTS equipment (
+    warband TEXT NOT NULL,
+    character TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    item TEXT NOT NULL,
+    FOREIGN KEY (warband, character) REFERENCES characters(warband, name) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS homebrew (
+    warband TEXT PRIMARY KEY REFERENCES warbands(name) ON DELETE CASCADE,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS equipment_owner ON equipment (warband, character);
+CREATE INDEX IF NOT EXISTS equipment_item ON equipment (kind, item);
+"""
+
+# Character list fields mirrored into the equipment table
+EQUIPMENT_FIELDS = {
+    "Weapons": "weapon",
+    "Armour": "armour",
+    "MiscItems": "misc_item",
+    "Equipment": "equipment",
+}
+
+
+def _points(character):
+    try:
+        return int(character.get("Points", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+def _equipment_rows(warband, name, character):
+    for field, kind in EQUIPMENT_FIELDS.items():
+        items = character.get(field) or []
+        if isinstance(items, list):
+            for item in items:
+                yield (warband, name, kind, str(item))
+
+
+class SQLiteStorage:
+    name = "sqlite"
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        self.lock_dir = f"{path}.locks"
+        # sqlite3 connections are per thread
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql, params=()):
+        return self._connect().execute(sql, params).fetchall()
+
+    def _touch(self, conn, warband, config_changed=False):
+        """Create the warband row if needed and bump its version (inside a transaction)."""
+        conn.execute("INSERT OR IGNORE INTO warbands (name) VALUES (?)", (warband,))
+        if config_changed:
+            conn.execute(
+                "UPDATE warbands SET version = version + 1, config_version = config_version + 1 WHERE name = ?",
+                (warband,),
+            )
+        else:
+            conn.execute("UPDATE warbands SET version = version + 1 WHERE name = ?", (warband,))
+
+    # --- warbands ---
+
+    def list_warbands(self):
+        return [row[0] for row in self._query("SELECT name FROM warbands ORDER BY name")]
+
+    def warbands_version(self):
+        # Listing is one indexed query; no token needed
+        return None
+
+    def warband_exists(self, warband):
+        return bool(self._query("SELECT 1 FROM warbands WHERE name = ?", (warband,)))
+
+    def warband_version(self, warband):
+        rows = self._query("SELECT version FROM warbands WHERE name = ?", (warband,))
+        return rows[0][0] if rows else None
+
+    def create_warband(self, warband):
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO warbands (name) VALUES (?)", (warband,))
+
+    def delete_warband(self, warband):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM warbands WHERE name = ?", (warband,))
+
+    # --- warband config ---
+
+    def config_version(self, warband):
+        rows = self._query("SELECT config_version, config IS NOT NULL FROM warbands WHERE name = ?", (warband,))
+        if not rows or not rows[0][1]:
+            return None
+        return rows[0][0]
+
+    def read_config(self, warband):
+        rows = self._query("SELECT config FROM warbands WHERE name = ?", (warband,))
+        if not rows or rows[0][0] is None:
+            return None
+        return json.loads(rows[0][0])
+
+    def write_config(self, warband, config):
+        with self._connect() as conn:
+            self._touch(conn, warband, config_changed=True)
+            conn.execute("UPDATE warbands SET config = ? WHERE name = ?", (json.dumps(config), warband))
+
+    # --- homebrew overlay ---
+
+    def homebrew_version(self, warband):
+        rows = self._query("SELECT version FROM homebrew WHERE warband = ?", (warband,))
+        return rows[0][0] if rows else None
+
+    def read_homebrew(self, warband):
+        rows = self._query("SELECT data FROM homebrew WHERE warband = ?", (warband,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def write_homebrew(self, warband, overlay):
+        with self._connect() as conn:
+            self._touch(conn, warband)
+            conn.execute(
+                "INSERT INTO homebrew (warband, data, version) VALUES (?, ?, 1) "
+                "ON CONFLICT (warband) DO UPDATE SET data = excluded.data, version = homebrew.version + 1",
+                (warband, json.dumps(overlay)),
+            )
+
+    # --- characters ---
+
+    def list_characters(self, warband):
+        return [row[0] for row in self._query("SELECT name FROM characters WHERE warband = ? ORDER BY name", (warband,))]
+
+    def character_version(self, warband, name):
+        rows = self._query("SELECT version, length(data) FROM characters WHERE warband = ? AND name = ?", (warband, name))
+        return tuple(rows[0]) if rows else None
+
+    def read_character(self, warband, name):
+        rows = self._query("SELECT data, version FROM characters WHERE warband = ? AND name = ?", (warband, name))
+        if not rows:
+            return None
+        text, version = rows[0]
+        return json.loads(text), (version, len(text)), len(text)
+
+    def _put_character(self, conn, warband, name, data):
+        """Store a character inside a transaction; returns its (version, size)."""
+        text = json.dumps(data, indent=2)
+        self._touch(conn, warband)
+        version = conn.execute(
+            "SELECT version FROM warbands WHERE name = ?", (warband,)
+        ).fetchone()[0]
+        # The warband version is unique across the warband's rows, so
+        # it also serves as this character's version
+        conn.execute(
+            "INSERT INTO characters (warband, name, data, points, version) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (warband, name) DO UPDATE SET data = excluded.data, "
+            "points = excluded.points, version = excluded.version",
+            (warband, name, text, _points(data), version),
+        )
+        conn.execute("DELETE FROM equipment WHERE warband = ? AND character = ?", (warband, name))
+        conn.executemany("INSERT INTO equipment VALUES (?, ?, ?, ?)", _equipment_rows(warband, name, data))
+        return (version, len(text)), len(text)
+
+    def _remove_character(self, conn, warband, name):
+        cur = conn.execute("DELETE FROM characters WHERE warband = ? AND name = ?", (warband, name))
+        if cur.rowcount:
+            self._touch(conn, warband)
+
+    def write_character(self, warband, name, data):
+        with self._connect() as conn:
+            return self._put_character(conn, warband, name, data)
+
+    def delete_character(self, warband, name):
+        with self._connect() as conn:
+            self._remove_character(conn, warband, name)
+
+    def commit_characters(self, warband, writes, deletes=()):
+        """Write and delete several characters in one SQLite transaction."""
+        with self._connect() as conn:
+            versions = {name: self._put_character(conn, warband, name, data) for name, data in writes.items()}
+            for name in deletes:
+                self._remove_character(conn, warband, name)
+        return versions
+
+    def recover_transactions(self, lock=None):
+        # SQLite rolls back unfinished transactions itself
+        return 0
+
+    # --- vehicles ---
+
+    def list_vehicles(self, warband):
+        return [row[0] for row in self._query("SELECT name FROM vehicles WHERE warband = ? ORDER BY name", (warband,))]
+
+    def read_vehicle(self, warband, name):
+        rows = self._query("SELECT data FROM vehicles WHERE warband = ? AND name = ?", (warband, name))
+        return json.loads(rows[0][0]) if rows else None
+
+    def write_vehicle(self, warband, name, data):
+        with self._connect() as conn:
+            self._touch(conn, warband)
+            conn.execute(
+                "INSERT INTO vehicles (warband, name, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (warband, name) DO UPDATE SET data = excluded.data",
+                (warband, name, json.dumps(data)),
+            )
+
+    def delete_vehicle(self, warband, name):
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM vehicles WHERE warband = ? AND name = ?", (warband, name))
+            if cur.rowcount:
+                self._touch(conn, warband)
+
+    def stats(self):
+        counts = self._query(
+            "SELECT (SELECT COUNT(*) FROM warbands), (SELECT COUNT(*) FROM characters), (SELECT COUNT(*) FROM vehicles)"
+        )[0]
+        return {"backend": self.name, "warbands": counts[0], "characters": counts[1], "vehicles": counts[2]}
+
+    def after_fork(self):
+        # A connection inherited from the parent must not be used (or closed) here
+        self._local = threading.local()
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def copy_storage(source, target):
+    """Copy every warband, config, homebrew overlay, character and vehicle; returns counts."""
+    counts = {"warbands": 0, "characters": 0, "vehicles": 0, "configs": 0, "homebrew": 0}
+    for warband in source.list_warbands():
+        target.create_warband(warband)
+        counts["warbands"] += 1
+        config = source.read_config(warband)
+        if config is not None:
+            target.write_config(warband, config)
+            counts["configs"] += 1
+        overlay = source.read_homebrew(warband)
+        if overlay is not None:
+            target.write_homebrew(warband, overlay)
+            counts["homebrew"] += 1
+        for name in source.list_characters(warband):
+            loaded = source.read_character(warband, name)
+            if loaded is not None:
+                target.write_character(warband, name, loaded[0])
+                counts["characters"] += 1
+        for name in source.list_vehicles(warband):
+            data = source.read_vehicle(warband, name)
+            if data is not None:
+                target.write_vehicle(warband, name, data)
+                counts["vehicles"] += 1
+    return counts
+
+
+def verify_copy(source, target):
+    """List every record that differs between two backends (empty when lossless)."""
+    problems = []
+    if source.list_warbands() != target.list_warbands():
+        problems.append("warband lists differ")
+    for warband in source.list_warbands():
+        if source.read_config(warband) != target.read_config(warband):
+            problems.append(f"{warband}: config differs")
+        if source.read_homebrew(warband) != target.read_homebrew(warband):
+            problems.append(f"{warband}: homebrew overlay differs")
+        if source.list_characters(warband) != target.list_characters(warband):
+            problems.append(f"{warband}: character lists differ")
+        for name in source.list_characters(warband):
+            a, b = source.read_character(warband, name), target.read_character(warband, name)
+            if b is None or a[0] != b[0]:
+                problems.append(f"{warband}/{name}: character differs")
+        if source.list_vehicles(warband) != target.list_vehicles(warband):
+            problems.append(f"{warband}: vehicle lists differ")
+        for name in source.list_vehicles(warband):
+            if source.read_vehicle(warband, name) != target.read_vehicle(warband, name):
+                problems.append(f"{warband}/vehicle_{name}: vehicle differs")
+    return problems
+
+
+def main(argv):
+    if not argv or argv[0] not in ("migrate", "export"):
+        print("usage: python -m app.sqlite_storage migrate [warbands_dir] [db_path]")
+        print("       python -m app.sqlite_storage export [db_path] [warbands_dir]")
+        return 2
+    if argv[0] == "migrate":
+        warbands_dir = argv[1] if len(argv) > 1 else "warbands"
+        db_path = argv[2] if len(argv) > 2 else DEFAULT_SQLITE_PATH
+        source, target = FileStorage(warbands_dir), SQLiteStorage(db_path)
+    else:
+        db_path = argv[1] if len(argv) > 1 else DEFAULT_SQLITE_PATH
+        warbands_dir = argv[2] if len(argv) > 2 else "warbands"
+        if not os.path.exists(db_path):
+            print(f"No database at {db_path}")
+            return 1
+        source, target = SQLiteStorage(db_path), FileStorage(warbands_dir)
+    counts = copy_storage(source, target)
+    print(f"Copied {counts}")
+    problems = verify_copy(source, target)
+    for problem in problems:
+        print(f"MISMATCH {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
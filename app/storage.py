@@ -0,0 +1,345 @@
+# storage.py
+"""
+Storage backends for warbands, characters, vehicles and warband configs.
+
+Everything above this module (the character repository, the warband
+index, the config service) talks to a backend through the same small
+set of methods, so the app can keep its data either as the original
+directory tree or in SQLite (see ``app.sqlite_storage``):
+
+    warbands/<warband>/<name>.json            characters
+    warbands/<warband>/vehicle_<name>.json    vehicles
+    warbands/<warband>/warband_config.json    warband settings
+    warbands/<warband>/warband_homebrew.json  homebrew overlay (see app.homebrew)
+
+Writes replace files atomically (temp file + rename), so a crash or a
+concurrent reader never sees a truncated record.
+
+``*_version`` methods return a cheap token that changes whenever the
+stored item changes (None if it does not exist); caches compare tokens
+instead of re-reading data. ``read_character`` and ``write_character``
+also return the token and the stored size in bytes.
+
+The backend is chosen in ``config.json``:
+
+    "storage_backend": "files" (default), "sqlite" or "journal"
+    "sqlite_path": database file, default "warbands.db"
+
+``journal`` keeps the file layout but logs character changes to a
+per-warband journal (see ``app.journal_storage``).
+
+``commit_characters`` writes and deletes several characters of a warband
+as one unit. The file backend first writes the whole change set to a
+``<warband>/transaction-<pid>-<thread>.pending`` redo file (fsynced),
+then applies it and removes the file; ``recover_transactions`` finishes a commit that a crash cut
+short.
+"""
+
+import json
+import os
+import shutil
+import threading
+from contextlib import nullcontext
+
+WARBAND_CONFIG_FILE = "warband_config.json"
+WARBAND_HOMEBREW_FILE = "warband_homebrew.json"
+# Redo records of multi-character commits in progress
+TRANSACTION_PREFIX = "transaction-"
+TRANSACTION_SUFFIX = ".pending"
+VEHICLE_PREFIX = "vehicle_"
+
+DEFAULT_BACKEND = "files"
+DEFAULT_SQLITE_PATH = "warbands.db"
+
+
+def is_vehicle_file(filename):
+    return filename.startswith(VEHICLE_PREFIX) and filename.endswith(".json")
+
+
+def is_character_file(filename):
+    """True for the ``<name>.json`` files in a warband directory that hold characters."""
+    return (
+        filename.endswith(".json")
+        and not filename.startswith(VEHICLE_PREFIX)
+        and filename != WARBAND_CONFIG_FILE
+        and filename != WARBAND_HOMEBREW_FILE
+    )
+
+
+def valid_record_name(name):
+    """True if ``name`` can safely become a file name: no separators, no leading dot or blanks."""
+    if not isinstance(name, str) or not name or name != name.strip() or name.startswith("."):
+        return False
+    return "/" not in name and "\\" not in name
+
+
+def character_name(filename):
+    return filename[:-5]
+
+
+def vehicle_name(filename):
+    return filename[len(VEHICLE_PREFIX):-5]
+
+
+def write_json(path, data, indent=None, fsync=False):
+    """Replace ``path`` atomically: write a temp file beside it, then rename.
+
+    Readers see either the old or the new file, never a truncated one, and
+    a crash mid-write leaves the old file in place.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=indent)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _stat_token(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    # Atomic writes give every version a new inode, so the token changes
+    # even when two writes land in the same mtime tick with the same size
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class FileStorage:
+    """The original one-JSON-file-per-record layout under ``root``."""
+
+    name = "files"
+
+    def __init__(self, root):
+        self.root = root
+        # Per-character lock files (see app.locks); the leading dot keeps
+        # the directory out of the warband listing
+        self.lock_dir = os.path.join(root, ".locks")
+
+    def warband_path(self, warband):
+        return os.path.join(self.root, warband)
+
+    def character_path(self, warband, name):
+        return os.path.join(self.root, warband, f"{name}.json")
+
+    def vehicle_path(self, warband, name):
+        return os.path.join(self.root, warband, f"{VEHICLE_PREFIX}{name}.json")
+
+    def config_path(self, warband):
+        return os.path.join(self.root, warband, WARBAND_CONFIG_FILE)
+
+    def homebrew_path(self, warband):
+        return os.path.join(self.root, warband, WARBAND_HOMEBREW_FILE)
+
+    def transaction_path(self, warband):
+        # One per committing thread: commits over disjoint characters of a
+        # warband run concurrently
+        name = f"{TRANSACTION_PREFIX}{os.getpid()}-{threading.get_ident()}{TRANSACTION_SUFFIX}"
+        return os.path.join(self.root, warband, name)
+
+    def _filenames(self, warband):
+        try:
+            return [e.name for e in os.scandir(self.warband_path(warband)) if e.is_file()]
+        except OSError:
+            return []
+
+    # --- warbands ---
+
+    def list_warbands(self):
+        try:
+            return sorted(e.name for e in os.scandir(self.root) if e.is_dir() and not e.name.startswith("."))
+        except OSError:
+            return []
+
+    def warbands_version(self):
+        """Token that changes when a warband is created or deleted (None: not cheaply known)."""
+        return _stat_token(self.root)
+
+    def warband_exists(self, warband):
+        return os.path.isdir(self.warband_path(warband))
+
+    def warband_version(self, warband):
+        # Adding or removing files moves the directory mtime
+        token = _stat_token(self.warband_path(warband))
+        return token[0] if token is not None else None
+
+    def create_warband(self, warband):
+        os.makedirs(self.warband_path(warband), exist_ok=True)
+
+    def delete_warband(self, warband):
+        path = self.warband_path(warband)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+    # --- warband config ---
+
+    def config_version(self, warband):
+        return _stat_token(self.config_path(warband))
+
+    def read_config(self, warband):
+        """The warband's config dict, or None if it has none."""
+        path = self.config_path(warband)
+        if not os.path.exists(path):
+            return None
+        return read_json(path)
+
+    def write_config(self, warband, config):
+        self.create_warband(warband)
+        write_json(self.config_path(warband), config)
+
+    # --- homebrew overlay ---
+
+    def homebrew_version(self, warband):
+        return _stat_token(self.homebrew_path(warband))
+
+    def read_homebrew(self, warband):
+        """The warband's homebrew overlay dict, or None if it has none."""
+        path = self.homebrew_path(warband)
+        if not os.path.exists(path):
+            return None
+        return read_json(path)
+
+    def write_homebrew(self, warband, overlay):
+        self.create_warband(warband)
+        write_json(self.homebrew_path(warband), overlay, indent=2)
+
+    # --- characters ---
+
+    def list_characters(self, warband):
+        return sorted(character_name(f) for f in self._filenames(warband) if is_character_file(f))
+
+    def character_version(self, warband, name):
+        return _stat_token(self.character_path(warband, name))
+
+    def read_character(self, warband, name):
+        """(data, version, size) for a character, or None if it does not exist."""
+        path = self.character_path(warband, name)
+        token = _stat_token(path)
+        if token is None:
+            return None
+        return read_json(path), token, token[1]
+
+    def write_character(self, warband, name, data):
+        """Store a character; returns its new (version, size)."""
+        self.create_warband(warband)
+        path = self.character_path(warband, name)
+        write_json(path, data, indent=2)
+        token = _stat_token(path)
+        return token, token[1]
+
+    def delete_character(self, warband, name):
+        path = self.character_path(warband, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # --- multi-character commits ---
+
+    def _apply_transaction(self, warband, writes, deletes):
+        versions = {}
+        for name, data in writes.items():
+            versions[name] = self.write_character(warband, name, data)
+        for name in deletes:
+            self.delete_character(warband, name)
+        return versions
+
+    def commit_characters(self, warband, writes, deletes=()):
+        """Write ``writes`` ({name: data}) and delete ``deletes`` as one unit.
+
+        Returns {name: (version, size)} for the written characters. The
+        caller holds the locks of every name involved.
+        """
+        self.create_warband(warband)
+        path = self.transaction_path(warband)
+        # Once the redo record is on disk the commit will complete, even
+        # if we crash halfway through the files
+        write_json(path, {"writes": writes, "deletes": list(deletes)}, fsync=True)
+        versions = self._apply_transaction(warband, writes, deletes)
+        os.remove(path)
+        return versions
+
+    def recover_transactions(self, lock=None):
+        """Finish commits interrupted by a crash; returns how many were replayed.
+
+        ``lock(warband, names)`` (a context manager) keeps recovery from
+        racing a commit that another process is still making.
+        """
+        recovered = 0
+        for warband in self.list_warbands():
+            for filename in self._filenames(warband):
+                if filename.startswith(TRANSACTION_PREFIX) and filename.endswith(TRANSACTION_SUFFIX):
+                    path = os.path.join(self.warband_path(warband), filename)
+                    recovered += self._recover_transaction(warband, path, lock)
+        return recovered
+
+    def _recover_transaction(self, warband, path, lock):
+        try:
+            record = read_json(path)
+        except FileNotFoundError:
+            return 0
+        names = list(record["writes"]) + list(record["deletes"])
+        with lock(warband, names) if lock is not None else nullcontext():
+            # A live commit may have finished while we waited (and the
+            # same thread may have started another under the same name)
+            try:
+                if read_json(path) != record:
+                    return 0
+            except FileNotFoundError:
+                return 0
+            print(f"Replaying interrupted transaction in {warband}")
+            self._apply_transaction(warband, record["writes"], record["deletes"])
+            os.remove(path)
+        return 1
+
+    # --- vehicles ---
+
+    def list_vehicles(self, warband):
+        return sorted(vehicle_name(f) for f in self._filenames(warband) if is_vehicle_file(f))
+
+    def read_vehicle(self, warband, name):
+        path = self.vehicle_path(warband, name)
+        if not os.path.exists(path):
+            return None
+        return read_json(path)
+
+    def write_vehicle(self, warband, name, data):
+        self.create_warband(warband)
+        write_json(self.vehicle_path(warband, name), data)
+
+    def delete_vehicle(self, warband, name):
+        path = self.vehicle_path(warband, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def after_fork(self):
+        """Reset per-process state in a forked worker (see ``app.server``)."""
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+def open_storage(settings, warbands_dir):
+    """Create the backend named by the global config (``GlobalSettings``)."""
+    backend = settings.raw.get("storage_backend", DEFAULT_BACKEND)
+    if backend == "sqlite":
+        from app.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(settings.raw.get("sqlite_path", DEFAULT_SQLITE_PATH))
+    if backend == "journal":
+        from app.journal_storage import JournalStorage
+        return JournalStorage(warbands_dir)
+    if backend != "files":
+        print(f"Unknown storage_backend '{backend}', using files")
+    return FileStorage(warbands_dir)
@@ -0,0 +1,61 @@
+# template_cache.py
+"""
+Compiled-template cache for the Jinja2 environment.
+
+Jinja2 compiles a template to Python code the first time it is used, in
+every process: after a deploy or a worker restart the first request for
+``edit_character.html`` (2,400 lines) pays for parsing and compiling it.
+``setup_templates`` gives the environment a ``FileSystemBytecodeCache``
+in ``TEMPLATE_CACHE_DIR``, so a template is compiled once and every
+later process (forked workers, restarts) loads the stored bytecode.
+Entries are keyed by the template's source checksum: an edited template
+is recompiled, never served stale. Jinja2 writes each entry to a
+temporary file and renames it, so workers can share the directory.
+
+``precompile_templates`` loads every template up front, at startup
+(before ``app.server`` forks, so the workers inherit them compiled).
+
+With ``auto_reload`` off the environment no longer ``stat``s a template's
+file on every render to see whether it changed. Templates only change
+with a deploy, which restarts the server, so production turns it off
+(``"template_auto_reload": false`` in config.json; ``app.server`` defaults
+to off). ``uvicorn main:app --reload`` keeps it on by default.
+"""
+
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache, TemplateError
+
+TEMPLATE_CACHE_DIR = ".template_cache"
+TEMPLATE_SUFFIXES = (".html",)
+
+
+def setup_templates(env, auto_reload=True, cache_dir=TEMPLATE_CACHE_DIR):
+    """Attach the shared bytecode cache to ``env`` and set its reload checks."""
+    os.makedirs(cache_dir, exist_ok=True)
+    env.bytecode_cache = FileSystemBytecodeCache(cache_dir, "%s.jinja")
+    env.auto_reload = auto_reload
+    return env
+
+
+def precompile_templates(env):
+    """Load (compile or read from the bytecode cache) every template.
+
+    Returns ``{"templates", "errors", "seconds"}``. A template that fails
+    to compile is reported and skipped; it fails again on first use.
+    """
+    started = time.perf_counter()
+    names = env.list_templates(filter_func=lambda name: name.endswith(TEMPLATE_SUFFIXES))
+    errors = 0
+    for name in names:
+        try:
+            env.get_template(name)
+        except TemplateError as e:
+            errors += 1
+            print(f"Error precompiling template {name}: {e}")
+    return {
+        "templates": len(names) - errors,
+        "errors": errors,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
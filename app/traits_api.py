@@ -1,9 +1,17 @@
 # traits_api.py
 """
 API for Planet 28 character traits.
+
+``TRAITS`` holds the built-in traits. It is loaded before the server
+forks its workers and never changes at runtime; custom traits live in
+the shared store of ``app.custom_content``. Entries returned by this
+module are shared between requests and must be treated as read-only.
 """
 
-TRAITS = [
+from app.catalog_cache import NameIndex
+from app.custom_content import add_entry, custom_content_snapshot, custom_entries
+
+TRAITS = (
     {"name": "Ammo smith", "cost": 15, "effect": "After each game this character may craft 1 piece of ammo for any weapon of their choice. This is automatically added to their equipment."},
     {"name": "Animal", "cost": -20, "effect": "Cannot use abilities or shoot. -1(P) during break tests.", "modifiers": {"Psyche": -1}},
     {"name": "Armless", "cost": -20, "effect": "Missing an arm. May only wield a single 1 handed weapon or use a single item at any time."},
@@ -51,19 +59,31 @@ TRAITS = [
     {"name": "Unearthly", "cost": 40, "effect": "Can only be damaged by weapons with Psychic, Arcane, or Demonic keyword."},
     {"name": "Venal", "cost": -12, "effect": "Must always convert spare campaign points to credits, cannot save campaign points."},
     {"name": "Zealot", "cost": 15, "effect": "Whenever this character takes damage, roll 1D10. On a 10, gain +1 (F) and (A) for the rest of the game (max 10)."},
-]
+)
+
+def _build_catalog(data):
+    """Built-in plus custom traits, and a name index whose entries all carry ``modifiers``."""
+    traits = TRAITS + custom_entries(data, "traits")
+    index = NameIndex([t if "modifiers" in t else {**t, "modifiers": {}} for t in traits])
+    return traits, index
+
+def _catalog():
+    # Rebuilt only when the custom content store changes
+    return custom_content_snapshot().derived("traits", _build_catalog)
 
 def list_traits():
-    """Return all traits."""
-    return TRAITS
+    """Return all traits (a tuple, built-in first)."""
+    return _catalog()[0]
+
+def get_trait_index():
+    """Return the name index for the built-in and custom traits."""
+    return _catalog()[1]
 
 def get_trait(name):
     """Get a trait by name (case-insensitive)."""
-    for trait in TRAITS:
-        if trait["name"].lower() == name.lower():
-            if "modifiers" not in trait:
-                trait["modifiers"] = {}
-            return trait
+    trait = get_trait_index().get_folded(name)
+    if trait is not None:
+        return trait
     return {"name": name, "modifiers": {}}
 
 def add_trait_to_character(character, trait_name):
@@ -76,10 +96,8 @@ def add_trait_to_character(character, trait_name):
     return False
 
 def add_custom_trait(name, cost, effect):
-    """Add a custom trait to the trait list for this session."""
-    trait = {"name": name, "cost": cost, "effect": effect}
+    """Add a custom trait to the shared store, for every worker."""
     # Prevent duplicates by name
-    if not any(t["name"].lower() == name.lower() for t in TRAITS):
-        TRAITS.append(trait)
-        return True
-    return False
+    if get_trait_index().get_folded(name) is not None:
+        return False
+    return add_entry("traits", name, lambda existing: {"name": name, "cost": cost, "effect": effect})
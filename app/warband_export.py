@@ -0,0 +1,187 @@
+# warband_export.py
+"""
+Streaming, machine-readable export of warbands.
+
+Records are produced by a generator pipeline (warbands -> names ->
+one character at a time -> encoder), so memory stays flat however big
+the roster is and the first bytes are ready as soon as the first
+warband has been listed. Two formats:
+
+``ndjson``: one JSON object per line, in a stable order (warbands and
+names sorted), which diffs well between nightly archives::
+
+    {"type": "warband", "name": "Raiders", "config": {"homebrew_enabled": false}}
+    {"type": "homebrew", "warband": "Raiders", "data": {"traits": [...], ...}}
+    {"type": "character", "warband": "Raiders", "name": "Rook", "data": {...}}
+    {"type": "vehicle", "warband": "Raiders", "name": "Buggy", "data": {...}}
+
+A ``homebrew`` record (the warband's overlay, see ``app.homebrew``) is
+only written for warbands that have one, before their characters.
+
+``tar`` / ``tar.gz``: the file-backend layout
+(``<warband>/<name>.json``, ``<warband>/vehicle_<name>.json``,
+``<warband>/warband_config.json``, ``<warband>/warband_homebrew.json``), so an archive unpacked into
+``warbands/`` is a working data directory whatever backend it came from.
+
+The app serves both at ``GET /api/export`` and
+``GET /api/warbands/{warband}/export`` (``?format=ndjson|tar|tar.gz``).
+From the command line (the backend comes from ``config.json``):
+
+    python -m app.warband_export [--format=ndjson|tar|tar.gz] [--output=FILE] [warband ...]
+"""
+
+import io
+import json
+import sys
+import tarfile
+import time
+
+from app.storage import VEHICLE_PREFIX, WARBAND_CONFIG_FILE, WARBAND_HOMEBREW_FILE
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "tar": ("application/x-tar", "tar"),
+    "tar.gz": ("application/gzip", "tar.gz"),
+}
+
+
+def _storage_reader(storage):
+    def read(warband, name):
+        loaded = storage.read_character(warband, name)
+        return loaded[0] if loaded is not None else None
+    return read
+
+
+def iter_records(storage, warbands=None, read_character=None):
+    """Yield export records one at a time.
+
+    ``warbands`` limits the export (default: every warband).
+    ``read_character(warband, name)`` defaults to reading storage; the app
+    passes ``CharacterRepository.read`` so unflushed autosaves are included.
+    """
+    if read_character is None:
+        read_character = _storage_reader(storage)
+    names = storage.list_warbands() if warbands is None else warbands
+    for warband in names:
+        if not storage.warband_exists(warband):
+            continue
+        yield {"type": "warband", "name": warband, "config": storage.read_config(warband)}
+        overlay = storage.read_homebrew(warband)
+        if overlay is not None:
+            yield {"type": "homebrew", "warband": warband, "data": overlay}
+        for name in storage.list_characters(warband):
+            data = read_character(warband, name)
+            # Removed since the listing
+            if data is not None:
+                yield {"type": "character", "warband": warband, "name": name, "data": data}
+        for name in storage.list_vehicles(warband):
+            data = storage.read_vehicle(warband, name)
+            if data is not None:
+                yield {"type": "vehicle", "warband": warband, "name": name, "data": data}
+
+
+def iter_ndjson(records):
+    for record in records:
+        yield (json.dumps(record) + "\n").encode("utf-8")
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only file object that hands out what was written so far."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _member_path(record):
+    if record["type"] == "warband":
+        return f"{record['name']}/{WARBAND_CONFIG_FILE}"
+    if record["type"] == "homebrew":
+        return f"{record['warband']}/{WARBAND_HOMEBREW_FILE}"
+    if record["type"] == "vehicle":
+        return f"{record['warband']}/{VEHICLE_PREFIX}{record['name']}.json"
+    return f"{record['warband']}/{record['name']}.json"
+
+
+def iter_tar(records, compress=False):
+    """Stream records as a tar archive in the file-backend layout."""
+    out = _Chunks()
+    now = time.time()
+    with tarfile.open(fileobj=out, mode="w|gz" if compress else "w|") as archive:
+        for record in records:
+            if record["type"] == "warband":
+                if record["config"] is None:
+                    continue
+                data, indent = record["config"], None
+            else:
+                # Characters and overlays are stored indented, vehicles compact
+                data, indent = record["data"], None if record["type"] == "vehicle" else 2
+            body = json.dumps(data, indent=indent).encode("utf-8")
+            info = tarfile.TarInfo(_member_path(record))
+            info.size = len(body)
+            info.mtime = now
+            archive.addfile(info, io.BytesIO(body))
+            # TarFile remembers every member it wrote; not needed for writing
+            archive.members.clear()
+            chunk = out.drain()
+            if chunk:
+                yield chunk
+    # Closing wrote the end-of-archive blocks (and the gzip trailer)
+    chunk = out.drain()
+    if chunk:
+        yield chunk
+
+
+def iter_export(records, fmt):
+    """Encode ``records`` as a stream of byte chunks in format ``fmt``."""
+    if fmt == "ndjson":
+        return iter_ndjson(records)
+    if fmt in ("tar", "tar.gz"):
+        return iter_tar(records, compress=fmt == "tar.gz")
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def main(argv):
+    from app.config_service import ConfigService
+    from app.storage import open_storage
+
+    fmt, output, warbands = "ndjson", None, []
+    for arg in argv:
+        if arg.startswith("--format="):
+            fmt = arg.split("=", 1)[1]
+        elif arg.startswith("--output="):
+            output = arg.split("=", 1)[1]
+        elif arg.startswith("--"):
+            print("usage: python -m app.warband_export [--format=ndjson|tar|tar.gz] [--output=FILE] [warband ...]")
+            return 2
+        else:
+            warbands.append(arg)
+    if fmt not in FORMATS:
+        print(f"Unknown format {fmt}; use one of {', '.join(FORMATS)}", file=sys.stderr)
+        return 2
+    storage = open_storage(ConfigService().global_settings(), "warbands")
+    chunks = iter_export(iter_records(storage, warbands or None), fmt)
+    target = open(output, "wb") if output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            target.write(chunk)
+    finally:
+        if output:
+            target.close()
+        storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
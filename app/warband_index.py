@@ -0,0 +1,243 @@
+# warband_index.py
+"""
+Per-warband summary index for the dashboard and warband listings.
+
+Each summary holds what the warband pages need without opening every
+character: character names with their points, vehicle names, the total
+points spent and the warband's homebrew flag. Summaries are built once
+from storage and then kept current by the code that changes a warband
+(character saves/removals, vehicle add/remove, homebrew toggles), so a
+dashboard load costs one version check of the warband no matter how
+many characters it has.
+
+A summary is rebuilt whenever the warband's storage version (the
+directory mtime for the file backend) no longer matches the one recorded
+after the last known change, which catches records added or removed
+outside the app. Changes made to a file's contents outside the app are
+not seen until a rebuild, which the running app does on
+``POST /api/warband_index/rebuild``. To check what a rebuild would
+produce from storage alone:
+
+    python -m app.warband_index rebuild [warbands_dir]
+"""
+
+import json
+import sys
+import threading
+
+from app.config_service import ConfigService, as_bool
+from app.storage import open_storage
+
+
+def character_points(character):
+    try:
+        return int(character.get("Points", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+class WarbandSummary:
+    """What the dashboard needs to know about one warband."""
+
+    __slots__ = ("name", "characters", "vehicles", "homebrew_enabled", "created_at", "version")
+
+    def __init__(self, name):
+        self.name = name
+        # Character name -> points
+        self.characters = {}
+        self.vehicles = set()
+        # None when the warband has no readable config (use the global setting)
+        self.homebrew_enabled = None
+        # When the warband was created, from its config (None if unknown)
+        self.created_at = None
+        self.version = None
+
+    @property
+    def character_names(self):
+        return sorted(self.characters)
+
+    @property
+    def vehicle_names(self):
+        return sorted(self.vehicles)
+
+    @property
+    def total_points(self):
+        return sum(self.characters.values())
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "characters": dict(sorted(self.characters.items())),
+            "vehicles": self.vehicle_names,
+            "total_points": self.total_points,
+            "homebrew_enabled": self.homebrew_enabled,
+            "created_at": self.created_at,
+        }
+
+
+class WarbandIndex:
+    """In-memory summaries of every warband in a storage backend, updated incrementally."""
+
+    def __init__(self, storage, load_character=None):
+        self.storage = storage
+        # Called as load_character(warband, name) during rebuilds; the
+        # repository passes its own reader so buffered autosaves count
+        self.load_character = load_character
+        self._summaries = {}
+        # Bumped by every change to any summary, so views built from the
+        # summaries (see app.warband_listing) know when to refresh
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "rebuilds": 0, "updates": 0}
+
+    def _load(self, warband, name):
+        if self.load_character is not None:
+            return self.load_character(warband, name)
+        loaded = self.storage.read_character(warband, name)
+        return loaded[0] if loaded is not None else None
+
+    # --- building ---
+
+    def _build(self, warband):
+        """Read one warband from storage; returns None if it does not exist."""
+        version = self.storage.warband_version(warband)
+        if version is None:
+            return None
+        summary = WarbandSummary(warband)
+        summary.version = version
+        summary.vehicles.update(self.storage.list_vehicles(warband))
+        try:
+            config = self.storage.read_config(warband)
+            if config is not None:
+                summary.homebrew_enabled = as_bool(config.get("homebrew_enabled", False))
+                summary.created_at = config.get("created_at")
+        except Exception as e:
+            print(f"Error reading warband config: {e}")
+        for name in self.storage.list_characters(warband):
+            try:
+                summary.characters[name] = character_points(self._load(warband, name))
+            except Exception as e:
+                print(f"Error indexing character {warband}/{name}: {e}")
+                summary.characters[name] = 0
+        return summary
+
+    def rebuild(self, warband=None):
+        """Rebuild one warband's summary, or every warband's, from storage."""
+        with self._lock:
+            if warband is not None:
+                names = [warband]
+            else:
+                self._summaries.clear()
+                names = self.storage.list_warbands()
+            self.generation += 1
+            for name in names:
+                summary = self._build(name)
+                self._stats["rebuilds"] += 1
+                if summary is None:
+                    self._summaries.pop(name, None)
+                else:
+                    self._summaries[name] = summary
+
+    # --- reads ---
+
+    def get(self, warband):
+        """Return the current summary of ``warband``, or None if it does not exist."""
+        version = self.storage.warband_version(warband)
+        with self._lock:
+            if version is None:
+                if self._summaries.pop(warband, None) is not None:
+                    self.generation += 1
+                return None
+            summary = self._summaries.get(warband)
+            if summary is not None and summary.version == version:
+                self._stats["hits"] += 1
+                return summary
+            # New, or records were added/removed behind our back
+            self.rebuild(warband)
+            return self._summaries.get(warband)
+
+    def peek(self, warband):
+        """The summary we hold for ``warband`` without checking storage (built if missing)."""
+        with self._lock:
+            summary = self._summaries.get(warband)
+        return summary if summary is not None else self.get(warband)
+
+    def list_warbands(self):
+        """Summaries of every warband, sorted by name."""
+        summaries = [self.get(name) for name in self.storage.list_warbands()]
+        return [s for s in summaries if s is not None]
+
+    # --- incremental updates ---
+
+    def _update(self, warband, change):
+        """Apply ``change(summary)`` to a summary we already hold.
+
+        Warbands that are not indexed yet are left alone: they are built
+        from disk, change included, the first time they are read.
+        """
+        with self._lock:
+            summary = self._summaries.get(warband)
+            if summary is None:
+                return
+            change(summary)
+            # Our own writes move the warband's storage version
+            summary.version = self.storage.warband_version(warband)
+            self.generation += 1
+            self._stats["updates"] += 1
+
+    def put_character(self, warband, name, character):
+        points = character_points(character)
+        self._update(warband, lambda s: s.characters.__setitem__(name, points))
+
+    def remove_character(self, warband, name):
+        self._update(warband, lambda s: s.characters.pop(name, None))
+
+    def apply_changes(self, warband, characters, removed=()):
+        """Record several saved characters ({name: data}) and removals in one update."""
+        points = {name: character_points(data) for name, data in characters.items()}
+
+        def change(summary):
+            for name in removed:
+                summary.characters.pop(name, None)
+            summary.characters.update(points)
+        self._update(warband, change)
+
+    def put_vehicle(self, warband, name):
+        self._update(warband, lambda s: s.vehicles.add(name))
+
+    def remove_vehicle(self, warband, name):
+        self._update(warband, lambda s: s.vehicles.discard(name))
+
+    def set_homebrew(self, warband, enabled):
+        def change(summary):
+            summary.homebrew_enabled = enabled
+        self._update(warband, change)
+
+    def forget(self, warband):
+        with self._lock:
+            self._summaries.pop(warband, None)
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["warbands"] = len(self._summaries)
+        return stats
+
+
+def main(argv):
+    if not argv or argv[0] != "rebuild":
+        print("usage: python -m app.warband_index rebuild [warbands_dir]")
+        print("(the backend is chosen by storage_backend in config.json)")
+        return 2
+    root = argv[1] if len(argv) > 1 else "warbands"
+    storage = open_storage(ConfigService().global_settings(), root)
+    index = WarbandIndex(storage)
+    index.rebuild()
+    for summary in index.list_warbands():
+        print(json.dumps(summary.to_dict()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,187 @@
+# warband_listing.py
+"""
+Sorted, cursor-paginated listing of warbands.
+
+The names of all warbands come from one ``os.scandir`` of the warbands
+directory (``storage.list_warbands``) and are kept until the directory
+itself changes (``storage.warbands_version``), so a page view costs one
+``stat`` instead of a scan plus a config read per warband.
+
+Sort orders:
+
+``name``     by warband name; only the summaries of the page are loaded.
+``created``  by the ``created_at`` stamp in the warband config (ISO and
+             ``9/14/2025 7:57:23 PM`` stamps are compared as dates;
+             missing ones sort first, unreadable ones last).
+``points``   by total points spent.
+
+The ``created`` and ``points`` orders are built from the warband summary
+index (``app.warband_index``) and kept until a summary changes or
+``LISTING_TTL`` seconds pass; the TTL re-checks every warband against
+storage so edits made outside the app are picked up too.
+
+Pages are addressed with an opaque cursor naming the last warband of
+the previous page (its sort key and name), so pages stay stable while
+warbands are added or removed elsewhere in the list.
+"""
+
+import base64
+import bisect
+import datetime
+import json
+import threading
+import time
+
+SORTS = ("name", "created", "points")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rebuild the created/points orders from storage at least this often
+LISTING_TTL = 30.0
+# created_at formats besides ISO (older configs were written by hand)
+CREATED_FORMATS = ("%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y")
+
+
+def encode_cursor(key):
+    raw = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """The (sort key, name) a cursor points at; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, list) or len(key) != 2 or not isinstance(key[1], str):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+def _created_key(value):
+    """A string that sorts ``created_at`` stamps chronologically, whatever their type or format."""
+    # Warbands without a creation stamp sort first
+    if value is None or value == "":
+        return ""
+    text = str(value).strip()
+    try:
+        return datetime.datetime.fromisoformat(text).replace(tzinfo=None).isoformat()
+    except ValueError:
+        pass
+    for fmt in CREATED_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).isoformat()
+        except ValueError:
+            continue
+    # Unreadable stamps sort after every date ("~" sorts after digits)
+    return "~" + text
+
+
+def _sort_key(sort, summary):
+    if sort == "points":
+        return summary.total_points
+    return _created_key(summary.created_at)
+
+
+class WarbandListing:
+    def __init__(self, storage, index, ttl=LISTING_TTL):
+        self.storage = storage
+        self.index = index
+        self.ttl = ttl
+        self._names = None
+        self._names_version = None
+        # (name, name) keys of the name order, built with each scan
+        self._name_keys = []
+        # sort -> (names version, index generation, built at, sorted keys)
+        self._orders = {}
+        self._lock = threading.Lock()
+        self._stats = {"scans": 0, "sorts": 0, "pages": 0}
+
+    def names(self):
+        """Every warband name, sorted; rescanned only when the warbands directory changes."""
+        version = self.storage.warbands_version()
+        with self._lock:
+            if self._names is not None and version is not None and version == self._names_version:
+                return self._names
+        names = self.storage.list_warbands()
+        name_keys = [(name, name) for name in names]
+        with self._lock:
+            self._names, self._names_version, self._name_keys = names, version, name_keys
+            self._stats["scans"] += 1
+        return names
+
+    def _keys(self, sort):
+        """(sort key, name) of every warband, ascending."""
+        names = self.names()
+        if sort == "name":
+            with self._lock:
+                return self._name_keys
+        now = time.monotonic()
+        with self._lock:
+            cached = self._orders.get(sort)
+            version = self._names_version
+        if cached is not None and cached[0] == version and now - cached[2] < self.ttl:
+            if cached[1] == self.index.generation:
+                return cached[3]
+            # A summary changed: re-sort what the index holds, without I/O
+            load = self.index.peek
+        else:
+            load = self.index.get
+        summaries = [load(name) for name in names]
+        keys = sorted((_sort_key(sort, s), s.name) for s in summaries if s is not None)
+        built_at = now if load == self.index.get else cached[2]
+        with self._lock:
+            self._orders[sort] = (version, self.index.generation, built_at, keys)
+            self._stats["sorts"] += 1
+        return keys
+
+    def page(self, sort="name", order="asc", limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """One page of warbands; raises ValueError on a bad sort, order or cursor."""
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be asc or desc")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        keys = self._keys(sort)
+        after = decode_cursor(cursor) if cursor else None
+        try:
+            if order == "asc":
+                start = bisect.bisect_right(keys, after) if after is not None else 0
+                chunk = keys[start:start + limit]
+                more = start + limit < len(keys)
+            else:
+                end = bisect.bisect_left(keys, after) if after is not None else len(keys)
+                chunk = keys[max(0, end - limit):end][::-1]
+                more = end - limit > 0
+        except TypeError:
+            # A cursor from a different sort order
+            raise ValueError("Invalid cursor") from None
+
+        warbands = []
+        for _, name in chunk:
+            summary = self.index.peek(name)
+            if summary is None:
+                continue
+            warbands.append({
+                "name": summary.name,
+                "homebrew_enabled": bool(summary.homebrew_enabled),
+                "total_points": summary.total_points,
+                "characters": len(summary.characters),
+                "created_at": summary.created_at,
+            })
+        with self._lock:
+            self._stats["pages"] += 1
+        return {
+            "warbands": warbands,
+            "next_cursor": encode_cursor(chunk[-1]) if more and chunk else None,
+            "total": len(keys),
+            "sort": sort,
+            "order": order,
+            "limit": limit,
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_names"] = len(self._names) if self._names is not None else 0
+        return stats
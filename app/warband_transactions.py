@@ -0,0 +1,257 @@
+# warband_transactions.py
+"""
+Warband transactions: changes to several characters that commit together.
+
+``POST /api/warbands/{warband}/transactions`` takes a list of steps::
+
+    {"steps": [
+        {"op": "transfer", "kind": "weapon", "name": "Pistol", "from": "Rook", "to": "Vex"},
+        {"op": "items", "character": "Vex", "operations": [{"op": "add", "kind": "trait", "name": "Brawler"}]},
+        {"op": "patch", "character": "Rook", "patch": [{"op": "replace", "path": "/Notes", "value": ""}]},
+        {"op": "rename", "character": "Rook", "to": "Raven"}
+     ],
+     "if_match": {"Vex": "\\"<etag>\\""}}
+
+``items`` and ``patch`` steps take the operations of the single-character
+endpoints (``app.item_operations``, ``app.character_patch``); a
+``transfer`` removes one item from a character and adds it to another.
+Steps run in order against the state the earlier steps left.
+
+Every character named by a step is locked (in sorted order, so two
+transactions over the same roster cannot deadlock) before anything is
+read. All steps are applied in memory, each changed character is
+re-priced for the fields it touched, and only then is everything
+written in one atomic storage commit (``CharacterRepository.commit``),
+which also updates the warband summary once. If any step fails nothing
+is written.
+
+Measure throughput under contention with:
+
+    python -m app.warband_transactions bench [threads] [transactions] [characters] [--backend=files|sqlite|journal]
+"""
+
+import random
+import sys
+import threading
+import time
+
+from app.character_patch import reprice, validate_fields
+from app.character_repository import content_etag
+from app.item_operations import apply_item_operations
+from app.json_patch import PatchConflict, PatchError, apply_patch
+from app.storage import valid_record_name
+
+STEP_OPS = ("transfer", "items", "patch", "rename")
+
+
+class PreconditionFailed(PatchError):
+    """A character's If-Match ETag is stale."""
+
+    status = 412
+
+
+class InvalidName(PatchError):
+    """A warband or character name that cannot be stored (or locked)."""
+
+    status = 422
+
+
+def _step_names(step, position):
+    """Names of the characters a step reads or writes."""
+    if not isinstance(step, dict) or step.get("op") not in STEP_OPS:
+        raise PatchError(f"Step {position}: op must be one of {', '.join(STEP_OPS)}")
+    if step["op"] == "transfer":
+        names = [step.get("from"), step.get("to")]
+    elif step["op"] == "rename":
+        names = [step.get("character"), step.get("to")]
+    else:
+        names = [step.get("character")]
+    for name in names:
+        if not valid_record_name(name):
+            raise InvalidName(f"Step {position}: invalid character name {name!r}")
+    return names
+
+
+class _Working:
+    """In-memory state of the characters a transaction touches."""
+
+    def __init__(self, repository, warband, names):
+        # name -> (stored data, its ETag), or None if it does not exist
+        self.stored = {}
+        for name in names:
+            data = repository.peek(warband, name)
+            self.stored[name] = (data, content_etag(data)) if data is not None else None
+        # name -> current data (None: absent); starts out as the stored data
+        self.current = {name: (s[0] if s else None) for name, s in self.stored.items()}
+        # name -> (name it was stored under, fields changed)
+        self.changes = {}
+
+    def get(self, name):
+        data = self.current[name]
+        if data is None:
+            raise PatchConflict(f"Character not found: {name}")
+        return data
+
+    def set(self, name, data, fields, origin=None):
+        previous = self.changes.get(name, (origin or name, set()))
+        self.current[name] = data
+        self.changes[name] = (previous[0], previous[1] | set(fields))
+
+
+def _apply_step(working, step, homebrew_enabled, tables):
+    op = step["op"]
+    if op == "items":
+        updated, fields = apply_item_operations(working.get(step["character"]), step.get("operations"), homebrew_enabled, tables)
+        working.set(step["character"], updated, fields)
+    elif op == "patch":
+        patched, fields = apply_patch(working.get(step["character"]), step.get("patch"))
+        validate_fields(patched, fields)
+        working.set(step["character"], patched, fields)
+    elif op == "transfer":
+        source, target = step["from"], step["to"]
+        if source == target:
+            raise PatchError("Cannot transfer to the same character")
+        item = {"kind": step.get("kind"), "name": step.get("name")}
+        updated, fields = apply_item_operations(working.get(source), [dict(item, op="remove")], homebrew_enabled, tables)
+        working.set(source, updated, fields)
+        updated, fields = apply_item_operations(working.get(target), [dict(item, op="add")], homebrew_enabled, tables)
+        working.set(target, updated, fields)
+    else:
+        old, new = step["character"], step["to"]
+        data = working.get(old)
+        if working.current[new] is not None:
+            raise PatchConflict(f"Character already exists: {new}")
+        origin, fields = working.changes.pop(old, (old, set()))
+        working.current[old] = None
+        working.set(new, {**data, "Name": new}, fields | {"Name"}, origin=origin)
+
+
+def run_transaction(repository, warband, steps, homebrew_enabled=False, if_match=None, tables=None):
+    """Apply ``steps`` to a warband's characters and commit them atomically.
+
+    ``if_match`` optionally maps character names to the ETags the client
+    last read; ``tables`` are the warband's cost tables (default: shared). Returns ``{"characters": {name: {"points", "etag"}},
+    "deleted": [...]}``. Raises ``PatchError`` (or a subclass) with the
+    HTTP status to report; nothing is written in that case.
+    """
+    if not valid_record_name(warband):
+        raise InvalidName(f"Invalid warband name {warband!r}")
+    if not isinstance(steps, list) or not steps:
+        raise PatchError("steps must be a non-empty list")
+    if_match = if_match or {}
+    if not isinstance(if_match, dict):
+        raise PatchError("if_match must map character names to ETags")
+    # Every name is used as a lock key, so it is checked like a stored name
+    for name in if_match:
+        if not valid_record_name(name):
+            raise InvalidName(f"if_match: invalid character name {name!r}")
+    names = set(if_match)
+    for position, step in enumerate(steps):
+        names.update(_step_names(step, position))
+
+    with repository.lock(warband, *names):
+        working = _Working(repository, warband, names)
+        for name, etag in if_match.items():
+            stored = working.stored[name]
+            if stored is None or stored[1] != etag:
+                raise PreconditionFailed(f"Character has changed: {name}")
+        for position, step in enumerate(steps):
+            try:
+                _apply_step(working, step, homebrew_enabled, tables)
+            except PatchError as e:
+                raise type(e)(f"Step {position}: {e}") from None
+
+        writes, result = {}, {}
+        for name, (origin, fields) in working.changes.items():
+            data = working.current[name]
+            if data is None:
+                continue
+            etag = working.stored[origin][1]
+            new_etag, _ = reprice(etag, data, fields, homebrew_enabled, tables)
+            if new_etag != etag or name != origin:
+                writes[name] = data
+            result[name] = {"points": data["Points"], "etag": new_etag}
+        deleted = sorted(n for n, s in working.stored.items() if s is not None and working.current[n] is None)
+        if writes or deleted:
+            repository.commit(warband, writes, deleted)
+    return {"characters": result, "deleted": deleted}
+
+
+def bench(threads=8, transactions=200, characters=10, backend="files"):
+    """Random weapon transfers between ``characters`` characters from ``threads`` threads.
+
+    Prints throughput and lock contention; returns True if no weapon was
+    lost or duplicated.
+    """
+    import shutil
+    import tempfile
+    from app.character_repository import CharacterRepository
+    from app.storage import FileStorage
+
+    root = tempfile.mkdtemp(prefix="warband-txn-")
+    if backend == "sqlite":
+        from app.sqlite_storage import SQLiteStorage
+        storage = SQLiteStorage(f"{root}/bench.db")
+    elif backend == "journal":
+        from app.journal_storage import JournalStorage
+        storage = JournalStorage(root)
+    else:
+        storage = FileStorage(root)
+    repo = CharacterRepository(storage)
+    roster = [f"c{i}" for i in range(characters)]
+    per_character = 4
+    repo.commit("bench", {n: {"Name": n, "Weapons": ["Fist"] * per_character, "Points": 0} for n in roster})
+    counts = {"committed": 0, "conflicts": 0}
+    counts_lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(transactions):
+            source, target = rng.sample(roster, 2)
+            try:
+                run_transaction(repo, "bench", [
+                    {"op": "transfer", "kind": "weapon", "name": "Fist", "from": source, "to": target},
+                ])
+                outcome = "committed"
+            except PatchConflict:
+                # The source had nothing left to give
+                outcome = "conflicts"
+            with counts_lock:
+                counts[outcome] += 1
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(repo.get("bench", n)["Weapons"]) for n in roster)
+    summary = repo.index.get("bench")
+    locks = repo.locks.stats()
+    print(f"backend={storage.name} threads={threads} characters={characters}")
+    print(f"{counts['committed']} committed, {counts['conflicts']} conflicts in {elapsed:.2f}s "
+          f"({(counts['committed'] + counts['conflicts']) / elapsed:.0f} tx/s)")
+    print(f"lock waits: {locks['contended']} ({locks['wait_ms']:.0f} ms total)")
+    print(f"weapons: expected {characters * per_character}, found {total}; "
+          f"summary characters {len(summary.characters) if summary else 0}")
+    repo.close()
+    storage.close()
+    shutil.rmtree(root)
+    return total == characters * per_character
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args or args[0] != "bench":
+        print("usage: python -m app.warband_transactions bench [threads] [transactions] [characters] "
+              "[--backend=files|sqlite|journal]")
+        sys.exit(2)
+    backend = "files"
+    for arg in sys.argv[1:]:
+        if arg.startswith("--backend="):
+            backend = arg.split("=", 1)[1]
+    ok = bench(*[int(a) for a in args[1:4]], backend=backend)
+    print("OK" if ok else "LOST ITEMS")
+    sys.exit(0 if ok else 1)
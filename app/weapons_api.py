@@ -1,30 +1,29 @@
-import json
 import os
+from app.catalog_cache import NameIndex, get_snapshot
+
+WEAPONS_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'weapons_data.json')
+
+def get_weapons_snapshot():
+    """Return the cached weapons catalog snapshot."""
+    # Return empty data if file not found or invalid
+    return get_snapshot(WEAPONS_DATA_FILE, {"weapons": [], "special_rules": {}})
 
 def get_weapons_data():
-    """Load weapons data from the JSON file."""
-    try:
-        weapons_path = os.path.join(os.path.dirname(__file__), 'weapons_data.json')
-        with open(weapons_path, 'r') as f:
-            data = json.load(f)
-        return data
-    except Exception as e:
-        print(f"Error loading weapons data: {e}")
-        # Return empty data if file not found or invalid
-        return {"weapons": [], "special_rules": {}}
+    """Load weapons data from the JSON file (cached, treat as read-only)."""
+    return get_weapons_snapshot().data
 
 def list_weapons():
     """Return the list of all available weapons."""
     data = get_weapons_data()
     return data.get("weapons", [])
 
+def get_weapons_index():
+    """Return the name index for the current weapons catalog."""
+    return get_weapons_snapshot().derived("name_index", lambda data: NameIndex(data.get("weapons", [])))
+
 def get_weapon(name):
     """Get a specific weapon by name."""
-    weapons = list_weapons()
-    for weapon in weapons:
-        if weapon["name"] == name:
-            return weapon
-    return None
+    return get_weapons_index().get(name)
 
 def get_weapon_types():
     """Return a list of unique weapon types."""
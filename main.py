@@ -4,51 +4,63 @@
 
 
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
 import json
-import shutil
 import datetime
-from app.traits_api import list_traits, get_trait
-from app.abilities_api import list_abilities, get_ability
-from app.arcana_api import list_arcana
+from urllib.parse import quote
+from contextlib import asynccontextmanager
+from app.async_storage import AsyncStorage
+from app.bulk_import import IMPORT_MAX_ERRORS, BulkImporter
+from app.character_patch import complete_character, new_character, patch_character, patch_stats, store_normalized
+from app.character_repository import CharacterRepository, content_etag
+from app.config_service import ConfigService, as_bool
+from app.io_executor import IO_MAX_QUEUE, IO_WORKERS, IOExecutor
+from app.item_operations import apply_and_price
+from app.json_patch import PatchError
+from app.page_cache import PAGE_CACHE_SIZE, PageCache
+from app.storage import open_storage
+from app.template_cache import precompile_templates, setup_templates
+from app.warband_listing import WarbandListing
+from app.warband_export import FORMATS as EXPORT_FORMATS, iter_export, iter_records
+from app.warband_transactions import run_transaction
+from app.traits_api import list_traits, get_trait, add_custom_trait
+from app.abilities_api import list_abilities, get_ability, add_custom_ability
+from app.arcana_api import list_arcana, add_custom_arcana
+from app.custom_content import KINDS as CUSTOM_KINDS, custom_content_snapshot, custom_entries
+from app.homebrew import OVERLAY_KINDS as HOMEBREW_KINDS, HomebrewCatalogs
 from app.weapons_api import list_weapons, get_weapon_types, get_special_rules
 from app.armour_api import list_armour, get_armour, get_armour_special_rules
 from app.misc_items_api import get_all_misc_items, get_misc_item_by_name, get_misc_items_special_rules
+from app.points_engine import POINTS_MEMO, SKILLS, get_catalog_bundle, loadout_from_character, price_loadout, price_loadout_cached, price_loadouts
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile every template now rather than on its first request
+    print(f"Precompiled templates: {precompile_templates(templates.env)}")
+    CHARACTERS.start()
+    yield
+    # Write out any autosaves still waiting in the buffer
+    CHARACTERS.close()
+    IO_EXECUTOR.shutdown()
+    STORAGE.close()
+
+app = FastAPI(lifespan=lifespan)
 templates = Jinja2Templates(directory="templates")
 
 # Mount static files directory
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Global config 
-def get_global_config():
-    config_path = "config.json"
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-                # Ensure boolean conversion for homebrew_enabled
-                if "homebrew_enabled" in config:
-                    if isinstance(config["homebrew_enabled"], str):
-                        config["homebrew_enabled"] = config["homebrew_enabled"].lower() == "true"
-                    else:
-                        config["homebrew_enabled"] = bool(config["homebrew_enabled"])
-                return config
-        except Exception as e:
-            print(f"Error reading global config: {e}")
-    return {"homebrew_enabled": False}
-
 # Delete a warband and all its contents
 @app.post("/delete_warband")
 def delete_warband(warband_name: str = Form(...)):
-    path = os.path.join(WARBANDS_DIR, warband_name)
-    if os.path.exists(path) and os.path.isdir(path):
-        shutil.rmtree(path)
+    if STORAGE.warband_exists(warband_name):
+        CHARACTERS.forget_warband(warband_name)
+        HOMEBREW.forget(warband_name)
+        STORAGE.delete_warband(warband_name)
     return RedirectResponse("/warbands", status_code=303)
 
 # In-memory character for demo
@@ -66,6 +78,33 @@ CHARACTER = {
 
 WARBANDS_DIR = "warbands"
 
+# Warbands live either in WARBANDS_DIR or in SQLite, as chosen by
+# storage_backend in config.json
+SETTINGS = ConfigService().global_settings()
+STORAGE = open_storage(SETTINGS, WARBANDS_DIR)
+# All character reads and writes go through the repository
+CHARACTERS = CharacterRepository(STORAGE)
+# Per-warband names/points/homebrew summaries, kept current by the repository
+WARBAND_INDEX = CHARACTERS.index
+# Cached global and per-warband settings
+CONFIG = ConfigService(STORAGE)
+# Sorted, paginated warband listing for the selection page
+LISTING = WarbandListing(STORAGE, WARBAND_INDEX)
+# Per-warband homebrew overlays over the shared catalogs
+HOMEBREW = HomebrewCatalogs(STORAGE)
+# Blocking storage work of the async handlers runs on its own bounded pool
+# (io_workers / io_max_queue in config.json), never on the event loop
+IO_EXECUTOR = IOExecutor(
+    workers=int(SETTINGS.raw.get("io_workers", IO_WORKERS)),
+    max_queue=int(SETTINGS.raw.get("io_max_queue", IO_MAX_QUEUE)),
+)
+ASYNC_STORAGE = AsyncStorage(STORAGE, IO_EXECUTOR, HOMEBREW)
+# Compiled templates are cached on disk for every worker and restart; set
+# template_auto_reload to false in config.json to skip the per-render stat
+setup_templates(templates.env, auto_reload=as_bool(SETTINGS.raw.get("template_auto_reload", True)))
+# Rendered reference pages, by (template, parameters, catalog version)
+PAGES = PageCache(int(SETTINGS.raw.get("page_cache_size", PAGE_CACHE_SIZE)))
+
 
 @app.get("/", response_class=HTMLResponse)
 def home(request: Request):
@@ -89,10 +128,9 @@ def home(request: Request):
     # If only warband exists, redirect to warband dashboard
     if warband:
         # Check if there are any characters in this warband
-        wb_path = os.path.join(WARBANDS_DIR, warband)
-        if os.path.exists(wb_path):
-            characters = [f.replace(".json", "") for f in os.listdir(wb_path) 
-                         if f.endswith(".json") and not f.startswith("vehicle_") and not f == "warband_config.json"]
+        summary = WARBAND_INDEX.get(warband)
+        if summary is not None:
+            characters = summary.character_names
             if characters:
                 # Redirect to the first character's edit page
                 return RedirectResponse(f"/edit_character/{warband}/{characters[0]}", status_code=303)
@@ -112,7 +150,9 @@ def set_points(points: int = Form(...)):
 
 @app.get("/traits", response_class=HTMLResponse)
 def traits(request: Request):
-    return templates.TemplateResponse("traits.html", {"request": request, "traits": list_traits(), "character": CHARACTER})
+    # The page lists the demo character's traits too
+    return _reference_page(request, "traits.html", tuple(CHARACTER['Traits']),
+                           {"traits": list_traits(), "character": CHARACTER}, _catalog_version())
 
 @app.post("/add_trait")
 def add_trait(trait: str = Form(...)):
@@ -128,7 +168,9 @@ def remove_trait(trait: str = Form(...)):
 
 @app.get("/abilities", response_class=HTMLResponse)
 def abilities(request: Request):
-    return templates.TemplateResponse("abilities.html", {"request": request, "abilities": list_abilities(), "character": CHARACTER})
+    # The page lists the demo character's abilities too
+    return _reference_page(request, "abilities.html", tuple(CHARACTER['Abilities']),
+                           {"abilities": list_abilities(), "character": CHARACTER}, _catalog_version())
 
 @app.post("/add_ability")
 def add_ability(ability: str = Form(...)):
@@ -144,7 +186,37 @@ def remove_ability(ability: str = Form(...)):
 
 @app.get("/arcana", response_class=HTMLResponse)
 def arcana(request: Request):
-    return templates.TemplateResponse("arcana.html", {"request": request, "arcana": list_arcana(), "character": CHARACTER})
+    return _reference_page(request, "arcana.html", (), {"arcana": list_arcana()}, _catalog_version())
+
+@app.get("/api/custom_content")
+def api_custom_content():
+    """Custom traits, abilities and arcana (shared by every server worker)."""
+    data = custom_content_snapshot().data
+    return {kind: list(custom_entries(data, kind)) for kind in CUSTOM_KINDS}
+
+@app.post("/api/custom_content/{kind}")
+async def api_add_custom_content(request: Request, kind: str):
+    """Add a custom trait or ability ({name, cost, effect}) or arcana ({name, effect})."""
+    if kind not in CUSTOM_KINDS:
+        return JSONResponse({"error": f"kind must be one of {', '.join(CUSTOM_KINDS)}"}, status_code=404)
+    body = await _json_body(request)
+    name = body.get("name") if body is not None else None
+    effect = body.get("effect", "") if body is not None else None
+    cost = body.get("cost") if body is not None else None
+    if not isinstance(name, str) or not name.strip() or not isinstance(effect, str):
+        return JSONResponse({"error": "Body must be an object with a name and an effect"}, status_code=400)
+    if kind != "arcana" and (not isinstance(cost, int) or isinstance(cost, bool)):
+        return JSONResponse({"error": "cost must be an integer"}, status_code=400)
+    name = name.strip()
+    if kind == "traits":
+        added = await ASYNC_STORAGE.run(add_custom_trait, name, cost, effect)
+    elif kind == "abilities":
+        added = await ASYNC_STORAGE.run(add_custom_ability, name, cost, effect)
+    else:
+        added = await ASYNC_STORAGE.run(add_custom_arcana, name, effect)
+    if not added:
+        return JSONResponse({"error": f"Already exists: {name}"}, status_code=409)
+    return JSONResponse({"status": "success", "name": name}, status_code=201)
 
 @app.post("/remove_equipment")
 def remove_equipment(eq_name: str = Form(...)):
@@ -161,123 +233,35 @@ async def calculate_points(request: Request):
         # Get homebrew setting from the request
         homebrew_enabled = form_data.get('homebrew_enabled', 'false').lower() == 'true'
         
-        # Get traits and abilities
-        from app.traits_api import list_traits
-        from app.abilities_api import list_abilities
-        trait_costs = {t['name']: t['cost'] for t in list_traits()}
-        ability_costs = {a['name']: a['cost'] for a in list_abilities()}
-        
-        traits_str = form_data.get('traits', '')
-        abilities_str = form_data.get('abilities', '')
-        
-        # Process traits and abilities
-        trait_list = [t.strip() for t in traits_str.split(',') if t.strip()]
-        ability_list = [a.strip() for a in abilities_str.split(',') if a.strip()]
-        
-        # Base points cost - same regardless of homebrew setting
-        points = 10
-        
-        # Add costs for traits and abilities
-        for t in trait_list:
-            points += trait_costs.get(t, 0)
-                
-        for a in ability_list:
-            points += ability_costs.get(a, 0)
-        
-        # Get skill values, calculate costs
-        skill_point_cost = 10  # Each skill level above 1 costs 10 points
-        
-        # Get skills and calculate their costs
         try:
-            agility = max(1, int(form_data.get('agility', 1)))
-            shooting = max(1, int(form_data.get('shooting', 1)))
-            fighting = max(1, int(form_data.get('fighting', 1)))
-            psyche = max(1, int(form_data.get('psyche', 1)))
-            awareness = max(1, int(form_data.get('awareness', 1)))
-            
-            # Get hit-points and calculate cost
-            hit_points = int(form_data.get('hit_points', 20))  # Default is 20
-            hit_points_change = hit_points - 20  # Calculate change from default
-            
-            # Calculate cost: +/- 10 points for every 2 hit-points
-            hit_points_cost = (hit_points_change // 2) * 10
-            
-            # Get speed value - default is 10
-            speed = int(form_data.get('speed', 10))
-            
-            # For non-homebrew mode, speed is always 10 and has no cost
-            speed_cost = 0
-            if homebrew_enabled and speed != 10:
-                # In homebrew mode, speed costs can be calculated (10 points per point of speed)
-                speed_cost = (speed - 10) * 10
-            
-            # Enforce maximum skill value of 10 when homebrew is off
-            if not homebrew_enabled:
-                agility = min(10, agility)
-                shooting = min(10, shooting)
-                fighting = min(10, fighting)
-                psyche = min(10, psyche)
-                awareness = min(10, awareness)
-            
-            # Calculate skill costs
-            points += (agility - 1) * skill_point_cost
-            points += (shooting - 1) * skill_point_cost
-            points += (fighting - 1) * skill_point_cost
-            points += (psyche - 1) * skill_point_cost
-            points += (awareness - 1) * skill_point_cost
-            
-            # Add hit-points cost
-            points += hit_points_cost
-            
-            # Add speed cost (only applies in homebrew mode)
-            points += speed_cost
-            
-            # Calculate weapon costs
-            weapon_cost = 0
-            weapons_input = form_data.get('weapons', '')
-            if weapons_input:
-                # Split the weapons string into a list of weapon names
-                weapon_names = [w.strip() for w in weapons_input.split(',') if w.strip()]
-                
-                # Import the weapons API functions
-                from app.weapons_api import get_weapon
-                
-                # Look up each weapon and add its cost
-                for weapon_name in weapon_names:
-                    weapon = get_weapon(weapon_name)
-                    if weapon:
-                        weapon_cost += weapon.get('cost', 0)
-                    else:
-                        print(f"Warning: Weapon '{weapon_name}' not found in database")
-            
-            # Add weapon costs to total points
-            points += weapon_cost
-            
-            # Calculate armour costs
-            armour_cost = 0
-            armour_input = form_data.get('armour', '')
-            if armour_input:
-                # Split the armour string into a list of armour names
-                armour_names = [a.strip() for a in armour_input.split(',') if a.strip()]
-                
-                # Import the armour API functions
-                from app.armour_api import get_armour
-                
-                # Look up each armour and add its cost
-                for armour_name in armour_names:
-                    armour = get_armour(armour_name)
-                    if armour:
-                        armour_cost += armour.get('cost', 0)
-                    else:
-                        print(f"Warning: Armour '{armour_name}' not found in database")
-            
-            # Add armour costs to total points
-            points += armour_cost
+            # Skills, hit-points and speed must be integers; lists are comma-separated
+            loadout = {
+                'traits': form_data.get('traits', ''),
+                'abilities': form_data.get('abilities', ''),
+                'skills': {
+                    'Agility': int(form_data.get('agility', 1)),
+                    'Shooting': int(form_data.get('shooting', 1)),
+                    'Fighting': int(form_data.get('fighting', 1)),
+                    'Psyche': int(form_data.get('psyche', 1)),
+                    'Awareness': int(form_data.get('awareness', 1)),
+                },
+                'hit_points': int(form_data.get('hit_points', 20)),
+                'speed': int(form_data.get('speed', 10)),
+                'weapons': form_data.get('weapons', ''),
+                'armour': form_data.get('armour', ''),
+                'misc_items': form_data.get('misc_items', ''),
+                'homebrew_enabled': homebrew_enabled,
+            }
+            # Checking the catalogs for changes is disk work; pricing is not.
+            # The edit page sends its warband so homebrew content is priced.
+            tables = await ASYNC_STORAGE.cost_tables(form_data.get('warband') or None)
+            # The edit page re-prices the same loadout many times in a row
+            result = price_loadout_cached(loadout, tables)
             
             # Debug output
-            print(f"API Points calculation: homebrew={homebrew_enabled}, skills=[{agility},{shooting},{fighting},{psyche},{awareness}], hit_points={hit_points}, hit_points_cost={hit_points_cost}, speed={speed}, speed_cost={speed_cost}, weapons_cost={weapon_cost}, armour_cost={armour_cost}, total_points={points}")
+            print(f"API Points calculation: homebrew={homebrew_enabled}, breakdown={result['breakdown']}, total_points={result['points']}")
             
-            return {"points": points, "success": True}
+            return {"points": result['points'], "breakdown": result['breakdown'], "success": True}
         except Exception as e:
             print(f"Error calculating skill costs: {e}")
             return {"error": f"Error calculating skill costs: {str(e)}", "success": False}
@@ -285,32 +269,141 @@ async def calculate_points(request: Request):
         print(f"Error in calculate_points API: {e}")
         return {"error": str(e), "success": False}
 
+@app.get("/api/calculate_points/stats")
+async def calculate_points_stats():
+    """API endpoint exposing hit/miss counters of the points memo."""
+    return POINTS_MEMO.stats()
+
+# Upper bound on loadouts priced by one batch request
+MAX_POINTS_BATCH = 5000
+
+@app.post("/api/calculate_points/batch")
+async def calculate_points_batch(request: Request):
+    """API endpoint to price many loadouts in one request.
+
+    Accepts a JSON array of loadouts, or an object {"loadouts": [...],
+    "homebrew_enabled": bool} where homebrew_enabled is the default for
+    loadouts that do not set it. Each loadout uses the points engine keys
+    (traits, abilities, skills, hit_points, speed, weapons, armour,
+    misc_items, homebrew_enabled); lists may be JSON arrays.
+    """
+    try:
+        payload = await request.json()
+    except Exception as e:
+        return JSONResponse({"error": f"Invalid JSON: {e}", "success": False}, status_code=400)
+
+    default_homebrew = False
+    warband = None
+    if isinstance(payload, dict):
+        default_homebrew = as_bool(payload.get('homebrew_enabled', False))
+        # Price with that warband's homebrew overlay
+        warband = payload.get('warband') if isinstance(payload.get('warband'), str) else None
+        loadouts = payload.get('loadouts')
+    else:
+        loadouts = payload
+    if not isinstance(loadouts, list):
+        return JSONResponse({"error": "Expected a list of loadouts", "success": False}, status_code=400)
+    if len(loadouts) > MAX_POINTS_BATCH:
+        return JSONResponse({"error": f"At most {MAX_POINTS_BATCH} loadouts per request", "success": False}, status_code=413)
+
+    prepared = []
+    for loadout in loadouts:
+        if isinstance(loadout, dict):
+            # "false" must not count as enabled
+            loadout = {**loadout, 'homebrew_enabled': as_bool(loadout.get('homebrew_enabled', default_homebrew))}
+        prepared.append(loadout)
+
+    tables = await ASYNC_STORAGE.cost_tables(warband)
+    results = []
+    for result in price_loadouts(prepared, tables):
+        if 'error' in result:
+            results.append({"error": result['error'], "success": False})
+        else:
+            results.append({"points": result['points'], "breakdown": result['breakdown'], "success": True})
+    return {"results": results, "success": True}
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, as RFC 9110 requires)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [t.strip() for t in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+def _reference_page(request: Request, name: str, params, context, version=None):
+    """Serve a page from PAGES, rendering it only when its key is new.
+
+    The key is the Template object (replaced by Jinja2 when an edited
+    template is reloaded), ``params`` and ``version``; together they must
+    determine the whole output. Strong ETag, 304s and a gzip variant.
+    """
+    template = templates.get_template(name)
+    # The request is passed for the template's sake only; the output must not depend on it
+    page = PAGES.get((template, params, version), lambda: template.render({"request": request, **context}))
+    body, etag, encoding = page.variant(request.headers.get("accept-encoding"))
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return HTMLResponse(body, headers=headers)
+
+def _catalog_version():
+    # The built-in catalogs never change at runtime; custom content does
+    return custom_content_snapshot().generation
+
+def _warband_bundle(warband):
+    """(bundle, versioned URL) of the catalogs as ``warband`` sees them (None: shared catalogs)."""
+    if warband:
+        bundle = HOMEBREW.view(warband).catalog_bundle()
+        if bundle is not get_catalog_bundle():
+            return bundle, f"/api/catalog_bundle/{bundle.version}?warband={quote(warband)}"
+    bundle = get_catalog_bundle()
+    return bundle, f"/api/catalog_bundle/{bundle.version}"
+
+def _catalog_bundle_response(request: Request, bundle, url: str, cache_control: str):
+    headers = {
+        "ETag": bundle.etag,
+        "Cache-Control": cache_control,
+        "Content-Location": url,
+    }
+    if _etag_matches(request, bundle.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(bundle.body, media_type="application/json", headers=headers)
+
+@app.get("/api/catalog_bundle")
+def catalog_bundle(request: Request, warband: str = None):
+    """Current catalog costs and cost rules for client-side pricing (always revalidated).
+
+    With ``warband``, the costs include that warband's homebrew overlay.
+    """
+    bundle, url = _warband_bundle(warband)
+    return _catalog_bundle_response(request, bundle, url, "no-cache")
+
+@app.get("/api/catalog_bundle/{version}")
+def catalog_bundle_version(request: Request, version: str, warband: str = None):
+    """Versioned catalog bundle. A version's content never changes, so it is cached forever."""
+    bundle, url = _warband_bundle(warband)
+    if version != bundle.version:
+        # Stale version (catalog or homebrew overlay changed since the page was rendered)
+        return RedirectResponse(url, status_code=302)
+    return _catalog_bundle_response(request, bundle, url, "public, max-age=31536000, immutable")
+
 @app.get("/warbands", response_class=HTMLResponse)
-def warbands(request: Request):
-    warbands = []
-    for d in os.listdir(WARBANDS_DIR):
-        if os.path.isdir(os.path.join(WARBANDS_DIR, d)):
-            warband_info = {"name": d, "homebrew_enabled": False}
-            
-            # Check if warband has a config file
-            config_path = os.path.join(WARBANDS_DIR, d, "warband_config.json")
-            if os.path.exists(config_path):
-                try:
-                    with open(config_path, "r") as f:
-                        config = json.load(f)
-                        warband_info["homebrew_enabled"] = config.get("homebrew_enabled", False)
-                except:
-                    # If there's an error reading the config, use default values
-                    pass
-            
-            warbands.append(warband_info)
-            
-    return templates.TemplateResponse("warbands.html", {"request": request, "warbands": warbands})
+def warbands(request: Request, sort: str = "name", order: str = "asc", limit: int = 50, cursor: str = None):
+    try:
+        page = LISTING.page(sort, order, limit, cursor)
+    except ValueError:
+        # Bad paging parameters (e.g. a stale bookmark): start from the top
+        page = LISTING.page()
+
+    return templates.TemplateResponse("warbands.html", {"request": request, **page})
 
 @app.post("/create_warband")
 def create_warband(warband_name: str = Form(...), homebrew_enabled: str = Form(None)):
-    path = os.path.join(WARBANDS_DIR, warband_name)
-    os.makedirs(path, exist_ok=True)
+    STORAGE.create_warband(warband_name)
     
     # Print debug info
     print(f"Create warband - Received homebrew_enabled: '{homebrew_enabled}', type: {type(homebrew_enabled)}")
@@ -320,13 +413,12 @@ def create_warband(warband_name: str = Form(...), homebrew_enabled: str = Form(N
     homebrew_value = homebrew_enabled == "1"
     print(f"Create warband - Converted homebrew_value: {homebrew_value}")
     
-    config = {
-        "homebrew_enabled": homebrew_value,
-        "created_at": str(datetime.datetime.now())
-    }
-    
-    with open(os.path.join(path, "warband_config.json"), "w") as f:
-        json.dump(config, f)
+    CONFIG.update_warband(
+        warband_name,
+        homebrew_enabled=homebrew_value,
+        created_at=str(datetime.datetime.now()),
+    )
+    WARBAND_INDEX.set_homebrew(warband_name, homebrew_value)
     
     # Set the new warband as the selected warband in cookie
     response = RedirectResponse("/warbands", status_code=303)
@@ -348,50 +440,22 @@ def select_warband(request: Request, warband: str):
 
 @app.get("/warband/{warband}", response_class=HTMLResponse)
 def warband_dashboard(request: Request, warband: str):
-    wb_path = os.path.join(WARBANDS_DIR, warband)
     chars = []
     vehicles = []
     total_points_spent = 0
     homebrew_enabled = False
     
-    if os.path.exists(wb_path):
-        # Check if warband has a config file
-        config_path = os.path.join(wb_path, "warband_config.json")
-        if os.path.exists(config_path):
-            try:
-                with open(config_path, "r") as f:
-                    config = json.load(f)
-                    # Convert to boolean to handle string values
-                    homebrew_enabled_value = config.get("homebrew_enabled", False)
-                    if isinstance(homebrew_enabled_value, str):
-                        homebrew_enabled = homebrew_enabled_value.lower() == "true"
-                    else:
-                        homebrew_enabled = bool(homebrew_enabled_value)
-                    # Print debug info
-                    print(f"Warband dashboard - Read homebrew_enabled from warband config: {homebrew_enabled}")
-            except Exception as e:
-                # If there's an error reading the config, try global config
-                print(f"Error reading warband config: {e}")
-                global_config = get_global_config()
-                homebrew_enabled = global_config.get("homebrew_enabled", False)
-                print(f"Warband dashboard - Using global homebrew_enabled: {homebrew_enabled}")
-        else:
-            # If no warband config exists, try global config
-            global_config = get_global_config()
-            homebrew_enabled = global_config.get("homebrew_enabled", False)
-            print(f"Warband dashboard - Using global homebrew_enabled: {homebrew_enabled}")
-                
-        chars = [f[:-5] for f in os.listdir(wb_path) if f.endswith('.json') and not f.startswith('vehicle_') and f != "warband_config.json"]
-        vehicles = [f[8:-5] for f in os.listdir(wb_path) if f.startswith('vehicle_') and f.endswith('.json')]
-        # Sum points for all characters
-        for char_name in chars:
-            char_file = os.path.join(wb_path, f"{char_name}.json")
-            try:
-                with open(char_file, 'r') as f:
-                    char_data = json.load(f)
-                    total_points_spent += int(char_data.get('Points', 0))
-            except Exception:
-                pass
+    # Names, points and the homebrew flag come from the summary index, so
+    # this does not grow with the number of characters in the warband
+    summary = WARBAND_INDEX.get(warband)
+    if summary is not None:
+        homebrew_enabled = summary.homebrew_enabled
+        if homebrew_enabled is None:
+            # If no readable warband config exists, use the global config
+            homebrew_enabled = CONFIG.global_settings().homebrew_enabled
+        chars = summary.character_names
+        vehicles = summary.vehicle_names
+        total_points_spent = summary.total_points
     cookie_key = _safe_cookie_key(warband)
     warband_points = request.cookies.get(cookie_key)
     try:
@@ -419,36 +483,17 @@ def set_warband_points(request: Request, warband: str, points: int = Form(...)):
 # Toggle homebrew setting
 @app.post("/toggle_homebrew/{warband}")
 def toggle_homebrew(request: Request, warband: str, homebrew_enabled: str = Form(None)):
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    config_path = os.path.join(wb_path, "warband_config.json")
-    
     # Print debug info
     print(f"Received homebrew_enabled: '{homebrew_enabled}', type: {type(homebrew_enabled)}")
     
-    # Create or update the config file
     # Convert the form value to a boolean
     # Form checkbox sends "1" when checked, None when unchecked
     homebrew_value = homebrew_enabled == "1"
     print(f"Converted homebrew_value: {homebrew_value}")
     
-    config = {"homebrew_enabled": homebrew_value}
-    
-    # If the config file exists, read existing settings and update only the homebrew setting
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r") as f:
-                existing_config = json.load(f)
-                # Preserve other settings
-                for key, value in existing_config.items():
-                    if key != "homebrew_enabled":
-                        config[key] = value
-        except:
-            # If there's an error reading the config, just use the new config
-            pass
-    
-    # Save the updated config
-    with open(config_path, "w") as f:
-        json.dump(config, f)
+    # Create or update the config, keeping its other settings
+    CONFIG.update_warband(warband, homebrew_enabled=homebrew_value)
+    WARBAND_INDEX.set_homebrew(warband, homebrew_value)
     
     return RedirectResponse(f"/warband/{warband}", status_code=303)
 
@@ -457,27 +502,9 @@ def add_character(request: Request, char_name: str = Form(...)):
     warband = request.cookies.get("warband")
     if not warband:
         return RedirectResponse("/warbands", status_code=303)
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    os.makedirs(wb_path, exist_ok=True)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
     # Complete character template with all required fields
-    char_data = {
-        'Name': char_name,
-        'Points': 10,
-        'Skills': {'Agility': 1, 'Fighting': 1, 'Shooting': 1, 'Awareness': 1, 'Psyche': 1},
-        'Speed': 10,
-        'Hit-points': 20,
-        'Traits': [],
-        'Abilities': [],
-        'Equipment': [],
-        'Weapons': [],
-        'Notes': '',
-        'Backstory': '',
-        'Injuries': '',
-        'CampaignPoints': ''
-    }
-    with open(char_file, 'w') as f:
-        json.dump(char_data, f, indent=2)
+    char_data = new_character(char_name)
+    CHARACTERS.save(warband, char_name, char_data)
     return RedirectResponse(f"/warband/{warband}", status_code=303)
 
 @app.post("/add_vehicle")
@@ -485,9 +512,6 @@ def add_vehicle(request: Request, vehicle_name: str = Form(...)):
     warband = request.cookies.get("warband")
     if not warband:
         return RedirectResponse("/warbands", status_code=303)
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    os.makedirs(wb_path, exist_ok=True)
-    vehicle_file = os.path.join(wb_path, f"vehicle_{vehicle_name}.json")
     # Minimal vehicle stub
     vehicle_data = {
         'Name': vehicle_name,
@@ -496,8 +520,8 @@ def add_vehicle(request: Request, vehicle_name: str = Form(...)):
         'Abilities': [],
         'Sections': [],
     }
-    with open(vehicle_file, 'w') as f:
-        json.dump(vehicle_data, f)
+    STORAGE.write_vehicle(warband, vehicle_name, vehicle_data)
+    WARBAND_INDEX.put_vehicle(warband, vehicle_name)
     return RedirectResponse(f"/warband/{warband}", status_code=303)
 
 @app.post("/remove_character")
@@ -505,10 +529,7 @@ def remove_character(request: Request, char_name: str = Form(...)):
     warband = request.cookies.get("warband")
     if not warband:
         return RedirectResponse("/warbands", status_code=303)
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
-    if os.path.exists(char_file):
-        os.remove(char_file)
+    CHARACTERS.delete(warband, char_name)
     return RedirectResponse(f"/warband/{warband}", status_code=303)
 
 @app.post("/remove_vehicle")
@@ -516,40 +537,21 @@ def remove_vehicle(request: Request, vehicle_name: str = Form(...)):
     warband = request.cookies.get("warband")
     if not warband:
         return RedirectResponse("/warbands", status_code=303)
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    vehicle_file = os.path.join(wb_path, f"vehicle_{vehicle_name}.json")
-    if os.path.exists(vehicle_file):
-        os.remove(vehicle_file)
+    STORAGE.delete_vehicle(warband, vehicle_name)
+    WARBAND_INDEX.remove_vehicle(warband, vehicle_name)
     return RedirectResponse(f"/warband/{warband}", status_code=303)
 
 
 
 @app.get("/armour/{warband}/{char_name}", response_class=HTMLResponse)
 def armour_get(request: Request, warband: str, char_name: str):
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
-    config_path = os.path.join(wb_path, "warband_config.json")
-    
-    if not os.path.exists(char_file):
+    if not CHARACTERS.exists(warband, char_name):
         return RedirectResponse(f"/warband/{warband}", status_code=303)
     
     # Check if homebrew is enabled for this warband
-    homebrew_enabled = False
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-                if "homebrew_enabled" in config:
-                    if isinstance(config["homebrew_enabled"], str):
-                        homebrew_enabled = config["homebrew_enabled"].lower() == "true"
-                    else:
-                        homebrew_enabled = bool(config["homebrew_enabled"])
-        except:
-            # If there's an error loading the config, default to homebrew disabled
-            pass
-    
-    with open(char_file, "r") as f:
-        character = json.load(f)
+    homebrew_enabled = CONFIG.homebrew_enabled(warband)
+    
+    character = CHARACTERS.peek(warband, char_name)
     
     # Get all available armour from the API
     armour_list = list_armour()
@@ -579,46 +581,30 @@ def armour_get(request: Request, warband: str, char_name: str):
 
 @app.post("/add_armour/{warband}/{char_name}")
 def add_armour(request: Request, warband: str, char_name: str, armour_name: str = Form(...)):
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
-    config_path = os.path.join(wb_path, "warband_config.json")
-    
-    if not os.path.exists(char_file):
-        return RedirectResponse(f"/warband/{warband}", status_code=303)
-    
     # Check if homebrew is enabled for this warband
-    homebrew_enabled = False
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-                if "homebrew_enabled" in config:
-                    if isinstance(config["homebrew_enabled"], str):
-                        homebrew_enabled = config["homebrew_enabled"].lower() == "true"
-                    else:
-                        homebrew_enabled = bool(config["homebrew_enabled"])
-        except:
-            # If there's an error loading the config, default to homebrew disabled
-            pass
-    
-    with open(char_file, "r") as f:
-        character = json.load(f)
-    
-    # Initialize Armour array if it doesn't exist
-    if 'Armour' not in character:
-        character['Armour'] = []
-    
-    # If homebrew is disabled and trying to add a new armor when one already exists
-    if not homebrew_enabled and len(character['Armour']) > 0 and armour_name not in character['Armour']:
-        # Replace existing armor with the new one instead of showing error
-        character['Armour'] = [armour_name]
-    # Add armour if not already present
-    elif armour_name not in character['Armour']:
-        character['Armour'].append(armour_name)
-    
-    # Save character
-    with open(char_file, "w") as f:
-        json.dump(character, f, indent=2)
+    homebrew_enabled = CONFIG.homebrew_enabled(warband)
+    
+    # Hold the character's lock from read to write so concurrent requests
+    # cannot lose each other's changes
+    with CHARACTERS.lock(warband, char_name):
+        character = CHARACTERS.get(warband, char_name)
+        if character is None:
+            return RedirectResponse(f"/warband/{warband}", status_code=303)
+    
+        # Initialize Armour array if it doesn't exist
+        if 'Armour' not in character:
+            character['Armour'] = []
+    
+        # If homebrew is disabled and trying to add a new armor when one already exists
+        if not homebrew_enabled and len(character['Armour']) > 0 and armour_name not in character['Armour']:
+            # Replace existing armor with the new one instead of showing error
+            character['Armour'] = [armour_name]
+        # Add armour if not already present
+        elif armour_name not in character['Armour']:
+            character['Armour'].append(armour_name)
+    
+        # Save character
+        CHARACTERS.save(warband, char_name, character)
     
     # Check if request is AJAX (fetch API)
     if request.headers.get("accept") == "*/*":
@@ -630,22 +616,18 @@ def add_armour(request: Request, warband: str, char_name: str, armour_name: str
 
 @app.post("/remove_armour/{warband}/{char_name}")
 def remove_armour(request: Request, warband: str, char_name: str, armour_name: str = Form(...)):
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
-    
-    if not os.path.exists(char_file):
-        return RedirectResponse(f"/warband/{warband}", status_code=303)
     
-    with open(char_file, "r") as f:
-        character = json.load(f)
+    with CHARACTERS.lock(warband, char_name):
+        character = CHARACTERS.get(warband, char_name)
+        if character is None:
+            return RedirectResponse(f"/warband/{warband}", status_code=303)
     
-    # Remove armour if present
-    if 'Armour' in character and armour_name in character['Armour']:
-        character['Armour'].remove(armour_name)
+        # Remove armour if present
+        if 'Armour' in character and armour_name in character['Armour']:
+            character['Armour'].remove(armour_name)
     
-    # Save character
-    with open(char_file, "w") as f:
-        json.dump(character, f, indent=2)
+        # Save character
+        CHARACTERS.save(warband, char_name, character)
     
     # Check if request is AJAX (fetch API)
     if request.headers.get("accept") == "*/*":
@@ -658,14 +640,11 @@ def remove_armour(request: Request, warband: str, char_name: str, armour_name: s
 # --- Miscellaneous Items Routes ---
 @app.get("/misc_items/{warband}/{char_name}", response_class=HTMLResponse)
 def misc_items_get(request: Request, warband: str, char_name: str):
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
     
-    if not os.path.exists(char_file):
+    if not CHARACTERS.exists(warband, char_name):
         return RedirectResponse(f"/warband/{warband}", status_code=303)
     
-    with open(char_file, "r") as f:
-        character = json.load(f)
+    character = CHARACTERS.peek(warband, char_name)
     
     # Get all available misc items from the API
     misc_items_list = get_all_misc_items()
@@ -677,10 +656,9 @@ def misc_items_get(request: Request, warband: str, char_name: str):
     # Get misc items special rules
     misc_items_special_rules = get_misc_items_special_rules()
     
-    # Merge with general special rules
-    for rule, desc in misc_items_special_rules.items():
-        if rule not in special_rules_data:
-            special_rules_data[rule] = desc
+    # Merge with general special rules (general descriptions take precedence).
+    # Catalog data is shared, so build a new dict instead of updating it in place.
+    special_rules_data = {**misc_items_special_rules, **special_rules_data}
     
     # Get character's misc items if any
     character_misc_items = character.get('MiscItems', [])
@@ -696,105 +674,67 @@ def misc_items_get(request: Request, warband: str, char_name: str):
 
 @app.post("/add_misc_item/{warband}/{char_name}")
 def add_misc_item(request: Request, warband: str, char_name: str, item_name: str = Form(...)):
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
     
-    if not os.path.exists(char_file):
-        return RedirectResponse(f"/warband/{warband}", status_code=303)
+    with CHARACTERS.lock(warband, char_name):
+        character = CHARACTERS.get(warband, char_name)
+        if character is None:
+            return RedirectResponse(f"/warband/{warband}", status_code=303)
     
-    with open(char_file, "r") as f:
-        character = json.load(f)
+        # Initialize MiscItems list if it doesn't exist
+        if 'MiscItems' not in character:
+            character['MiscItems'] = []
     
-    # Initialize MiscItems list if it doesn't exist
-    if 'MiscItems' not in character:
-        character['MiscItems'] = []
+        # Add item if not already present
+        if item_name not in character['MiscItems']:
+            character['MiscItems'].append(item_name)
     
-    # Add item if not already present
-    if item_name not in character['MiscItems']:
-        character['MiscItems'].append(item_name)
-    
-    # Save character
-    with open(char_file, "w") as f:
-        json.dump(character, f, indent=2)
+        # Save character
+        CHARACTERS.save(warband, char_name, character)
     
     return RedirectResponse(f"/misc_items/{warband}/{char_name}", status_code=303)
 
 @app.post("/remove_misc_item/{warband}/{char_name}")
 def remove_misc_item(request: Request, warband: str, char_name: str, item_name: str = Form(...)):
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
-    
-    if not os.path.exists(char_file):
-        return RedirectResponse(f"/warband/{warband}", status_code=303)
     
-    with open(char_file, "r") as f:
-        character = json.load(f)
+    with CHARACTERS.lock(warband, char_name):
+        character = CHARACTERS.get(warband, char_name)
+        if character is None:
+            return RedirectResponse(f"/warband/{warband}", status_code=303)
     
-    # Remove item if present
-    if 'MiscItems' in character and item_name in character['MiscItems']:
-        character['MiscItems'].remove(item_name)
+        # Remove item if present
+        if 'MiscItems' in character and item_name in character['MiscItems']:
+            character['MiscItems'].remove(item_name)
     
-    # Save character
-    with open(char_file, "w") as f:
-        json.dump(character, f, indent=2)
+        # Save character
+        CHARACTERS.save(warband, char_name, character)
     
     return RedirectResponse(f"/misc_items/{warband}/{char_name}", status_code=303)
 
 # --- Character Edit Routes ---
 @app.get("/edit_character/{warband}/{char_name}", response_class=HTMLResponse)
 def edit_character_get(request: Request, warband: str, char_name: str):
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
-    
-    # Check if warband has homebrew enabled
-    homebrew_enabled = False
-    config_path = os.path.join(wb_path, "warband_config.json")
-    
-    # First try to get homebrew setting from warband config
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-                # Convert to boolean to handle string values
-                homebrew_enabled_value = config.get("homebrew_enabled", False)
-                if isinstance(homebrew_enabled_value, str):
-                    homebrew_enabled = homebrew_enabled_value.lower() == "true"
-                else:
-                    homebrew_enabled = bool(homebrew_enabled_value)
-                # Print debug info
-                print(f"Edit character get - Read homebrew_enabled from warband config: {homebrew_enabled}")
-        except Exception as e:
-            # If there's an error reading the config, try global config
-            print(f"Error reading warband config: {e}")
-            global_config = get_global_config()
-            homebrew_enabled = global_config.get("homebrew_enabled", False)
-            print(f"Edit character get - Using global homebrew_enabled: {homebrew_enabled}")
-    else:
-        # If no warband config exists, try global config
-        global_config = get_global_config()
-        homebrew_enabled = global_config.get("homebrew_enabled", False)
-        print(f"Edit character get - Using global homebrew_enabled: {homebrew_enabled}")
+    # Warband config, falling back to the global config
+    homebrew_enabled = CONFIG.homebrew_enabled(warband)
     
-    if not os.path.exists(char_file):
+    if not CHARACTERS.exists(warband, char_name):
         return RedirectResponse(f"/warband/{warband}", status_code=303)
-    with open(char_file, "r") as f:
-        character = json.load(f)
-    traits = list_traits()
-    abilities = list_abilities()
+    character = CHARACTERS.peek(warband, char_name)
+    # The catalogs as this warband sees them (with its homebrew overlay)
+    catalog = HOMEBREW.view(warband)
+    traits = catalog.list("traits")
+    abilities = catalog.list("abilities")
     # --- Apply stat modifiers from traits and abilities ---
-    from app.traits_api import get_trait
-    from app.abilities_api import get_ability
     base_skills = character['Skills'].copy()
     mod_skills = base_skills.copy()
     # Sum modifiers from all traits
     for t in character.get('Traits', []):
-        trait = get_trait(t)
+        trait = catalog.get_trait(t)
         for stat, mod in trait.get('modifiers', {}).items():
             if stat in mod_skills:
                 mod_skills[stat] += mod
     # Sum modifiers from all abilities
     for a in character.get('Abilities', []):
-        ab = get_ability(a)
+        ab = catalog.get_ability(a)
         for stat, mod in ab.get('modifiers', {}).items():
             if stat in mod_skills:
                 mod_skills[stat] += mod
@@ -852,7 +792,8 @@ def edit_character_get(request: Request, warband: str, char_name: str):
             "weapon_details": weapon_details,
             "armour_details": armour_details,
             "misc_items_details": misc_items_details,
-            "special_rules_data": all_special_rules
+            "special_rules_data": all_special_rules,
+            "catalog_bundle_url": _warband_bundle(warband)[1]
         }
     )
 
@@ -867,280 +808,119 @@ async def edit_character_post(request: Request, warband: str, char_name: str):
         print(f"{key}: {values}")
     print("------------------------")
     
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{char_name}.json")
-    
-    # Check if warband has homebrew enabled
-    homebrew_enabled = False
-    config_path = os.path.join(wb_path, "warband_config.json")
+    return await ASYNC_STORAGE.run(_save_character_form, request, warband, char_name, form)
+
+
+def _save_character_form(request: Request, warband: str, char_name: str, form):
+    """Apply an edit-page form to a character (runs on the I/O executor: it takes blocking locks)."""
+    # Warband config, falling back to the global config
+    homebrew_enabled = CONFIG.homebrew_enabled(warband)
+    
+    # Lock the character and, for a rename, its new name, so no other request
+    # can write either file between our read and the rename
+    with CHARACTERS.lock(warband, char_name, form.get('Name') or char_name):
+        character = CHARACTERS.get(warband, char_name)
+        if character is None:
+            return RedirectResponse(f"/warband/{warband}", status_code=303)
+        # Update fields from form
+        character['Name'] = form.get('Name', character['Name'])
+    
+        # Get traits and abilities as lists of form values
+        traits_values = form.getlist('Traits')
+        abilities_values = form.getlist('Abilities')
+        equipment = form.get('Equipment', '')
+    
+        # Debug
+        print(f"Form keys: {form.keys()}")
+        print(f"Received Traits (multiple values): {traits_values}")
+        print(f"Received Abilities (multiple values): {abilities_values}")
+    
+        equipment_list = [e.strip() for e in equipment.split(',') if e.strip()]
+    
+        # Get skill values from the form, falling back to 1 if invalid
+        skills = {}
+        for skill in SKILLS:
+            try:
+                skills[skill] = int(form.get(skill, character['Skills'][skill]))
+            except (ValueError, TypeError, KeyError):
+                skills[skill] = 1
     
-    # First try to get homebrew setting from warband config
-    if os.path.exists(config_path):
         try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-                # Convert to boolean to handle string values
-                homebrew_enabled_value = config.get("homebrew_enabled", False)
-                if isinstance(homebrew_enabled_value, str):
-                    homebrew_enabled = homebrew_enabled_value.lower() == "true"
-                else:
-                    homebrew_enabled = bool(homebrew_enabled_value)
-                # Print debug info
-                print(f"Edit character post - Read homebrew_enabled from warband config: {homebrew_enabled}")
-        except Exception as e:
-            # If there's an error reading the config, try global config
-            print(f"Error reading warband config: {e}")
-            global_config = get_global_config()
-            homebrew_enabled = global_config.get("homebrew_enabled", False)
-            print(f"Edit character post - Using global homebrew_enabled: {homebrew_enabled}")
-    else:
-        # If no warband config exists, try global config
-        global_config = get_global_config()
-        homebrew_enabled = global_config.get("homebrew_enabled", False)
-        print(f"Edit character post - Using global homebrew_enabled: {homebrew_enabled}")
-    
-    if not os.path.exists(char_file):
-        return RedirectResponse(f"/warband/{warband}", status_code=303)
-    with open(char_file, "r") as f:
-        character = json.load(f)
-    # Update fields from form
-    character['Name'] = form.get('Name', character['Name'])
-    # Recalculate points: base 10 + trait/ability costs
-    from app.traits_api import list_traits
-    from app.abilities_api import list_abilities
-    trait_costs = {t['name']: t['cost'] for t in list_traits()}
-    ability_costs = {a['name']: a['cost'] for a in list_abilities()}
-    
-    # Get traits and abilities as lists of form values
-    traits_values = form.getlist('Traits')
-    abilities_values = form.getlist('Abilities')
-    equipment = form.get('Equipment', '')
-    
-    # Debug
-    print(f"Form keys: {form.keys()}")
-    print(f"Received Traits (multiple values): {traits_values}")
-    print(f"Received Abilities (multiple values): {abilities_values}")
-    
-    # Process lists - values already come as separate items, not comma-separated
-    trait_list = [t.strip() for t in traits_values if t.strip()]
-    ability_list = [a.strip() for a in abilities_values if a.strip()]
-    equipment_list = [e.strip() for e in equipment.split(',') if e.strip()]
-    
-    # Debug
-    print(f"Processed trait_list: {trait_list}")
-    print(f"Processed ability_list: {ability_list}")
-    
-    # Remove duplicates
-    trait_list = list(dict.fromkeys(trait_list))
-    ability_list = list(dict.fromkeys(ability_list))
-    
-    # Base points cost - same regardless of homebrew setting
-    points = 10
-    
-    # Add costs for traits and abilities
-    for t in trait_list:
-        points += trait_costs.get(t, 0)
-            
-    for a in ability_list:
-        points += ability_costs.get(a, 0)
+            hit_points = int(form.get('Hitpoints', 20))
+        except (ValueError, TypeError):
+            hit_points = 20  # Default to 20 if invalid
     
-    # Get skill values from the form, ensuring minimum value of 1
-    try:
-        agility = max(1, int(form.get('Agility', character['Skills']['Agility'])))
-    except (ValueError, TypeError):
-        agility = 1
-        
-    try:
-        shooting = max(1, int(form.get('Shooting', character['Skills']['Shooting'])))
-    except (ValueError, TypeError):
-        shooting = 1
-        
-    try:
-        fighting = max(1, int(form.get('Fighting', character['Skills']['Fighting'])))
-    except (ValueError, TypeError):
-        fighting = 1
-        
-    try:
-        psyche = max(1, int(form.get('Psyche', character['Skills']['Psyche'])))
-    except (ValueError, TypeError):
-        psyche = 1
-        
-    try:
-        awareness = max(1, int(form.get('Awareness', character['Skills']['Awareness'])))
-    except (ValueError, TypeError):
-        awareness = 1
-    
-    # Enforce maximum skill value of 10 when homebrew is off
-    if not homebrew_enabled:
-        agility = min(10, agility)
-        shooting = min(10, shooting)
-        fighting = min(10, fighting)
-        psyche = min(10, psyche)
-        awareness = min(10, awareness)
-    
-    # Calculate skill costs (each skill starts at 1, costs 10 points per level above 1)
-    skill_point_cost = 10
-    
-    points += (agility - 1) * skill_point_cost
-    points += (shooting - 1) * skill_point_cost
-    points += (fighting - 1) * skill_point_cost
-    points += (psyche - 1) * skill_point_cost
-    points += (awareness - 1) * skill_point_cost
-    
-    # Calculate hit-points cost (+/- 10 points for every 2 hit-points)
-    try:
-        hit_points = int(form.get('Hitpoints', 20))
-        # Calculate difference from default 20 hit-points
-        hit_points_change = hit_points - 20
-        # Calculate cost (10 points per 2 hit-points)
-        hit_points_cost = (hit_points_change // 2) * 10
-        points += hit_points_cost
-    except (ValueError, TypeError):
-        hit_points = 20  # Default to 20 if invalid
-    
-    # Calculate weapon costs
-    weapon_cost = 0
-    weapons = form.get('Weapons', '')
-    weapon_list = [w.strip() for w in weapons.split(',') if w.strip()]
-    
-    # Import weapons API functions
-    from app.weapons_api import get_weapon
-    
-    # Look up each weapon and add its cost
-    for weapon_name in weapon_list:
-        weapon = get_weapon(weapon_name)
-        if weapon:
-            weapon_cost += weapon.get('cost', 0)
-        else:
-            print(f"Warning: Weapon '{weapon_name}' not found in database")
-    
-    # Add weapon costs to total points
-    points += weapon_cost
-    print(f"Weapon costs: {weapon_cost}")
-    
-    # Calculate armour costs
-    armour_cost = 0
-    armour_str = form.get('armour', '')
-    armour_list = [a.strip() for a in armour_str.split(',') if a.strip()]
-    
-    # Import armour API functions
-    from app.armour_api import get_armour
-    
-    # Look up each armour and add its cost
-    for armour_name in armour_list:
-        armour = get_armour(armour_name)
-        if armour:
-            armour_cost += armour.get('cost', 0)
-        else:
-            print(f"Warning: Armour '{armour_name}' not found in database")
-    
-    # Add armour costs to total points
-    points += armour_cost
-    print(f"Armour costs: {armour_cost}")
-    
-    # Calculate miscellaneous items costs
-    misc_items_cost = 0
-    misc_items_str = form.get('misc_items', '')
-    misc_items_list = [i.strip() for i in misc_items_str.split(',') if i.strip()]
-    
-    # Import misc items API functions
-    from app.misc_items_api import get_misc_item_by_name
-    
-    # Look up each item and add its cost
-    for item_name in misc_items_list:
-        item = get_misc_item_by_name(item_name)
-        if item:
-            misc_items_cost += item.get('cost', 0)
+        try:
+            speed = int(form.get('Speed', 10))
+        except (ValueError, TypeError):
+            speed = 10  # Default to 10 if invalid
+    
+        # Recalculate points with the shared cost rules (the engine applies the
+        # skill cap, speed lock and de-duplication of traits/abilities)
+        result = price_loadout({
+            'traits': traits_values,
+            'abilities': abilities_values,
+            'skills': skills,
+            'hit_points': hit_points,
+            'speed': speed,
+            'weapons': form.get('Weapons', ''),
+            'armour': form.get('armour', ''),
+            'misc_items': form.get('misc_items', ''),
+            'homebrew_enabled': homebrew_enabled,
+        }, HOMEBREW.cost_tables(warband))
+        priced = result['loadout']
+        points = result['points']
+        print(f"Points breakdown: {result['breakdown']}")
+    
+        # Update character with new values
+        character['Points'] = points
+        character['Skills'].update(priced['skills'])
+        character['Speed'] = priced['speed']
+        character['Hit-points'] = priced['hit_points']
+    
+        # Debug
+        print(f"Final trait_list before save: {priced['traits']}")
+        print(f"Final ability_list before save: {priced['abilities']}")
+        print(f"Final weapon_list before save: {priced['weapons']}, total weapon cost: {result['breakdown']['weapons']}")
+    
+        # Update collections using the processed lists (ensures removed items stay removed)
+        character['Traits'] = priced['traits']
+        character['Abilities'] = priced['abilities']
+        character['Equipment'] = equipment_list
+        character['Weapons'] = priced['weapons']
+        character['Armour'] = priced['armour']
+        character['MiscItems'] = priced['misc_items']
+    
+        # Debug
+        print(f"Character after update: Traits={character['Traits']}, Abilities={character['Abilities']}, Weapons={character['Weapons']}, Armour={character['Armour']}, MiscItems={character['MiscItems']}")
+    
+        # Save notes/background and new fields
+        character['Notes'] = form.get('Notes', character.get('Notes', ''))
+        character['Backstory'] = form.get('Backstory', character.get('Backstory', ''))
+        character['Injuries'] = form.get('Injuries', character.get('Injuries', ''))
+        character['CampaignPoints'] = form.get('CampaignPoints', character.get('CampaignPoints', ''))
+    
+        # Save back to file (rename if name changed)
+        new_name = character['Name']
+    
+        # Check if this is an AJAX request for auto-save
+        is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    
+        if is_ajax and new_name == char_name:
+            # Autosaves are coalesced in the write-behind buffer and flushed
+            # once the user stops typing
+            CHARACTERS.save_deferred(warband, char_name, character)
+            print(f"Buffered autosave of {warband}/{char_name}")
         else:
-            print(f"Warning: Misc item '{item_name}' not found in database")
-    
-    # Add miscellaneous items costs to total points
-    points += misc_items_cost
-    print(f"Miscellaneous items costs: {misc_items_cost}")
+            CHARACTERS.save(warband, new_name, character)
+            print(f"Saved character {warband}/{new_name}")
     
-    # Handle Speed
-    try:
-        # Get speed from form
-        speed = int(form.get('Speed', 10))
-        
-        # If not in homebrew mode, speed is always 10 (default)
-        if not homebrew_enabled:
-            speed = 10
-        else:
-            # In homebrew mode, calculate speed cost (10 points per point of speed difference)
-            speed_cost = (speed - 10) * 10
-            points += speed_cost
-    except (ValueError, TypeError):
-        speed = 10  # Default to 10 if invalid
-    
-    # Update character with new values
-    character['Points'] = points
-    character['Skills']['Agility'] = agility
-    character['Skills']['Shooting'] = shooting
-    character['Skills']['Fighting'] = fighting
-    character['Skills']['Psyche'] = psyche
-    character['Skills']['Awareness'] = awareness
-    character['Speed'] = speed
-    character['Hit-points'] = hit_points
-    
-    # Process weapons
-    weapons = form.get('Weapons', '')
-    weapon_list = [w.strip() for w in weapons.split(',') if w.strip()]
-    
-    # Debug
-    print(f"Final trait_list before save: {trait_list}")
-    print(f"Final ability_list before save: {ability_list}")
-    print(f"Final weapon_list before save: {weapon_list}, total weapon cost: {weapon_cost}")
-    
-    # Update collections using the processed lists (ensures removed items stay removed)
-    character['Traits'] = trait_list
-    character['Abilities'] = ability_list
-    character['Equipment'] = equipment_list
-    character['Weapons'] = weapon_list
-    
-    # Process armour
-    armour_str = form.get('armour', '')
-    armour_list = [a.strip() for a in armour_str.split(',') if a.strip()]
-    character['Armour'] = armour_list
-    
-    # Process miscellaneous items
-    misc_items_str = form.get('misc_items', '')
-    misc_items_list = [i.strip() for i in misc_items_str.split(',') if i.strip()]
-    character['MiscItems'] = misc_items_list
-    
-    # Debug
-    print(f"Character after update: Traits={character['Traits']}, Abilities={character['Abilities']}, Weapons={character['Weapons']}, Armour={character['Armour']}, MiscItems={character['MiscItems']}")
-    
-    # Save notes/background and new fields
-    character['Notes'] = form.get('Notes', character.get('Notes', ''))
-    character['Backstory'] = form.get('Backstory', character.get('Backstory', ''))
-    character['Injuries'] = form.get('Injuries', character.get('Injuries', ''))
-    character['CampaignPoints'] = form.get('CampaignPoints', character.get('CampaignPoints', ''))
-    
-    # Save back to file (rename if name changed)
-    new_name = character['Name']
-    new_char_file = os.path.join(wb_path, f"{new_name}.json")
-    
-    # Make sure traits and abilities are properly reset when empty
-    if not trait_list:
-        character['Traits'] = []
-    if not ability_list:
-        character['Abilities'] = []
-    
-    with open(new_char_file, "w") as f:
-        json.dump(character, f, indent=2)
-    
-    print(f"Saved character to {new_char_file}")
-    
-    if new_char_file != char_file and os.path.exists(char_file):
-        os.remove(char_file)
-        print(f"Removed old character file {char_file}")
+        if new_name != char_name:
+            CHARACTERS.delete(warband, char_name)
+            print(f"Removed old character {warband}/{char_name}")
         
-    # Check if this is an AJAX request for auto-save
-    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
     if is_ajax:
         # For AJAX requests, return a success message instead of redirecting
-        from fastapi.responses import JSONResponse
         return JSONResponse({"status": "success", "message": "Character saved"})
     else:
         # For normal form submissions, redirect as before
@@ -1158,14 +938,10 @@ def weapons_page(request: Request, warband: str, character_name: str):
     special_rules = get_special_rules()
     
     # Get character data to see what weapons are already equipped
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{character_name}.json")
-    
     equipped_weapons = []
-    if os.path.exists(char_file):
-        with open(char_file, "r") as f:
-            character = json.load(f)
-            equipped_weapons = character.get('Weapons', [])
+    character = CHARACTERS.peek(warband, character_name)
+    if character is not None:
+        equipped_weapons = character.get('Weapons', [])
     
     # Count occurrences of each weapon
     weapon_counts = {}
@@ -1189,53 +965,37 @@ def weapons_page(request: Request, warband: str, character_name: str):
 @app.get("/weapon_rules/{warband}", response_class=HTMLResponse)
 def weapon_rules(request: Request, warband: str):
     """Display the weapon special rules reference page."""
-    return templates.TemplateResponse(
-        "weapon_rules.html",
-        {
-            "request": request,
-            "warband": warband
-        }
-    )
+    return _reference_page(request, "weapon_rules.html", (warband,), {"warband": warband})
 
 @app.get("/weapon_cost_table/{warband}", response_class=HTMLResponse)
 def weapon_cost_table(request: Request, warband: str):
     """Display the weapon special rules cost table."""
-    return templates.TemplateResponse(
-        "weapon_cost_table.html",
-        {
-            "request": request,
-            "warband": warband
-        }
-    )
+    return _reference_page(request, "weapon_cost_table.html", (warband,), {"warband": warband})
 
 @app.post("/add_weapon/{warband}/{character_name}")
 def add_weapon(request: Request, warband: str, character_name: str, weapon_name: str = Form(...)):
     """Add a weapon to a character."""
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{character_name}.json")
-    
-    if not os.path.exists(char_file):
-        return RedirectResponse(f"/warband/{warband}", status_code=303)
     
-    with open(char_file, "r") as f:
-        character = json.load(f)
+    with CHARACTERS.lock(warband, character_name):
+        character = CHARACTERS.get(warband, character_name)
+        if character is None:
+            return RedirectResponse(f"/warband/{warband}", status_code=303)
     
-    # Initialize weapons list if it doesn't exist
-    if 'Weapons' not in character:
-        character['Weapons'] = []
+        # Initialize weapons list if it doesn't exist
+        if 'Weapons' not in character:
+            character['Weapons'] = []
     
-    print(f"Current weapons: {character['Weapons']}")
-    print(f"Attempting to add weapon: {weapon_name}")
+        print(f"Current weapons: {character['Weapons']}")
+        print(f"Attempting to add weapon: {weapon_name}")
     
-    # Add the weapon (allow duplicates)
-    print(f"Adding weapon {weapon_name}")
-    character['Weapons'].append(weapon_name)
+        # Add the weapon (allow duplicates)
+        print(f"Adding weapon {weapon_name}")
+        character['Weapons'].append(weapon_name)
     
-    print(f"Updated weapons: {character['Weapons']}")
+        print(f"Updated weapons: {character['Weapons']}")
     
-    # Save the updated character
-    with open(char_file, "w") as f:
-        json.dump(character, f, indent=2)
+        # Save the updated character
+        CHARACTERS.save(warband, character_name, character)
     
     # Check if request is AJAX (fetch API)
     if request.headers.get("accept") == "*/*":
@@ -1248,22 +1008,18 @@ def add_weapon(request: Request, warband: str, character_name: str, weapon_name:
 @app.post("/remove_weapon/{warband}/{character_name}")
 def remove_weapon(request: Request, warband: str, character_name: str, weapon_name: str = Form(...)):
     """Remove a weapon from a character."""
-    wb_path = os.path.join(WARBANDS_DIR, warband)
-    char_file = os.path.join(wb_path, f"{character_name}.json")
     
-    if not os.path.exists(char_file):
-        return RedirectResponse(f"/warband/{warband}", status_code=303)
-    
-    with open(char_file, "r") as f:
-        character = json.load(f)
+    with CHARACTERS.lock(warband, character_name):
+        character = CHARACTERS.get(warband, character_name)
+        if character is None:
+            return RedirectResponse(f"/warband/{warband}", status_code=303)
     
-    # Remove the weapon if it's in the list
-    if 'Weapons' in character and weapon_name in character['Weapons']:
-        character['Weapons'].remove(weapon_name)
+        # Remove the weapon if it's in the list
+        if 'Weapons' in character and weapon_name in character['Weapons']:
+            character['Weapons'].remove(weapon_name)
     
-    # Save the updated character
-    with open(char_file, "w") as f:
-        json.dump(character, f, indent=2)
+        # Save the updated character
+        CHARACTERS.save(warband, character_name, character)
     
     # Check if request is AJAX (fetch API)
     if request.headers.get("accept") == "*/*":
@@ -1273,12 +1029,403 @@ def remove_weapon(request: Request, warband: str, character_name: str, weapon_na
         # Return a redirect for regular form submissions (fallback)
         return RedirectResponse(f"/weapons/{warband}/{character_name}", status_code=303)
 
+# --- JSON character/warband API ---
+# Reads return a strong ETag and answer If-None-Match with 304. Writes must
+# send If-Match with the ETag they last read (or If-None-Match: * to
+# create); a stale ETag gets 412 instead of silently overwriting.
+
+def _if_match(header: str, etag) -> bool:
+    """Strong comparison of an If-Match header, as RFC 9110 requires for writes."""
+    if etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in [t.strip() for t in header.split(",")]
+
+def _write_precondition(request: Request, etag):
+    """Error response if the request may not write a resource whose ETag is ``etag`` (None: absent)."""
+    if request.headers.get("if-none-match", "").strip() == "*":
+        if etag is None:
+            return None
+        return JSONResponse({"error": "Resource already exists"}, status_code=412, headers={"ETag": etag})
+    header = request.headers.get("if-match")
+    if header is None:
+        return JSONResponse({"error": "If-Match header required"}, status_code=428)
+    if not _if_match(header, etag):
+        headers = {"ETag": etag} if etag else {}
+        return JSONResponse({"error": "Resource has changed", "etag": etag}, status_code=412, headers=headers)
+    return None
+
+def _json_with_etag(request: Request, data, status_code: int = 200):
+    """JSON response carrying the data's ETag (304 for a GET that already has it)."""
+    etag = content_etag(data)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.method == "GET" and _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(data, status_code=status_code, headers=headers)
+
+async def _json_body(request: Request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+def _warband_resource(warband: str):
+    summary = WARBAND_INDEX.get(warband)
+    if summary is None:
+        return None
+    data = summary.to_dict()
+    data["homebrew_enabled"] = CONFIG.homebrew_enabled(warband)
+    return data
+
+@app.get("/api/warbands")
+def api_list_warbands(request: Request, sort: str = "name", order: str = "asc", limit: int = 50, cursor: str = None):
+    """One page of warbands; follow next_cursor for the next page."""
+    try:
+        page = LISTING.page(sort, order, limit, cursor)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return _json_with_etag(request, page)
+
+@app.get("/api/warbands/{warband}")
+def api_get_warband(request: Request, warband: str):
+    data = _warband_resource(warband)
+    if data is None:
+        return JSONResponse({"error": "Warband not found"}, status_code=404)
+    return _json_with_etag(request, data)
+
+@app.put("/api/warbands/{warband}")
+async def api_put_warband(request: Request, warband: str):
+    """Update warband settings (currently homebrew_enabled)."""
+    body = await _json_body(request)
+    if body is None or not isinstance(body.get("homebrew_enabled"), bool):
+        return JSONResponse({"error": "Body must be an object with a boolean homebrew_enabled"}, status_code=400)
+
+    def write():
+        # The settings have their own lock key, separate from every character's
+        with CHARACTERS.locks.hold((warband,)):
+            current = _warband_resource(warband)
+            if current is None:
+                return JSONResponse({"error": "Warband not found"}, status_code=404)
+            error = _write_precondition(request, content_etag(current))
+            if error is not None:
+                return error
+            CONFIG.update_warband(warband, homebrew_enabled=body["homebrew_enabled"])
+            WARBAND_INDEX.set_homebrew(warband, body["homebrew_enabled"])
+            return _json_with_etag(request, _warband_resource(warband))
+
+    return await ASYNC_STORAGE.run(write)
+
+def _homebrew_resource(warband: str):
+    """The warband's homebrew overlay (empty kinds if it has none), or None if the warband is missing."""
+    if not STORAGE.warband_exists(warband):
+        return None
+    overlay = HOMEBREW.read(warband)
+    return overlay if overlay is not None else {kind: [] for kind in HOMEBREW_KINDS}
+
+@app.get("/api/warbands/{warband}/homebrew")
+async def api_get_homebrew(request: Request, warband: str):
+    """Homebrew traits, abilities and arcana of one warband, layered over the shared catalogs."""
+    try:
+        overlay = await ASYNC_STORAGE.run(_homebrew_resource, warband)
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid homebrew overlay: {e}"}, status_code=500)
+    if overlay is None:
+        return JSONResponse({"error": "Warband not found"}, status_code=404)
+    return _json_with_etag(request, overlay)
+
+@app.put("/api/warbands/{warband}/homebrew")
+async def api_put_homebrew(request: Request, warband: str):
+    """Replace a warband's homebrew overlay. Needs If-Match (or If-None-Match: * to create)."""
+    body = await _json_body(request)
+    if body is None:
+        return JSONResponse({"error": "Body must be an object of traits, abilities and arcana lists"}, status_code=400)
+
+    def write():
+        with CHARACTERS.locks.hold(HOMEBREW.lock_key(warband)):
+            if not STORAGE.warband_exists(warband):
+                return JSONResponse({"error": "Warband not found"}, status_code=404)
+            current = HOMEBREW.read(warband)
+            error = _write_precondition(request, content_etag(current) if current is not None else None)
+            if error is not None:
+                return error
+            created = current is None
+            try:
+                stored = HOMEBREW.write(warband, body)
+            except ValueError as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+            return _json_with_etag(request, stored, status_code=201 if created else 200)
+
+    return await ASYNC_STORAGE.run(write)
+
+@app.post("/api/warbands/{warband}/homebrew/{kind}")
+async def api_add_homebrew(request: Request, warband: str, kind: str):
+    """Add one trait or ability ({name, cost, effect, modifiers}) or arcana ({name, effect}) to a warband."""
+    if kind not in HOMEBREW_KINDS:
+        return JSONResponse({"error": f"kind must be one of {', '.join(HOMEBREW_KINDS)}"}, status_code=404)
+    body = await _json_body(request)
+    if body is None:
+        return JSONResponse({"error": "Body must be an object"}, status_code=400)
+
+    def write():
+        with CHARACTERS.locks.hold(HOMEBREW.lock_key(warband)):
+            if not STORAGE.warband_exists(warband):
+                return JSONResponse({"error": "Warband not found"}, status_code=404)
+            try:
+                added = HOMEBREW.add_entry(warband, kind, body)
+            except ValueError as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+            if not added:
+                return JSONResponse({"error": f"Already exists: {body.get('name')}"}, status_code=409)
+            return JSONResponse({"status": "success", "name": body["name"].strip()}, status_code=201)
+
+    return await ASYNC_STORAGE.run(write)
+
+@app.get("/api/warbands/{warband}/characters/{name}")
+def api_get_character(request: Request, warband: str, name: str):
+    character = CHARACTERS.peek(warband, name)
+    if character is None:
+        return JSONResponse({"error": "Character not found"}, status_code=404)
+    return _json_with_etag(request, character)
+
+@app.put("/api/warbands/{warband}/characters/{name}")
+async def api_put_character(request: Request, warband: str, name: str):
+    """Replace a character. Points are recalculated; Name always matches the URL.
+
+    Every field is validated (422 otherwise); missing core fields get the
+    values of a new character.
+    """
+    body = await _json_body(request)
+    if body is None:
+        return JSONResponse({"error": "Body must be a JSON object"}, status_code=400)
+
+    def write():
+        with CHARACTERS.lock(warband, name):
+            current = CHARACTERS.peek(warband, name)
+            created = current is None
+            if created and not STORAGE.warband_exists(warband):
+                return JSONResponse({"error": "Warband not found"}, status_code=404)
+            error = _write_precondition(request, None if created else content_etag(current))
+            if error is not None:
+                return error
+            try:
+                character = complete_character(name, body)
+                priced = price_loadout(loadout_from_character(character, CONFIG.homebrew_enabled(warband)),
+                                       HOMEBREW.cost_tables(warband))
+            except PatchError as e:
+                return JSONResponse({"error": str(e)}, status_code=e.status)
+            except (TypeError, ValueError) as e:
+                return JSONResponse({"error": f"Invalid character: {e}"}, status_code=422)
+            store_normalized(character, priced["loadout"])
+            character["Points"] = priced["points"]
+            CHARACTERS.save(warband, name, character)
+            return _json_with_etag(request, character, status_code=201 if created else 200)
+
+    return await ASYNC_STORAGE.run(write)
+
+@app.patch("/api/warbands/{warband}/characters/{name}")
+async def api_patch_character(request: Request, warband: str, name: str):
+    """Apply a JSON Patch (RFC 6902) to a character; only the touched fields are re-priced."""
+    try:
+        operations = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "Body must be a JSON array of operations"}, status_code=400)
+
+    def write():
+        with CHARACTERS.lock(warband, name):
+            current = CHARACTERS.peek(warband, name)
+            if current is None:
+                return JSONResponse({"error": "Character not found"}, status_code=404)
+            etag = content_etag(current)
+            error = _write_precondition(request, etag)
+            if error is not None:
+                return error
+            try:
+                character, new_etag = patch_character(current, etag, operations, CONFIG.homebrew_enabled(warband),
+                                                     HOMEBREW.cost_tables(warband))
+            except PatchError as e:
+                return JSONResponse({"error": str(e)}, status_code=e.status, headers={"ETag": etag})
+            if new_etag != etag:
+                CHARACTERS.save(warband, name, character)
+            return JSONResponse(character, headers={"ETag": new_etag, "Cache-Control": "no-cache"})
+
+    return await ASYNC_STORAGE.run(write)
+
+@app.post("/api/warbands/{warband}/characters/{name}/items")
+async def api_character_items(request: Request, warband: str, name: str):
+    """Apply a batch of item add/remove operations all-or-nothing, with one read and one write.
+
+    If-Match is optional here: the operations are relative, so a client
+    that does not care about concurrent edits can send them blind.
+    """
+    body = await _json_body(request)
+    if body is None:
+        return JSONResponse({"error": "Body must be an object with an operations list"}, status_code=400)
+
+    def write():
+        with CHARACTERS.lock(warband, name):
+            current = CHARACTERS.peek(warband, name)
+            if current is None:
+                return JSONResponse({"error": "Character not found"}, status_code=404)
+            etag = content_etag(current)
+            if "if-match" in request.headers:
+                error = _write_precondition(request, etag)
+                if error is not None:
+                    return error
+            try:
+                character, new_etag, breakdown = apply_and_price(
+                    current, etag, body.get("operations"), CONFIG.homebrew_enabled(warband),
+                    HOMEBREW.cost_tables(warband))
+            except PatchError as e:
+                return JSONResponse({"error": str(e)}, status_code=e.status, headers={"ETag": etag})
+            if new_etag != etag:
+                CHARACTERS.save(warband, name, character)
+            return JSONResponse(
+                {"character": character, "points": character["Points"], "breakdown": breakdown},
+                headers={"ETag": new_etag, "Cache-Control": "no-cache"},
+            )
+
+    return await ASYNC_STORAGE.run(write)
+
+@app.post("/api/warbands/{warband}/transactions")
+async def api_warband_transaction(request: Request, warband: str):
+    """Apply steps across several characters (transfers, item batches, patches, renames) atomically."""
+    body = await _json_body(request)
+    if body is None:
+        return JSONResponse({"error": "Body must be an object with a steps list"}, status_code=400)
+
+    def write():
+        if not STORAGE.warband_exists(warband):
+            return JSONResponse({"error": "Warband not found"}, status_code=404)
+        try:
+            result = run_transaction(CHARACTERS, warband, body.get("steps"),
+                                     CONFIG.homebrew_enabled(warband), body.get("if_match"),
+                                     tables=HOMEBREW.cost_tables(warband))
+        except PatchError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status)
+        summary = WARBAND_INDEX.get(warband)
+        result["total_points"] = summary.total_points if summary is not None else 0
+        return JSONResponse(result)
+
+    return await ASYNC_STORAGE.run(write)
+
+@app.delete("/api/warbands/{warband}/characters/{name}")
+def api_delete_character(request: Request, warband: str, name: str):
+    with CHARACTERS.lock(warband, name):
+        current = CHARACTERS.peek(warband, name)
+        if current is None:
+            return JSONResponse({"error": "Character not found"}, status_code=404)
+        error = _write_precondition(request, content_etag(current))
+        if error is not None:
+            return error
+        CHARACTERS.delete(warband, name)
+    return Response(status_code=204)
+
+# --- Streaming export ---
+
+def _export_response(fmt: str, warbands, filename: str):
+    if fmt not in EXPORT_FORMATS:
+        return JSONResponse({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status_code=400)
+    media_type, extension = EXPORT_FORMATS[fmt]
+    # A generator all the way down: characters are read as the client consumes them
+    chunks = iter_export(iter_records(STORAGE, warbands, read_character=CHARACTERS.read), fmt)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+@app.get("/api/export")
+def export_all(format: str = "ndjson"):
+    """Stream every warband as NDJSON or a tar archive."""
+    return _export_response(format, None, "warbands")
+
+@app.get("/api/warbands/{warband}/export")
+def export_warband_stream(warband: str, format: str = "ndjson"):
+    """Stream one warband as NDJSON or a tar archive."""
+    if not STORAGE.warband_exists(warband):
+        return JSONResponse({"error": "Warband not found"}, status_code=404)
+    filename = "".join(c if c.isalnum() else "_" for c in warband)
+    return _export_response(format, [warband], filename)
+
+# --- Bulk import ---
+
+@app.post("/api/import")
+async def bulk_import(request: Request, overwrite: bool = False):
+    """Import NDJSON warbands/characters/vehicles; returns the counts and per-record errors.
+
+    The body is consumed as it arrives; validation, pricing and the batched
+    writes run on the I/O executor (they take blocking locks). Progress goes
+    to the server log.
+    """
+    importer = BulkImporter(CHARACTERS, CONFIG, overwrite=overwrite, catalogs=HOMEBREW)
+    errors = []
+
+    def collect(events):
+        for event in events:
+            if event["type"] == "error":
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append(event)
+            else:
+                print(f"Import {event['type']}: {event}")
+
+    async for data in request.stream():
+        collect(await ASYNC_STORAGE.run(importer.feed, data))
+    collect(await ASYNC_STORAGE.run(importer.finish))
+    result = dict(importer.counts)
+    result["errors_shown"] = errors
+    return JSONResponse(result, status_code=200 if not importer.counts["errors"] else 207)
+
+@app.get("/api/autosave/stats")
+async def autosave_stats():
+    """API endpoint exposing write-behind autosave counters and flush latency."""
+    return CHARACTERS.autosave.stats()
+
+@app.get("/api/character_cache/stats")
+async def character_cache_stats():
+    """API endpoint exposing character repository cache statistics."""
+    return CHARACTERS.stats()
+
+@app.get("/api/pages/stats")
+def page_cache_stats():
+    """Rendered reference pages held in memory: hits, misses, evictions and size."""
+    return PAGES.stats()
+
+@app.get("/api/homebrew/stats")
+def homebrew_stats():
+    """Cached per-warband catalog views: hits, loads and overlay errors."""
+    return HOMEBREW.stats()
+
+@app.get("/api/storage/stats")
+async def storage_stats():
+    return await ASYNC_STORAGE.stats()
+
+@app.get("/api/io/stats")
+async def io_stats():
+    """API endpoint exposing queue depth and wait times of the storage I/O executor."""
+    return IO_EXECUTOR.stats()
+
+@app.get("/api/character_patch/stats")
+async def character_patch_stats():
+    """API endpoint exposing how many patches were re-priced incrementally."""
+    return patch_stats()
+
+@app.get("/api/warband_index/stats")
+async def warband_index_stats():
+    stats = WARBAND_INDEX.stats()
+    stats["listing"] = LISTING.stats()
+    return stats
+
+@app.post("/api/warband_index/rebuild")
+def warband_index_rebuild():
+    """Rebuild every warband summary from disk (after editing files by hand)."""
+    WARBAND_INDEX.rebuild()
+    return {"status": "success", "warbands": [s.to_dict() for s in WARBAND_INDEX.list_warbands()]}
+
 @app.get("/api/special_rule/{rule_name}")
 async def get_special_rule_api(rule_name: str):
     """API endpoint to get the description of a special rule."""
     print(f"API endpoint called for rule: {rule_name}")
     from app.special_rules_api import get_special_rule_description
-    description = get_special_rule_description(rule_name)
+    description = await ASYNC_STORAGE.run(get_special_rule_description, rule_name)
     print(f"Description retrieved: {description}")
     return {"rule": rule_name, "description": description}
 
@@ -31,6 +31,8 @@ def get_weapon_profiles_for_character(character):
     for weapon_name in character.get('Weapons', []):
         weapon_data = get_weapon(weapon_name)
         if weapon_data:
+            # Catalog entries are shared, so annotate a copy
+            weapon_data = dict(weapon_data)
             # Add special rules descriptions to each weapon
             if weapon_data.get('special_rules'):
                 rules_with_desc = []
@@ -0,0 +1,92 @@
+// points_engine.js
+// Client-side port of app/points_engine.py. Prices a loadout with the
+// catalog bundle served by /api/catalog_bundle, so the edit page can update
+// points without a server round trip. Keep the rules in step with the
+// Python engine; the bundle carries every constant and cost table.
+(function (root) {
+    'use strict';
+
+    // Accept a list of names or a comma-separated string; drop blanks
+    function names(value) {
+        if (value === null || value === undefined) return [];
+        const list = typeof value === 'string' ? value.split(',') : value;
+        return list.map(v => String(v).trim()).filter(v => v);
+    }
+
+    function unique(list) {
+        return Array.from(new Set(list));
+    }
+
+    // Same acceptance as Python's int() for the values the form produces
+    function toInt(value, fallback) {
+        if (value === null || value === undefined) return fallback;
+        if (typeof value === 'number' && Number.isInteger(value)) return value;
+        const text = String(value).trim();
+        if (!/^[+-]?\d+$/.test(text)) {
+            throw new Error(`invalid integer value: '${value}'`);
+        }
+        return parseInt(text, 10);
+    }
+
+    function normalizeLoadout(bundle, loadout) {
+        const rules = bundle.rules;
+        const homebrewEnabled = Boolean(loadout.homebrew_enabled);
+        const rawSkills = loadout.skills || {};
+        const skills = {};
+        rules.skills.forEach(skill => {
+            let value = Math.max(rules.default_skill, toInt(rawSkills[skill], rules.default_skill));
+            // Enforce maximum skill value when homebrew is off
+            if (!homebrewEnabled) value = Math.min(rules.max_skill, value);
+            skills[skill] = value;
+        });
+
+        let speed = toInt(loadout.speed, rules.default_speed);
+        // Speed cannot be bought outside homebrew mode
+        if (!homebrewEnabled) speed = rules.default_speed;
+
+        return {
+            traits: unique(names(loadout.traits)),
+            abilities: unique(names(loadout.abilities)),
+            skills: skills,
+            hit_points: toInt(loadout.hit_points, rules.default_hit_points),
+            speed: speed,
+            weapons: names(loadout.weapons),
+            armour: names(loadout.armour),
+            misc_items: names(loadout.misc_items),
+            homebrew_enabled: homebrewEnabled
+        };
+    }
+
+    // Own keys only: "constructor", "toString" etc. are not catalog entries
+    function sumCosts(costs, list) {
+        return list.reduce((total, name) =>
+            total + (Object.prototype.hasOwnProperty.call(costs, name) ? costs[name] : 0), 0);
+    }
+
+    function priceLoadout(bundle, loadout) {
+        const rules = bundle.rules;
+        const costs = bundle.costs;
+        const l = normalizeLoadout(bundle, loadout);
+        const breakdown = {
+            base: rules.base_points,
+            traits: sumCosts(costs.traits, l.traits),
+            abilities: sumCosts(costs.abilities, l.abilities),
+            skills: rules.skills.reduce((total, skill) => total + (l.skills[skill] - rules.default_skill), 0) * rules.skill_point_cost,
+            // Python floor division, so odd negative changes round down
+            hit_points: Math.floor((l.hit_points - rules.default_hit_points) / rules.hit_points_step) * rules.hit_points_step_cost,
+            speed: l.homebrew_enabled ? (l.speed - rules.default_speed) * rules.speed_point_cost : 0,
+            weapons: sumCosts(costs.weapons, l.weapons),
+            armour: sumCosts(costs.armour, l.armour),
+            misc_items: sumCosts(costs.misc_items, l.misc_items)
+        };
+        const points = Object.values(breakdown).reduce((a, b) => a + b, 0);
+        return { points: points, breakdown: breakdown, loadout: l };
+    }
+
+    const api = { normalizeLoadout: normalizeLoadout, priceLoadout: priceLoadout };
+    if (typeof module !== 'undefined' && module.exports) {
+        module.exports = api;
+    } else {
+        root.PointsEngine = api;
+    }
+})(this);
@@ -0,0 +1,53 @@
+# conftest.py
+"""
+Shared fixtures: the app runs in a scratch working directory.
+
+``main`` reads ``config.json``, ``warbands/`` and ``templates/`` relative
+to the working directory, so the session fixture moves into a temporary
+directory (with links to the real templates and static files) before it
+imports the app. Nothing under the checkout's ``warbands/`` is touched.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def app_main(tmp_path_factory):
+    work = tmp_path_factory.mktemp("app")
+    for name in ("templates", "static"):
+        os.symlink(os.path.join(ROOT, name), work / name)
+    (work / "warbands").mkdir()
+    (work / "config.json").write_text(json.dumps({"homebrew_enabled": False}))
+    previous = os.getcwd()
+    os.chdir(work)
+    try:
+        import main
+        yield main
+    finally:
+        os.chdir(previous)
+
+
+@pytest.fixture(scope="session")
+def client(app_main):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def warband(app_main):
+    """A new, empty warband; removed again after the test."""
+    name = f"test-{os.urandom(4).hex()}"
+    app_main.STORAGE.create_warband(name)
+    yield name
+    app_main.CHARACTERS.forget_warband(name)
+    app_main.STORAGE.delete_warband(name)
@@ -0,0 +1,52 @@
+# test_bulk_import.py
+"""POST /api/import rejects characters the app could not show or price."""
+
+import json
+
+from app.character_patch import CORE_FIELDS
+
+
+def _import(client, warband, *characters):
+    lines = [{"type": "warband", "name": warband, "config": {"homebrew_enabled": False}}]
+    lines += [{"type": "character", "warband": warband, "name": name, "data": data} for name, data in characters]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n"
+    return client.post("/api/import?overwrite=true", content=body).json()
+
+
+def test_unknown_traits_and_abilities_are_rejected(client, warband):
+    result = _import(
+        client, warband,
+        ("Made-up trait", {"Traits": ["Not A Real Trait"]}),
+        ("Made-up ability", {"Abilities": ["Not A Real Ability"]}),
+    )
+    assert result["characters"] == 0
+    assert result["errors"] == 2
+    assert all("Not in the catalogs" in e["error"] for e in result["errors_shown"])
+    assert client.get(f"/api/warbands/{warband}/characters/Made-up trait").status_code == 404
+
+
+def test_wrongly_typed_fields_are_rejected(client, warband):
+    result = _import(client, warband, ("Bad", {"Weapons": [{"name": "Pistol"}]}), ("Worse", {"Skills": [1, 2]}))
+    assert result["characters"] == 0
+    assert result["errors"] == 2
+
+
+def test_missing_fields_get_new_character_defaults(client, warband):
+    result = _import(client, warband, ("Sparse", {"Notes": "only notes"}))
+    assert result["characters"] == 1, result
+    stored = client.get(f"/api/warbands/{warband}/characters/Sparse").json()
+    for field, default in CORE_FIELDS.items():
+        assert stored[field] == default
+    assert stored["Notes"] == "only notes"
+    assert stored["Name"] == "Sparse"
+
+
+def test_imported_characters_store_what_was_priced(client, warband):
+    body = {"Skills": {"Agility": 15}, "Speed": 14, "Abilities": [], "Points": 1}
+    result = _import(client, warband, ("Overcap", body))
+    assert result["characters"] == 1, result
+    stored = client.get(f"/api/warbands/{warband}/characters/Overcap").json()
+    # Homebrew is off: skills are capped at 10, speed is locked at 10
+    assert stored["Skills"]["Agility"] == 10
+    assert stored["Speed"] == 10
+    assert stored["Points"] == 10 + 9 * 10
@@ -0,0 +1,50 @@
+# test_character_locks.py
+"""Character locks hold across threads and worker processes: no lost updates."""
+
+import multiprocessing
+import threading
+
+from app.character_repository import CharacterRepository
+from app.storage import FileStorage, read_json
+
+WORKERS = 4
+THREADS = 4
+ITERATIONS = 25
+
+
+def _worker(root, worker):
+    """One worker process: every thread bumps the shared character under its lock."""
+    repo = CharacterRepository(FileStorage(root))
+
+    def hammer(thread):
+        for i in range(ITERATIONS):
+            with repo.lock("stress", "target"):
+                character = repo.get("stress", "target")
+                character["Counter"] += 1
+                character["Log"].append(f"{worker}.{thread}.{i}")
+                repo.save("stress", "target", character)
+
+    pool = [threading.Thread(target=hammer, args=(t,)) for t in range(THREADS)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+def test_concurrent_saves_lose_no_updates(tmp_path):
+    root = str(tmp_path)
+    storage = FileStorage(root)
+    storage.write_character("stress", "target", {"Name": "target", "Counter": 0, "Log": []})
+
+    procs = [multiprocessing.Process(target=_worker, args=(root, w)) for w in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=120)
+    assert [p.exitcode for p in procs] == [0] * WORKERS
+
+    # Parsing also proves no reader or writer left a truncated file
+    final = read_json(storage.character_path("stress", "target"))
+    expected = WORKERS * THREADS * ITERATIONS
+    assert final["Counter"] == expected
+    assert len(set(final["Log"])) == expected
@@ -0,0 +1,139 @@
+# test_character_patch.py
+"""PATCH /api/warbands/{warband}/characters/{name}: RFC 6902 semantics and re-pricing."""
+
+import pytest
+
+from app.character_patch import new_character
+
+
+def _url(warband, name="Rook"):
+    return f"/api/warbands/{warband}/characters/{name}"
+
+
+def _create(client, warband, body=None):
+    response = client.put(_url(warband), json=body or {}, headers={"If-None-Match": "*"})
+    assert response.status_code == 201
+    return response.headers["ETag"]
+
+
+def _patch(client, warband, etag, operations):
+    return client.patch(_url(warband), json=operations, headers={"If-Match": etag})
+
+
+def _batch_points(client, character):
+    loadout = {"skills": character["Skills"], "speed": character["Speed"],
+               "hit_points": character["Hit-points"], "traits": character["Traits"]}
+    response = client.post("/api/calculate_points/batch", json={"loadouts": [loadout]})
+    return response.json()["results"][0]["points"]
+
+
+def test_patch_normalizes_untouched_fields_of_an_older_version(client, app_main, warband):
+    # Written before PUT normalized (or by the edit form): over the caps
+    character = new_character("Rook")
+    character["Skills"]["Agility"] = 15
+    character["Speed"] = 14
+    app_main.CHARACTERS.save(warband, "Rook", character)
+    etag = client.get(_url(warband)).headers["ETag"]
+
+    response = _patch(client, warband, etag, [{"op": "replace", "path": "/Hit-points", "value": 22}])
+    assert response.status_code == 200
+    stored = client.get(_url(warband)).json()
+    assert stored["Hit-points"] == 22
+    assert stored["Skills"]["Agility"] == 10
+    assert stored["Speed"] == 10
+    assert stored["Points"] == _batch_points(client, stored)
+
+
+def test_patch_after_put_stays_consistent(client, warband):
+    etag = _create(client, warband, {"Skills": {"Agility": 15}})
+    response = _patch(client, warband, etag, [{"op": "replace", "path": "/Hit-points", "value": 24}])
+    assert response.status_code == 200
+    stored = client.get(_url(warband)).json()
+    assert stored["Skills"]["Agility"] == 10
+    assert stored["Points"] == _batch_points(client, stored)
+
+
+def test_test_operation(client, warband):
+    etag = _create(client, warband, {"Skills": {"Agility": 3}})
+    response = _patch(client, warband, etag, [
+        {"op": "test", "path": "/Skills/Agility", "value": 3},
+        {"op": "replace", "path": "/Skills/Agility", "value": 4},
+    ])
+    assert response.status_code == 200
+    assert response.json()["Skills"]["Agility"] == 4
+
+
+def test_test_only_patch_changes_nothing(client, warband):
+    etag = _create(client, warband)
+    response = _patch(client, warband, etag, [{"op": "test", "path": "/Speed", "value": 10}])
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
+
+
+def test_move_and_copy(client, warband):
+    etag = _create(client, warband, {"Weapons": ["Pistol"], "Notes": "spare"})
+    response = _patch(client, warband, etag, [
+        {"op": "copy", "from": "/Weapons/0", "path": "/Weapons/-"},
+        {"op": "move", "from": "/Notes", "path": "/Backstory"},
+    ])
+    assert response.status_code == 200
+    stored = client.get(_url(warband)).json()
+    assert stored["Weapons"] == ["Pistol", "Pistol"]
+    assert stored["Backstory"] == "spare"
+    assert "Notes" not in stored
+    assert stored["Points"] == response.json()["Points"]
+
+
+@pytest.mark.parametrize("operations", [
+    {"op": "replace", "path": "/Speed", "value": 10},
+    [{"op": "rename", "path": "/Speed"}],
+    [{"op": "replace", "path": "Speed", "value": 10}],
+    [{"op": "replace", "path": "/Speed"}],
+    [{"op": "move", "path": "/Skills/Agility"}],
+    [{"op": "move", "from": "/Skills", "path": "/Skills/Agility"}],
+])
+def test_malformed_patch_is_400(client, warband, operations):
+    etag = _create(client, warband)
+    assert _patch(client, warband, etag, operations).status_code == 400
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "test", "path": "/Speed", "value": 9}],
+    [{"op": "test", "path": "/Speed", "value": True}],
+    [{"op": "replace", "path": "/Missing", "value": 1}],
+    [{"op": "remove", "path": "/Weapons/0"}],
+    [{"op": "copy", "from": "/Missing", "path": "/Notes"}],
+])
+def test_patch_that_does_not_apply_is_409(client, warband, operations):
+    etag = _create(client, warband)
+    assert _patch(client, warband, etag, operations).status_code == 409
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "replace", "path": "/Skills/Agility", "value": "3"}],
+    [{"op": "add", "path": "/Skills/Luck", "value": 2}],
+    [{"op": "replace", "path": "/Traits", "value": "Brawler"}],
+    [{"op": "replace", "path": "/Points", "value": 0}],
+])
+def test_invalid_character_is_422(client, warband, operations):
+    etag = _create(client, warband)
+    assert _patch(client, warband, etag, operations).status_code == 422
+
+
+@pytest.mark.parametrize("failing, status", [
+    ({"op": "test", "path": "/Speed", "value": 9}, 409),
+    ({"op": "replace", "path": "/Hit-points", "value": "many"}, 422),
+    ({"op": "bogus", "path": "/Speed"}, 400),
+])
+def test_failed_patch_changes_nothing(client, warband, failing, status):
+    etag = _create(client, warband)
+    before = client.get(_url(warband)).json()
+    response = _patch(client, warband, etag, [
+        {"op": "replace", "path": "/Skills/Agility", "value": 5},
+        {"op": "add", "path": "/Weapons/-", "value": "Pistol"},
+        failing,
+    ])
+    assert response.status_code == status
+    after = client.get(_url(warband))
+    assert after.json() == before
+    assert after.headers["ETag"] == etag
@@ -0,0 +1,116 @@
+# test_character_put.py
+"""PUT /api/warbands/{warband}/characters/{name}: validation and core fields."""
+
+import pytest
+
+from app.character_patch import CORE_FIELDS
+
+CREATE = {"If-None-Match": "*"}
+
+
+def _url(warband, name="Rook"):
+    return f"/api/warbands/{warband}/characters/{name}"
+
+
+@pytest.mark.parametrize("body", [
+    {"Skills": [1, 2]},
+    {"Skills": {"Agility": "3"}},
+    {"Skills": {"Luck": 2}},
+    {"Traits": "Brawler"},
+    {"Weapons": [{"name": "Pistol"}]},
+    {"Hit-points": "20"},
+])
+def test_put_rejects_invalid_fields(client, warband, body):
+    response = client.put(_url(warband), json=body, headers=CREATE)
+    assert response.status_code == 422
+    assert client.get(_url(warband)).status_code == 404
+
+
+def test_put_fills_in_core_fields(client, warband):
+    response = client.put(_url(warband), json={"Traits": []}, headers=CREATE)
+    assert response.status_code == 201
+    stored = client.get(_url(warband)).json()
+    for field in CORE_FIELDS:
+        assert field in stored
+    assert stored["Name"] == "Rook"
+    assert stored["Skills"] == CORE_FIELDS["Skills"]
+    assert stored["Points"] == response.json()["Points"]
+
+
+def test_put_keeps_partial_skills(client, warband):
+    response = client.put(_url(warband), json={"Skills": {"Agility": 3}}, headers=CREATE)
+    assert response.status_code == 201
+    skills = response.json()["Skills"]
+    assert skills["Agility"] == 3
+    assert skills["Fighting"] == 1
+
+
+def test_put_ignores_name_and_points(client, warband):
+    response = client.put(_url(warband), json={"Name": "Other", "Points": 9999}, headers=CREATE)
+    assert response.status_code == 201
+    assert response.json()["Name"] == "Rook"
+    assert response.json()["Points"] != 9999
+
+
+def test_put_stores_what_was_priced(client, warband):
+    # Homebrew is off: skills are capped at 10 and speed is locked at 10
+    body = {"Skills": {"Agility": 15}, "Speed": 14, "Traits": ["Brawler", "Brawler"]}
+    response = client.put(_url(warband), json=body, headers=CREATE)
+    assert response.status_code == 201
+    stored = client.get(_url(warband)).json()
+    assert stored["Skills"]["Agility"] == 10
+    assert stored["Speed"] == 10
+    assert stored["Traits"] == ["Brawler"]
+    priced = client.post("/api/calculate_points/batch", json={"loadouts": [
+        {"skills": stored["Skills"], "speed": stored["Speed"], "traits": stored["Traits"]},
+    ]}).json()["results"][0]
+    assert stored["Points"] == priced["points"]
+
+
+# --- conditional requests ---
+
+def _create(client, warband, body=None):
+    response = client.put(_url(warband), json=body or {}, headers=CREATE)
+    assert response.status_code == 201
+    return response.headers["ETag"]
+
+
+def test_get_with_current_etag_is_304(client, warband):
+    etag = _create(client, warband)
+    response = client.get(_url(warband), headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert client.get(_url(warband), headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_put_without_if_match_is_428(client, warband):
+    _create(client, warband)
+    assert client.put(_url(warband), json={"Notes": "x"}).status_code == 428
+
+
+def test_put_with_stale_if_match_is_412(client, warband):
+    stale = _create(client, warband)
+    fresh = client.put(_url(warband), json={"Notes": "first"}, headers={"If-Match": stale})
+    assert fresh.status_code == 200
+    response = client.put(_url(warband), json={"Notes": "second"}, headers={"If-Match": stale})
+    assert response.status_code == 412
+    assert response.headers["ETag"] == fresh.headers["ETag"]
+    assert client.get(_url(warband)).json()["Notes"] == "first"
+
+
+def test_put_with_current_if_match_replaces(client, warband):
+    etag = _create(client, warband)
+    response = client.put(_url(warband), json={"Notes": "new"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_if_none_match_star_only_creates(client, warband):
+    _create(client, warband, {"Notes": "original"})
+    response = client.put(_url(warband), json={"Notes": "clobber"}, headers=CREATE)
+    assert response.status_code == 412
+    assert client.get(_url(warband)).json()["Notes"] == "original"
+
+
+def test_put_into_missing_warband_is_404(client):
+    assert client.put(_url("no-such-warband"), json={}, headers=CREATE).status_code == 404
@@ -0,0 +1,39 @@
+# test_homebrew_views.py
+"""Per-warband catalog views: only warbands with an overlay are cached, in a bounded LRU."""
+
+import os
+
+from app.homebrew import SHARED_VIEW, HomebrewCatalogs
+from app.storage import FileStorage
+
+
+def test_unknown_warband_names_are_not_cached(client, app_main):
+    before = app_main.HOMEBREW.stats()["cached_views"]
+    for _ in range(50):
+        name = f"nope-{os.urandom(4).hex()}"
+        assert client.post("/api/calculate_points", data={"traits": "", "warband": name}).status_code == 200
+        assert client.get(f"/api/catalog_bundle?warband={name}").status_code == 200
+    assert app_main.HOMEBREW.stats()["cached_views"] == before
+
+
+def test_views_are_bounded(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    catalogs = HomebrewCatalogs(storage, max_views=2)
+    for i in range(5):
+        storage.create_warband(f"w{i}")
+        catalogs.write(f"w{i}", {"traits": [{"name": f"Trait {i}", "cost": i}]})
+        assert catalogs.view(f"w{i}").get("traits", f"Trait {i}")["cost"] == i
+    stats = catalogs.stats()
+    assert stats["cached_views"] == 2
+    assert stats["evictions"] == 3
+    # An evicted warband is simply loaded again
+    assert catalogs.cost_tables("w0").traits["Trait 0"] == 0
+
+
+def test_warband_without_overlay_gets_shared_view(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    storage.create_warband("plain")
+    catalogs = HomebrewCatalogs(storage)
+    assert catalogs.view("plain") is SHARED_VIEW
+    assert catalogs.view("../escape") is SHARED_VIEW
+    assert catalogs.stats()["cached_views"] == 0
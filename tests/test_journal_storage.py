@@ -0,0 +1,44 @@
+# test_journal_storage.py
+"""Journaled storage: journals are opened for warbands that exist, and replayed."""
+
+from app.journal_storage import JournalStorage
+
+
+def test_reads_of_unknown_warbands_open_no_journal(tmp_path):
+    storage = JournalStorage(str(tmp_path))
+    assert storage.list_characters("missing") == []
+    assert storage.read_character("missing", "Rook") is None
+    assert storage.character_version("missing", "Rook") is None
+    assert storage.warband_version("missing") is None
+    storage.delete_character("missing", "Rook")
+    storage.compact("missing")
+    assert storage.stats()["warbands"] == 0
+    assert not (tmp_path / "missing").exists()
+
+
+def test_log_is_replayed_on_first_read(tmp_path):
+    storage = JournalStorage(str(tmp_path))
+    storage.write_character("band", "Rook", {"Name": "Rook", "Points": 10})
+    storage.write_character("band", "Rook", {"Name": "Rook", "Points": 15})
+    storage.sync()
+    assert storage.stats()["records"] == 2
+    # A second process reading the same tree before any compaction
+    reader = JournalStorage(str(tmp_path))
+    data, version, _ = reader.read_character("band", "Rook")
+    assert data["Points"] == 15
+    assert version == ("journal", 2)
+    assert reader.list_characters("band") == ["Rook"]
+    storage.close()
+
+
+def test_compaction_folds_the_log_into_snapshots(tmp_path):
+    storage = JournalStorage(str(tmp_path))
+    storage.write_character("band", "Rook", {"Name": "Rook", "Points": 10})
+    storage.compact("band")
+    stats = storage.stats()
+    assert stats["compactions"] == 1
+    assert stats["fsyncs"] == 1
+    assert stats["pending_characters"] == 0
+    assert (tmp_path / "band" / "journal.log").stat().st_size == 0
+    assert JournalStorage(str(tmp_path)).read_character("band", "Rook")[0]["Points"] == 10
+    storage.close()
@@ -0,0 +1,32 @@
+# test_points_batch.py
+"""POST /api/calculate_points/batch reads homebrew flags like the form routes do."""
+
+import pytest
+
+# Speed can only be bought with homebrew on
+FAST = {"speed": 12}
+
+
+def _points(client, payload):
+    response = client.post("/api/calculate_points/batch", json=payload)
+    assert response.status_code == 200
+    return [r["points"] for r in response.json()["results"]]
+
+
+@pytest.mark.parametrize("flag", ["false", "False", False, 0, None])
+def test_false_default_is_off(client, flag):
+    off, = _points(client, {"homebrew_enabled": False, "loadouts": [FAST]})
+    assert _points(client, {"homebrew_enabled": flag, "loadouts": [FAST]}) == [off]
+
+
+@pytest.mark.parametrize("flag", ["true", "True", True])
+def test_true_default_is_on(client, flag):
+    off, = _points(client, {"homebrew_enabled": False, "loadouts": [FAST]})
+    on, = _points(client, {"homebrew_enabled": flag, "loadouts": [FAST]})
+    assert on > off
+
+
+def test_per_loadout_string_flag(client):
+    off, on = _points(client, {"loadouts": [dict(FAST, homebrew_enabled="false"), dict(FAST, homebrew_enabled="true")]})
+    assert on > off
+    assert _points(client, {"homebrew_enabled": "true", "loadouts": [dict(FAST, homebrew_enabled="false")]}) == [off]
@@ -0,0 +1,77 @@
+# test_points_parity.py
+"""The browser engine (static/js/points_engine.js) prices exactly like app.points_engine.
+
+Each loadout is priced by ``price_loadouts`` and, with the same catalog
+bundle the edit page downloads, by the JS engine under node.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from app.points_engine import get_catalog_bundle, get_cost_tables, price_loadouts
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENGINE = os.path.join(ROOT, "static", "js", "points_engine.js")
+
+NODE_SCRIPT = """
+const engine = require(process.argv[1]);
+const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const results = input.loadouts.map(loadout => {
+    try {
+        const r = engine.priceLoadout(input.bundle, loadout);
+        return {points: r.points, breakdown: r.breakdown};
+    } catch (e) {
+        return {error: String(e.message)};
+    }
+});
+process.stdout.write(JSON.stringify(results));
+"""
+
+
+def _loadouts():
+    tables = get_cost_tables()
+
+    def first(costs, n):
+        return [name for name in costs][:n]
+
+    traits, abilities = first(tables.traits, 3), first(tables.abilities, 3)
+    weapons, armour, misc = first(tables.weapons, 3), first(tables.armour, 2), first(tables.misc_items, 2)
+    return [
+        {},
+        {"homebrew_enabled": True},
+        {"traits": traits, "abilities": abilities},
+        {"traits": ",".join(traits + traits[:1]), "abilities": " , ".join(abilities)},
+        {"skills": {"Agility": 3, "Fighting": "4", "Psyche": 15}, "homebrew_enabled": False},
+        {"skills": {"Agility": 14, "Shooting": "12"}, "homebrew_enabled": True},
+        {"skills": {"Agility": 0, "Awareness": -3}},
+        {"hit_points": 23}, {"hit_points": "17"}, {"hit_points": 9},
+        {"speed": 13, "homebrew_enabled": True}, {"speed": 13}, {"speed": "8", "homebrew_enabled": True},
+        {"weapons": weapons + weapons[:1], "armour": armour, "misc_items": misc},
+        {"weapons": ",".join(weapons), "armour": ",".join(armour), "misc_items": ",".join(misc)},
+        {"traits": ["constructor", "toString", "__proto__", "Not A Trait"]},
+        {"weapons": ["hasOwnProperty", "valueOf"], "armour": ["Nothing"], "misc_items": ["prototype"]},
+        {"skills": {"Agility": "abc"}},
+        {"hit_points": "2.5"},
+    ]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_js_engine_matches_python():
+    bundle = json.loads(get_catalog_bundle().body)
+    loadouts = _loadouts()
+    run = subprocess.run(
+        ["node", "-e", NODE_SCRIPT, ENGINE],
+        input=json.dumps({"bundle": bundle, "loadouts": loadouts}),
+        capture_output=True, text=True, check=True, timeout=60,
+    )
+    js_results = json.loads(run.stdout)
+    for loadout, py, js in zip(loadouts, price_loadouts(loadouts), js_results):
+        if "error" in py:
+            assert "error" in js, loadout
+        else:
+            assert js == {"points": py["points"], "breakdown": py["breakdown"]}, loadout
+    assert len(js_results) == len(loadouts)
@@ -0,0 +1,39 @@
+# test_transaction_names.py
+"""Names used by transactions are validated before they become lock keys."""
+
+import os
+
+import pytest
+
+from app.locks import KeyedLocks
+
+BAD_NAMES = ["../../tmp/evil", "a/b", ".hidden", " padded", ""]
+
+
+@pytest.mark.parametrize("name", BAD_NAMES)
+def test_if_match_names_are_validated(client, warband, name):
+    body = {
+        "steps": [{"op": "patch", "character": "Rook", "patch": []}],
+        "if_match": {name: '"x"'},
+    }
+    response = client.post(f"/api/warbands/{warband}/transactions", json=body)
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("name", BAD_NAMES)
+def test_step_names_are_validated(client, warband, name):
+    body = {"steps": [{"op": "transfer", "from": "Rook", "to": name, "kind": "weapon", "name": "Fist"}]}
+    response = client.post(f"/api/warbands/{warband}/transactions", json=body)
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("key", [("../../escape", ".."), ("/abs", "x"), ("w", "a" * 300), ("", "")])
+def test_lock_files_stay_in_lock_directory(tmp_path, key):
+    directory = tmp_path / "locks"
+    locks = KeyedLocks(str(directory))
+    with locks.hold(key):
+        pass
+    created = [os.path.join(root, f) for root, _, files in os.walk(tmp_path) for f in files]
+    assert created
+    for path in created:
+        assert os.path.commonpath([path, str(directory)]) == str(directory)
@@ -0,0 +1,49 @@
+# test_warband_listing.py
+"""Warband listing: created_at ordering and next-page links."""
+
+import pytest
+
+from app.character_repository import CharacterRepository
+from app.storage import FileStorage
+from app.warband_listing import WarbandListing
+
+CREATED = {
+    "a-missing": None,
+    "b-us-format": "9/14/2025 7:57:23 PM",
+    "c-iso": "2025-09-13 10:00:00",
+    "d-iso-later": "2025-09-15 08:00:00.123456",
+    "e-number": 12345,
+    "f-garbage": "sometime",
+}
+
+
+@pytest.fixture
+def listing(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    for name, created in CREATED.items():
+        storage.create_warband(name)
+        storage.write_config(name, {} if created is None else {"created_at": created})
+    return WarbandListing(storage, CharacterRepository(storage).index)
+
+
+def test_created_sorts_mixed_stamps(listing):
+    names = [w["name"] for w in listing.page("created", limit=10)["warbands"]]
+    assert names == ["a-missing", "c-iso", "b-us-format", "d-iso-later", "e-number", "f-garbage"]
+
+
+def test_created_pages_follow_cursor(listing):
+    seen, cursor = [], None
+    while True:
+        page = listing.page("created", "desc", limit=4, cursor=cursor)
+        assert page["limit"] == 4
+        seen += [w["name"] for w in page["warbands"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["f-garbage", "e-number", "d-iso-later", "b-us-format", "c-iso", "a-missing"]
+
+
+def test_next_link_keeps_limit(app_main, listing):
+    page = listing.page("name", limit=2)
+    html = app_main.templates.get_template("warbands.html").render(request=None, **page)
+    assert f"limit=2&cursor={page['next_cursor']}" in html.replace("&amp;", "&")